@@ -5,7 +5,6 @@ Regenerate all archive files with corrected dropdown URLs
 import asyncio
 import json
 import sys
-from datetime import datetime
 from pathlib import Path
 
 # Add src to path
@@ -17,30 +16,32 @@ from generate_question import (
     get_archived_dates,
     generate_enhanced_content,
     generate_html,
+    render_day_content,
     START_DATE
 )
+from archive_store import ARCHIVE_MODE, write_fragment, list_archived_dates
+from concept_graph import load_concept_graph, related_lessons
+from enhancement_backends import get_backend
+from model_scheduler import LANE_BACKFILL, write_run_report
 
-async def regenerate_archive_file(date_str, modules):
+async def regenerate_archive_file(date_str, modules, concept_graph):
     """Regenerate a single archive file for a specific date."""
     print(f"\nRegenerating archive for {date_str}...")
 
-    # Calculate which module was shown on that date
-    target_date = datetime.fromisoformat(date_str)
-    start = datetime.fromisoformat(START_DATE)
-    days_elapsed = (target_date - start).days
-
-    if days_elapsed < 0:
-        days_elapsed = 0
-
-    module_index = days_elapsed % len(modules)
-    module = modules[module_index]
-    current_num = module_index + 1
-    total_num = len(modules)
+    # Same rotation (including skipped duplicates) as the archive index and search links
+    module, current_num, total_num = calculate_daily_module(modules, START_DATE, date_str)
 
     print(f"  Module: {module['title']} ({current_num}/{total_num})")
 
     # Generate enhanced content
-    enhanced_content = await generate_enhanced_content(module, current_num, total_num)
+    related = related_lessons(concept_graph, module)
+    enhanced_content = await generate_enhanced_content(
+        module, current_num, total_num, related, backend=get_backend(lane=LANE_BACKFILL)
+    )
+
+    if ARCHIVE_MODE == "fragments":
+        write_fragment(render_day_content(module, current_num, total_num, date_str, enhanced_content, related))
+        return
 
     # Get archived dates for archive page (without archive/ prefix)
     archived_dates = get_archived_dates(is_archive_page=True)
@@ -53,7 +54,8 @@ async def regenerate_archive_file(date_str, modules):
         archived_dates=archived_dates,
         today_date=date_str,
         enhanced_content=enhanced_content,
-        is_archive_page=True
+        is_archive_page=True,
+        related=related
     )
 
     # Save to archive
@@ -72,22 +74,18 @@ async def main():
     data = load_modules()
     modules = data['modules']
 
-    # Get all existing archive files
-    archive_dir = Path("docs/archive")
-    archive_files = sorted(archive_dir.glob("*.html"))
-
-    dates_to_regenerate = []
-    for file in archive_files:
-        if file.stem.startswith("2026-"):
-            dates_to_regenerate.append(file.stem)
+    # Get all existing archive days (full pages or fragments)
+    dates_to_regenerate = list_archived_dates()
 
     print(f"\nFound {len(dates_to_regenerate)} archive files to regenerate:")
     for date in dates_to_regenerate:
         print(f"  - {date}")
 
     # Regenerate each archive file
+    concept_graph = load_concept_graph(modules=modules)
     for date_str in dates_to_regenerate:
-        await regenerate_archive_file(date_str, modules)
+        await regenerate_archive_file(date_str, modules, concept_graph)
+    write_run_report()
 
     print("\n" + "=" * 50)
     print("✓ All archive files regenerated successfully!")
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Archive Storage
+Where and how past days are stored in docs/archive/.
+
+ARCHIVE_MODE selects the layout:
+- "pages" (default): one full page per day, archive/YYYY-MM-DD.html
+- "fragments": one small JSON fragment per day, archive/days/YYYY-MM-DD.json,
+  rendered client-side by a single shell page, archive/day.html?date=YYYY-MM-DD.
+  Days stored as full pages (e.g. from before the switch) keep working: the
+  shell falls back to YYYY-MM-DD.html when a day has no fragment.
+
+Static pages for crawlers can be rendered from fragments on demand:
+    python src/archive_store.py static [YYYY-MM-DD ...]
+Existing full pages can be converted to fragments:
+    python src/archive_store.py migrate
+"""
+
+import argparse
+import html
+import json
+import os
+import re
+from pathlib import Path
+
+from date_utils import valid_dates, slash_dates
+
+ARCHIVE_MODE = os.getenv("ARCHIVE_MODE", "pages")
+ARCHIVE_PATH = "docs/archive"
+FRAGMENT_DIR = "days"
+SHELL_PAGE = "day.html"
+
+TITLE_RE = re.compile(r'<h2\b[^>]*\bclass="module-title"[^>]*>(.*?)</h2>', re.S)
+CARD_BODY_RE = re.compile(r'<div\b[^>]*\bclass="card-body"[^>]*>')
+DIV_TAG_RE = re.compile(r'<(/?)div\b', re.I)
+
+
+def archive_url(date_str, url_prefix="", mode=None):
+    """Link to an archived day; url_prefix is the path from the page to archive/."""
+    if (mode or ARCHIVE_MODE) == "fragments":
+        return f"{url_prefix}{SHELL_PAGE}?date={date_str}"
+    return f"{url_prefix}{date_str}.html"
+
+
+def fragment_path(date_str, archive_path=ARCHIVE_PATH):
+    return Path(archive_path) / FRAGMENT_DIR / f"{date_str}.json"
+
+
+def list_archived_dates(archive_path=ARCHIVE_PATH):
+    """Sorted dates stored in the archive, as full pages or as fragments."""
+    archive_dir = Path(archive_path)
+    stems = {file.stem for file in archive_dir.glob("*.html")}
+    stems |= {file.stem for file in (archive_dir / FRAGMENT_DIR).glob("*.json")}
+    return valid_dates(sorted(stems))
+
+
+def write_fragment(day, archive_path=ARCHIVE_PATH):
+    """Store a rendered day (see generate_question.render_day_content) as a fragment."""
+    path = fragment_path(day['date'], archive_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(day, f, ensure_ascii=False, separators=(',', ':'))
+    print(f"Archived: {path}")
+    return path
+
+
+def load_fragment(date_str, archive_path=ARCHIVE_PATH):
+    with open(fragment_path(date_str, archive_path), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def generate_shell_js():
+    """Script that loads the fragment named by ?date= (or #date) into the shell page."""
+    return f'''
+        (function() {{
+            const params = new URLSearchParams(window.location.search);
+            const dateStr = params.get('date') || window.location.hash.slice(1);
+            if (!/^\\d{{4}}-\\d{{2}}-\\d{{2}}$/.test(dateStr)) {{
+                window.location.replace('index.html');
+                return;
+            }}
+            fetch('{FRAGMENT_DIR}/' + dateStr + '.json')
+                .then(r => {{
+                    if (!r.ok) throw new Error('HTTP ' + r.status);
+                    return r.json();
+                }})
+                .then(day => {{
+                    document.title = '天纪每日学习 - ' + day.title;
+                    document.getElementById('module-title').textContent = day.title;
+                    document.getElementById('day-content').innerHTML = day.body;
+                    document.getElementById('calendar-date-label').textContent = '📅 ' + day.display;
+                    showCalendarMonth(Number(dateStr.slice(0, 4)), Number(dateStr.slice(5, 7)));
+                }})
+                .catch(() => {{
+                    // Days archived before the switch to fragments are full pages
+                    window.location.replace(dateStr + '.html');
+                }});
+        }})();
+    '''
+
+
+def write_archive_shell(archive_path=ARCHIVE_PATH, as_of=None):
+    """Write archive/day.html, the page that renders fragments."""
+    from generate_question import render_page
+
+    path = Path(archive_path) / SHELL_PAGE
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(render_page(None, is_archive_page=True, as_of=as_of))
+    return path
+
+
+def write_static_pages(dates=None, archive_path=ARCHIVE_PATH):
+    """Render full archive pages from fragments (all fragments if no dates are given)."""
+    from generate_question import render_page
+
+    if not dates:
+        dates = valid_dates(sorted(p.stem for p in (Path(archive_path) / FRAGMENT_DIR).glob("*.json")))
+    for date_str in dates:
+        html = render_page(load_fragment(date_str, archive_path), is_archive_page=True)
+        path = Path(archive_path) / f"{date_str}.html"
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(html)
+        print(f"Rendered static page: {path}")
+    return dates
+
+
+def extract_day(page_html, date_str):
+    """
+    The day stored in a full archive page, in the fragment format: the
+    module title and the card body exactly as published.
+
+    Raises ValueError if the page does not have the expected structure.
+    """
+    title = TITLE_RE.search(page_html)
+    body_start = CARD_BODY_RE.search(page_html)
+    if not title or not body_start:
+        raise ValueError(f"{date_str}: no module title or card body found")
+
+    depth = 1
+    for tag in DIV_TAG_RE.finditer(page_html, body_start.end()):
+        depth += -1 if tag.group(1) else 1
+        if depth == 0:
+            return {
+                "date": date_str,
+                "display": slash_dates([date_str])[0],
+                "title": html.unescape(title.group(1).strip()),
+                "body": page_html[body_start.end():tag.start()]
+            }
+    raise ValueError(f"{date_str}: card body is not closed")
+
+
+def migrate_pages(archive_path=ARCHIVE_PATH):
+    """
+    Replace full archive pages with fragments holding the content they
+    published (not a re-render, which could differ from what was shown).
+
+    Every page is extracted before anything is written; if one cannot be,
+    nothing is migrated and the pages are kept.
+    """
+    pages = {
+        date_str: Path(archive_path) / f"{date_str}.html"
+        for date_str in valid_dates(sorted(p.stem for p in Path(archive_path).glob("*.html")))
+    }
+    days = []
+    for date_str, path in pages.items():
+        with open(path, 'r', encoding='utf-8') as f:
+            days.append(extract_day(f.read(), date_str))
+
+    for day in days:
+        write_fragment(day, archive_path)
+    for day in days:
+        os.remove(pages[day['date']])
+
+    write_archive_shell(archive_path)
+    print(f"Migrated {len(days)} archive page(s) to fragments")
+    return [day['date'] for day in days]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive storage tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    static = subparsers.add_parser("static", help="render full pages from fragments")
+    static.add_argument("dates", nargs="*", help="dates to render (default: all fragments)")
+    subparsers.add_parser("migrate", help="convert full archive pages to fragments")
+    args = parser.parse_args()
+
+    if args.command == "static":
+        write_static_pages(args.dates)
+    else:
+        migrate_pages()
+
+
+if __name__ == "__main__":
+    main()
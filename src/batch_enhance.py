@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Batched Module Enhancement
+Packs several modules into one Claude prompt that returns a JSON array keyed
+by module id, caches each validated entry individually, and falls back to
+single-module calls only for entries that fail validation. All calls of a
+run share one session and one system prompt, so the shared prefix is
+processed once.
+
+Pre-generate enhancements for the whole rotation:
+    python src/batch_enhance.py --batch-size 8
+"""
+
+import argparse
+import asyncio
+import json
+
+from response_parser import request_json, validate_enhancement, record_field_results, get_parse_stats
+from enhancement_backends import get_backend
+from enhancement_prompts import system_prompt, build_batch_prompt
+from enhancement_cache import EnhancementCache
+from model_scheduler import LANE_BACKFILL, write_run_report
+
+BATCH_SIZE = 8
+
+
+def normalize_module_id(value):
+    """Compare ids as the zero-padded strings of modules.json, so 1, "1" and "001" match."""
+    text = str(value).strip()
+    return str(int(text)).zfill(3) if text.isdigit() else text
+
+
+def split_batch_response(data, modules):
+    """
+    Split a decoded JSON array into per-module entries.
+
+    Returns (valid, failed): valid maps module id to validated content,
+    failed lists the modules whose entry was missing or invalid.
+    """
+    entries = {}
+    if isinstance(data, list):
+        for entry in data:
+            if isinstance(entry, dict) and entry.get("module_id") is not None:
+                entries[normalize_module_id(entry["module_id"])] = entry
+
+    valid = {}
+    failed = []
+    for module in modules:
+        content, errors = validate_enhancement(entries.get(normalize_module_id(module['id'])))
+        record_field_results(content, errors)
+        if errors:
+            failed.append(module)
+        else:
+            valid[module['id']] = content
+    return valid, failed
+
+
+async def enhance_batch(modules, backend, cache):
+    """Enhance one batch of modules with a single Claude call."""
+    def validate(data):
+        valid, failed = split_batch_response(data, modules)
+        return valid, [module['id'] for module in failed]
+
+    # One attempt: entries that fail are retried with single-module calls
+    try:
+        valid, _ = await request_json(backend, build_batch_prompt(modules), system_prompt(), validate,
+                                      opener='[', attempts=1)
+    except Exception as e:
+        print(f"Batch enhancement failed: {e}")
+        valid = {}
+    failed = [module for module in modules if module['id'] not in valid]
+
+    for module in modules:
+        if module['id'] in valid:
+            cache.put(module, valid[module['id']])
+    return valid, failed
+
+
+async def enhance_modules_batched(modules, batch_size=BATCH_SIZE, backend=None, cache=None):
+    """
+    Ensure every module has cached enhanced content.
+
+    Cached modules are skipped; the rest are enhanced K at a time, and only
+    entries that fail validation are retried with single-module calls.
+    Returns a dict of module id -> enhanced content.
+    """
+    from generate_question import generate_enhanced_content
+
+    backend = backend or get_backend(lane=LANE_BACKFILL)
+    cache = cache or EnhancementCache()
+
+    results = {}
+    pending = []
+    for module in modules:
+        cached = cache.get(module)
+        if cached is not None:
+            results[module['id']] = cached
+        else:
+            pending.append(module)
+
+    print(f"已缓存 {len(results)} 个模块，待生成 {len(pending)} 个")
+
+    if not pending:
+        return results
+
+    calls = 0
+    fallbacks = []
+    try:
+        async with backend.session(system_prompt()) as session:
+            for start in range(0, len(pending), batch_size):
+                batch = pending[start:start + batch_size]
+                valid, failed = await enhance_batch(batch, session, cache)
+                calls += 1
+                results.update(valid)
+                fallbacks.extend(failed)
+
+            total_num = len(modules)
+            for module in fallbacks:
+                current_num = modules.index(module) + 1
+                results[module['id']] = await generate_enhanced_content(
+                    module, current_num, total_num, backend=session, cache=cache
+                )
+                calls += 1
+    except Exception as e:
+        print(f"Batch enhancement session failed: {e}")
+
+    print(f"批量生成完成: 1 次会话, {calls} 次调用, {len(fallbacks)} 个模块单独重试")
+    return results
+
+
+def main():
+    from generate_question import load_modules
+
+    parser = argparse.ArgumentParser(description="Pre-generate enhanced content for all modules")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    modules = load_modules()['modules']
+    asyncio.run(enhance_modules_batched(modules, batch_size=args.batch_size))
+    print(f"字段校验统计: {json.dumps(get_parse_stats(), ensure_ascii=False)}")
+    write_run_report()
+
+
+if __name__ == "__main__":
+    main()
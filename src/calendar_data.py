@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Calendar Data
+Precomputes the lunar calendar per year into <output>/calendar/<year>.json, so
+pages only embed the months around their own date and the browser fetches
+other years when the user navigates to them.
+
+Each month is encoded as
+    [year, month, first_weekday_offset, day_count, lunar_day_indexes]
+where lunar_day_indexes index LUNAR_DAY_NAMES. Which days are clickable is
+decided in the browser from the first content date and the page's date, so
+the year files only change if the lunar conversion does.
+
+<output>/site-state.json holds the time-dependent state shared by all pages (the
+latest published day). Pages read it at load time to extend the clickable
+range and navigation, so existing pages never need to be rewritten as days
+pass. Both are written by the build step (write_site_state) into the output
+root, docs/ by default.
+
+    python src/calendar_data.py
+"""
+
+import calendar
+import json
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+
+from lunarcalendar import Converter, Solar
+
+OUTPUT_ROOT = "docs"
+CALENDAR_DIR = "calendar"
+SITE_STATE_FILE = "site-state.json"
+
+# Chinese numerals for lunar dates
+LUNAR_DAY_NAMES = ['初一', '初二', '初三', '初四', '初五', '初六', '初七', '初八', '初九', '初十',
+                   '十一', '十二', '十三', '十四', '十五', '十六', '十七', '十八', '十九', '二十',
+                   '廿一', '廿二', '廿三', '廿四', '廿五', '廿六', '廿七', '廿八', '廿九', '三十']
+
+
+def month_key(year, month):
+    """Sequential month number (year * 12 + month - 1) used to order months."""
+    return year * 12 + month - 1
+
+
+@lru_cache(maxsize=None)
+def month_entry(year, month):
+    """Compact calendar entry for one month."""
+    offset, day_count = calendar.monthrange(year, month)
+    lunar_days = [
+        Converter.Solar2Lunar(Solar(year, month, day)).day - 1
+        for day in range(1, day_count + 1)
+    ]
+    return [year, month, offset, day_count, lunar_days]
+
+
+def calendar_range(first_date, page_date, as_of=None):
+    """
+    First and last navigable month keys: from the month of the first content
+    day to December of the latest year the page refers to (its own date or
+    as_of).
+    """
+    first = datetime.fromisoformat(first_date)
+    last_year = datetime.fromisoformat(max(page_date, as_of or page_date)).year
+    return month_key(first.year, first.month), month_key(last_year, 12)
+
+
+def page_months(page_date, first_key, last_key):
+    """Entries embedded in a page: its own month and the months either side."""
+    date_obj = datetime.fromisoformat(page_date)
+    current = month_key(date_obj.year, date_obj.month)
+    entries = []
+    for key in (current - 1, current, current + 1):
+        if first_key <= key <= last_key:
+            entries.append(month_entry(key // 12, key % 12 + 1))
+    return entries
+
+
+def write_calendar_years(first_year, last_year, calendar_path=Path(OUTPUT_ROOT) / CALENDAR_DIR):
+    """Write the year files that are missing or out of date; returns the years written."""
+    calendar_dir = Path(calendar_path)
+    written = []
+    for year in range(first_year, last_year + 1):
+        path = calendar_dir / f"{year}.json"
+        months = [month_entry(year, month) for month in range(1, 13)]
+        content = json.dumps(months, separators=(',', ':'))
+        if path.exists() and path.read_text(encoding='utf-8') == content:
+            continue
+        calendar_dir.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        written.append(year)
+    return written
+
+
+def write_site_state(last_date, first_date=None, output_root=OUTPUT_ROOT):
+    """
+    Record the latest published day in <output_root>/site-state.json and write
+    the calendar year files up to its year.
+    """
+    from generate_question import START_DATE
+
+    first_date = first_date or START_DATE
+    first_key, last_key = calendar_range(first_date, last_date)
+    write_calendar_years(first_key // 12, last_key // 12, Path(output_root) / CALENDAR_DIR)
+
+    state_file = Path(output_root) / SITE_STATE_FILE
+    state_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(state_file, 'w', encoding='utf-8') as f:
+        json.dump({"first_date": first_date, "last_date": last_date}, f, indent=2)
+        f.write("\n")
+
+
+def main():
+    write_site_state(datetime.now().strftime("%Y-%m-%d"))
+    print(f"Updated {OUTPUT_ROOT}/{SITE_STATE_FILE} and calendar data in {OUTPUT_ROOT}/{CALENDAR_DIR}/")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Concept Graph Index
+Precomputes a weighted concept co-occurrence graph from module and question
+key_concepts plus transcript mentions, so related lessons can be looked up
+without asking Claude for a connection hint. Questions come from the curated
+files in the repository root and the generated ones in question_bank/.
+
+The graph file stores a hash of the modules, question sets and transcripts
+it was built from and is rebuilt when any of them changes. Run directly to
+rebuild it unconditionally:
+    python src/concept_graph.py
+"""
+
+import hashlib
+import json
+import math
+import re
+from collections import defaultdict
+from pathlib import Path
+
+from transcripts import load_all_transcripts, transcript_text, TRANSCRIPT_DIR
+
+MODULES_PATH = "src/modules.json"
+QUESTIONS_GLOB = "episode_*_all_questions.json"
+QUESTION_DIRS = (".", "question_bank")
+GRAPH_PATH = "src/concept_graph.json"
+TOP_K = 5
+
+# Weight of a concept's neighbours relative to the concept itself when scoring
+NEIGHBOR_DECAY = 0.5
+
+
+def module_key(module_id):
+    return f"module:{module_id}"
+
+
+def episode_key(episode):
+    return f"episode:{int(episode)}"
+
+
+def parse_episode_numbers(episode_field):
+    """Parse a module's episode field ("1", "1-3", "2,5") into episode numbers."""
+    episodes = set()
+    for start, end in re.findall(r'(\d+)(?:\s*-\s*(\d+))?', str(episode_field)):
+        first = int(start)
+        last = int(end) if end else first
+        episodes.update(range(first, last + 1))
+    return sorted(episodes)
+
+
+def _question_episode(question, default_episode):
+    match = re.match(r'EP(\d+)-', question.get('id', ''))
+    return int(match.group(1)) if match else default_episode
+
+
+def load_question_sets(questions_glob=QUESTIONS_GLOB, base_dir="."):
+    """Load every episode question file; returns a list of (episode, questions)."""
+    question_sets = []
+    for file in sorted(Path(base_dir).glob(questions_glob)):
+        with open(file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        question_sets.append((data.get('episode', 0), data.get('questions', [])))
+    return question_sets
+
+
+def load_all_question_sets(question_dirs=QUESTION_DIRS):
+    """(episode, questions) from the curated files and the generated question bank."""
+    question_sets = []
+    for question_dir in question_dirs:
+        question_sets += load_question_sets(base_dir=question_dir)
+    return question_sets
+
+
+def load_modules_file(modules_path=MODULES_PATH):
+    if not Path(modules_path).exists():
+        return []
+    with open(modules_path, 'r', encoding='utf-8') as f:
+        return json.load(f)['modules']
+
+
+def source_hash(modules, question_sets, transcript_dir=TRANSCRIPT_DIR):
+    """Content hash of everything the graph is built from."""
+    payload = json.dumps([modules, question_sets, TOP_K], ensure_ascii=False, sort_keys=True)
+    digest = hashlib.sha256(payload.encode('utf-8'))
+    for path in sorted(Path(transcript_dir).glob("Episode_*_Transcript.txt")):
+        digest.update(path.name.encode('utf-8'))
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def build_concept_graph(modules, question_sets, transcripts, top_k=TOP_K):
+    """
+    Build the concept graph.
+
+    - edges: concept -> {concept: weight}, co-occurrence within one module or question
+    - postings: concept -> {item: weight}, where item is "module:<id>" or "episode:<n>"
+    - related: module id -> precomputed top related modules and episodes
+    """
+    edges = defaultdict(lambda: defaultdict(float))
+    postings = defaultdict(lambda: defaultdict(float))
+
+    def add_concept_set(concepts, items, weight=1.0):
+        concepts = sorted(set(c for c in concepts if c))
+        for concept in concepts:
+            for item in items:
+                postings[concept][item] += weight
+            for other in concepts:
+                if other != concept:
+                    edges[concept][other] += weight
+
+    modules_info = {}
+    for module in modules:
+        episodes = parse_episode_numbers(module.get('episode', ''))
+        items = [module_key(module['id'])] + [episode_key(ep) for ep in episodes]
+        add_concept_set(module.get('key_concepts', []), items)
+        modules_info[module['id']] = {
+            "title": module['title'],
+            "episode": str(module.get('episode', '')),
+            "episodes": episodes,
+            "concepts": module.get('key_concepts', [])
+        }
+
+    for default_episode, questions in question_sets:
+        for question in questions:
+            episode = _question_episode(question, default_episode)
+            add_concept_set(question.get('key_concepts', []), [episode_key(episode)])
+
+    # Transcript mentions: tf-idf weighted concept -> episode postings
+    episodes_info = {}
+    texts = {}
+    for transcript in transcripts:
+        episodes_info[str(transcript['episode'])] = {
+            "title": transcript['title'],
+            "video_url": transcript['video_url']
+        }
+        texts[transcript['episode']] = transcript_text(transcript)
+
+    if texts:
+        for concept in list(postings):
+            counts = {ep: text.count(concept) for ep, text in texts.items()}
+            counts = {ep: n for ep, n in counts.items() if n}
+            if not counts:
+                continue
+            idf = math.log(1 + len(texts) / len(counts))
+            for ep, n in counts.items():
+                postings[concept][episode_key(ep)] += (1 + math.log(n)) * idf / len(texts) * 10
+
+    graph = {
+        "edges": {c: dict(sorted(n.items())) for c, n in sorted(edges.items())},
+        "postings": {c: {k: round(w, 4) for k, w in sorted(p.items())} for c, p in sorted(postings.items())},
+        "modules": modules_info,
+        "episodes": episodes_info,
+        "related": {}
+    }
+
+    for module_id, info in modules_info.items():
+        graph["related"][module_id] = query_related(
+            graph, info["concepts"],
+            exclude_module=module_id, exclude_episodes=info["episodes"], top_k=top_k
+        )
+
+    return graph
+
+
+def query_related(graph, concepts, exclude_module=None, exclude_episodes=(), top_k=TOP_K):
+    """Score modules and episodes against a concept list using the graph."""
+    scores = defaultdict(float)
+    shared = defaultdict(set)
+    edges = graph["edges"]
+    postings = graph["postings"]
+
+    weighted_concepts = defaultdict(float)
+    for concept in concepts:
+        weighted_concepts[concept] += 1.0
+        neighbors = edges.get(concept, {})
+        total = sum(neighbors.values())
+        for neighbor, weight in neighbors.items():
+            weighted_concepts[neighbor] += NEIGHBOR_DECAY * weight / total
+
+    direct = set(concepts)
+    for concept, concept_weight in weighted_concepts.items():
+        for item, weight in postings.get(concept, {}).items():
+            scores[item] += concept_weight * weight
+            if concept in direct:
+                shared[item].add(concept)
+
+    excluded = {module_key(exclude_module)} if exclude_module else set()
+    excluded.update(episode_key(ep) for ep in exclude_episodes)
+
+    ranked = sorted(
+        ((item, score) for item, score in scores.items() if item not in excluded),
+        key=lambda pair: (-pair[1], pair[0])
+    )
+
+    related = {"modules": [], "episodes": []}
+    for item, score in ranked:
+        kind, ident = item.split(":", 1)
+        bucket = related[f"{kind}s"]
+        if len(bucket) < top_k:
+            bucket.append({"id": ident, "score": round(score, 4), "shared": sorted(shared[item])})
+    return related
+
+
+def related_lessons(graph, module, top_k=TOP_K):
+    """
+    Return the related modules and episodes for a module.
+
+    Uses the precomputed entry when available (a dict lookup), otherwise
+    scores the module's concepts against the graph.
+    """
+    related = graph["related"].get(module['id'])
+    if related is None:
+        related = query_related(
+            graph, module.get('key_concepts', []),
+            exclude_module=module['id'],
+            exclude_episodes=parse_episode_numbers(module.get('episode', '')),
+            top_k=top_k
+        )
+    return {
+        "modules": [
+            dict(entry,
+                 title=graph["modules"].get(entry["id"], {}).get("title", entry["id"]),
+                 episode=graph["modules"].get(entry["id"], {}).get("episode", ""))
+            for entry in related["modules"][:top_k]
+        ],
+        "episodes": [
+            dict(entry, **graph["episodes"].get(entry["id"], {"title": f"第{entry['id']}集", "video_url": ""}))
+            for entry in related["episodes"][:top_k]
+        ]
+    }
+
+
+def connection_hint(related):
+    """Build a deterministic connection hint sentence from related lessons."""
+    if related["modules"]:
+        best = related["modules"][0]
+        if best["shared"]:
+            concepts = "」「".join(best["shared"][:3])
+            return f"本模块的「{concepts}」也出现在「{best['title']}」中，可对照复习，体会二者的联系。"
+        return f"可与「{best['title']}」对照学习，思考二者的联系。"
+    if related["episodes"]:
+        episodes = "、".join(f"第{entry['id']}集" for entry in related["episodes"][:3])
+        return f"本模块的核心概念在{episodes}中也有讲解，可对照观看加深理解。"
+    return "思考本模块与整体命理体系的关系。"
+
+
+def save_concept_graph(graph, graph_path=GRAPH_PATH):
+    """Save the concept graph to JSON."""
+    graph_file = Path(graph_path)
+    graph_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(graph_file, 'w', encoding='utf-8') as f:
+        json.dump(graph, f, ensure_ascii=False, separators=(',', ':'))
+    print(f"Generated concept graph: {graph_file}")
+
+
+def rebuild_concept_graph(modules, question_sets, graph_path=GRAPH_PATH, source=None):
+    """Build the graph from the current transcripts and save it with its source hash."""
+    graph = build_concept_graph(modules, question_sets, load_all_transcripts(TRANSCRIPT_DIR))
+    graph["source"] = source or source_hash(modules, question_sets)
+    save_concept_graph(graph, graph_path)
+    return graph
+
+
+def load_concept_graph(graph_path=GRAPH_PATH, modules=None):
+    """
+    Load the concept graph, rebuilding it first if it does not exist or the
+    modules, question sets or transcripts changed since it was built.
+    """
+    if modules is None:
+        modules = load_modules_file()
+    question_sets = load_all_question_sets()
+    source = source_hash(modules, question_sets)
+
+    graph_file = Path(graph_path)
+    if graph_file.exists():
+        with open(graph_file, 'r', encoding='utf-8') as f:
+            graph = json.load(f)
+        if graph.get("source") == source:
+            return graph
+
+    return rebuild_concept_graph(modules, question_sets, graph_path, source)
+
+
+def main():
+    graph = rebuild_concept_graph(load_modules_file(), load_all_question_sets())
+    print(f"Concepts: {len(graph['edges'])}, modules: {len(graph['modules'])}, "
+          f"episodes: {len(graph['episodes'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Date Utilities
+Batch conversions for lists of ISO dates ("YYYY-MM-DD"): day ordinals,
+module rotation indices, weekdays and display strings. Dates are handled as
+integer day ordinals (the same numbering as date.toordinal()) and labels
+come from precomputed tables, so listing tens of thousands of archive dates
+does no datetime parsing or strftime calls.
+"""
+
+from bisect import bisect_right
+
+# Monday first, matching date.weekday()
+WEEKDAY_LABELS = ['星期一', '星期二', '星期三', '星期四', '星期五', '星期六', '星期日']
+MONTH_LABELS = [''] + [f"{month:02d}月" for month in range(1, 13)]
+DAY_LABELS = [''] + [f"{day:02d}日" for day in range(1, 32)]
+
+DAYS_IN_MONTH = [0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+# Days before the first of each month in a non-leap year
+DAYS_BEFORE_MONTH = [0, 0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334]
+
+
+def _is_leap(year):
+    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+
+
+def ymd_to_ordinal(year, month, day):
+    """Day ordinal of a date, with 0001-01-01 as day 1 (like date.toordinal())."""
+    y = year - 1
+    days = y * 365 + y // 4 - y // 100 + y // 400 + DAYS_BEFORE_MONTH[month] + day
+    if month > 2 and _is_leap(year):
+        days += 1
+    return days
+
+
+def _month_base(year_month):
+    """(ordinal of the day before the 1st, days in month) for "YYYY-MM", or None."""
+    if len(year_month) != 7 or year_month[4] != '-' or not (year_month[:4] + year_month[5:]).isdigit():
+        return None
+    year, month = int(year_month[:4]), int(year_month[5:])
+    if year < 1 or not 1 <= month <= 12:
+        return None
+    month_days = 29 if month == 2 and _is_leap(year) else DAYS_IN_MONTH[month]
+    return ymd_to_ordinal(year, month, 1) - 1, month_days
+
+
+def to_ordinals(date_strs):
+    """
+    Convert ISO date strings to day ordinals in one pass.
+
+    Month bases are computed once per distinct month, so each date costs a
+    dictionary lookup and an addition. Strings that are not valid dates map
+    to None.
+    """
+    bases = {}
+    ordinals = []
+    for date_str in date_strs:
+        year_month = date_str[:7]
+        if year_month not in bases:
+            bases[year_month] = _month_base(year_month)
+        base = bases[year_month]
+        day = date_str[8:]
+        if base is None or len(date_str) != 10 or date_str[7] != '-' or not day.isdigit():
+            ordinals.append(None)
+            continue
+        day = int(day)
+        ordinals.append(base[0] + day if 1 <= day <= base[1] else None)
+    return ordinals
+
+
+def valid_dates(date_strs):
+    """Keep only the strings that are valid ISO dates, in their original order."""
+    return [s for s, ordinal in zip(date_strs, to_ordinals(date_strs)) if ordinal is not None]
+
+
+def rotation_segments(start, module_count, skipped=None):
+    """
+    The rotation as (first_ordinal, position, active_indices) segments.
+
+    Each skip date starts a new segment that cycles over the modules not
+    skipped by then, anchored so that it continues with the next active
+    module after the one shown the day before. Earlier dates are unchanged
+    and no module is shown on two days in a row.
+    """
+    segments = [(start, 0, list(range(module_count)))]
+    boundaries = sorted({max(ordinal, start) for ordinal in (skipped or {}).values()})
+    for boundary in boundaries:
+        active = [
+            index for index in range(module_count)
+            if index not in skipped or max(skipped[index], start) > boundary
+        ]
+        if not active:
+            # Never skip every module
+            continue
+        if boundary == start:
+            segments = [(start, 0, active)]
+            continue
+        previous = segment_index(segments[-1], boundary - 1)
+        following = next((index for index in active if index > previous), active[0])
+        segments.append((boundary, active.index(following), active))
+    return segments
+
+
+def segment_index(segment, ordinal):
+    first, position, active = segment
+    return active[(position + ordinal - first) % len(active)]
+
+
+def module_indices(ordinals, start_date, module_count, skipped=None):
+    """
+    Rotation index of the module shown on each date (see calculate_daily_module).
+
+    skipped maps a rotation index to the first ordinal on which that module
+    is skipped (a duplicate, see question_dedup.py). From then on the
+    rotation runs over the remaining modules only, picking up after the
+    module shown the day before; dates before the skip keep their module.
+    """
+    start = to_ordinals([start_date])[0]
+    segments = rotation_segments(start, module_count, skipped)
+    firsts = [segment[0] for segment in segments]
+    indices = []
+    for ordinal in ordinals:
+        ordinal = max(ordinal, start)
+        indices.append(segment_index(segments[bisect_right(firsts, ordinal) - 1], ordinal))
+    return indices
+
+
+def weekdays(ordinals):
+    """Weekday of each ordinal, Monday = 0 (ordinal 1 is a Monday)."""
+    return [(ordinal + 6) % 7 for ordinal in ordinals]
+
+
+def weekday_labels(ordinals):
+    """Chinese weekday labels (星期一 … 星期日)."""
+    return [WEEKDAY_LABELS[weekday] for weekday in weekdays(ordinals)]
+
+
+def display_dates(date_strs):
+    """Chinese display strings like 2026年01月21日 for valid ISO dates."""
+    month_prefixes = {}
+    labels = []
+    for s in date_strs:
+        year_month = s[:7]
+        prefix = month_prefixes.get(year_month)
+        if prefix is None:
+            prefix = month_prefixes[year_month] = f"{s[:4]}年{MONTH_LABELS[int(s[5:7])]}"
+        labels.append(prefix + DAY_LABELS[int(s[8:10])])
+    return labels
+
+
+def slash_dates(date_strs):
+    """Display strings like 2026/01/21 for valid ISO dates."""
+    return [s.replace('-', '/') for s in date_strs]
@@ -0,0 +1,494 @@
+#!/usr/bin/env python3
+"""
+Local Development Server
+Serves a preview copy of docs/ on localhost, watches the generator sources
+and rebuilds only the pages affected by a change, then tells open browsers
+to reload over a WebSocket.
+
+    python src/generate_question.py serve
+    python src/dev_server.py --port 8000
+
+docs/ is copied to .build-cache/preview when the server starts, and pages
+are rebuilt there only, so previewing never touches the published site.
+Pages are rendered from the enhancement cache (or the default content), so
+editing never triggers a Claude call. The service worker is disabled in the
+preview (a cache-first worker would keep serving the old pages).
+"""
+
+import argparse
+import base64
+import ctypes
+import ctypes.util
+import fnmatch
+import hashlib
+import importlib
+import json
+import os
+import queue
+import re
+import select
+import shutil
+import struct
+import sys
+import threading
+import time
+from datetime import datetime
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from pathlib import Path
+
+import generate_question
+import concept_graph
+import enhancement_prompts
+import archive_store
+import calendar_data
+
+DOCS_PATH = "docs"
+PREVIEW_PATH = ".build-cache/preview"
+WATCH_DIRS = [".", "src", "templates", "src/enhancement_cache", "src/episode_outlines", "question_bank"]
+WATCH_SUFFIXES = (".py", ".html", ".json", ".css", ".js")
+POLL_INTERVAL = 0.3
+EPISODE_FILE_RE = re.compile(r'episode_(\d+)')
+# Generator modules in dependency order, so each one is re-executed against the
+# already reloaded versions of the modules it imports
+RENDER_MODULES = (
+    "date_utils", "response_parser", "transcripts", "calendar_data", "optimize",
+    "enhancement_backends", "model_scheduler", "enhancement_prompts", "enhancement_cache",
+    "concept_graph", "transcript_index", "archive_store", "lunar_calendar_template",
+    "episode_summary", "question_dedup", "teachback_keywords", "search_index",
+    "service_worker", "font_subset", "generate_question",
+)
+DEBOUNCE = 0.05
+LIVERELOAD_PATH = "/__livereload"
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+RELOAD_SCRIPT = f'''<script>
+(function() {{
+    const ws = new WebSocket((location.protocol === 'https:' ? 'wss://' : 'ws://') + location.host + '{LIVERELOAD_PATH}');
+    ws.onmessage = function(event) {{ if (event.data === 'reload') location.reload(); }};
+}})();
+</script>'''
+
+# Runs before the page scripts: keeps them from registering the service worker
+# and removes a worker registered by an earlier visit
+NO_SERVICE_WORKER_SCRIPT = '''<script>
+if ('serviceWorker' in navigator) {
+    navigator.serviceWorker.register = () => Promise.resolve();
+    navigator.serviceWorker.getRegistrations().then(rs => rs.forEach(r => r.unregister()));
+}
+</script>'''
+
+# Served as sw.js: a worker installed before the preview started (which would
+# answer from its cache, page included) replaces itself with this one, which
+# clears the caches, unregisters and reloads the open pages
+SERVICE_WORKER_KILL_SWITCH = '''self.addEventListener('install', () => self.skipWaiting());
+self.addEventListener('activate', event => {
+    event.waitUntil(
+        caches.keys()
+            .then(keys => Promise.all(keys.map(key => caches.delete(key))))
+            .then(() => self.registration.unregister())
+            .then(() => self.clients.matchAll({ type: 'window' }))
+            .then(clients => clients.forEach(client => client.navigate(client.url)))
+    );
+});
+'''
+
+# Output targets: "main" (docs/index.html), "index" (archive index) or an archive date
+ALL_PAGES = "*"
+
+
+# ---------------------------------------------------------------------------
+# File watching
+# ---------------------------------------------------------------------------
+
+class InotifyWatcher:
+    """Linux inotify watcher (via ctypes) for a set of directories."""
+
+    IN_MODIFY = 0x002
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    EVENT_HEADER = struct.Struct("iIII")
+
+    def __init__(self, directories):
+        libc_name = ctypes.util.find_library("c")
+        if not libc_name or not sys.platform.startswith("linux"):
+            raise OSError("inotify is not available")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        mask = self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE | self.IN_DELETE | self.IN_MODIFY
+        self.watches = {}
+        for directory in directories:
+            if not Path(directory).is_dir():
+                continue
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), mask)
+            if wd >= 0:
+                self.watches[wd] = Path(directory)
+
+    def wait(self, timeout):
+        """Block up to timeout seconds; return the set of changed paths."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        changed = set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+
+        offset = 0
+        while offset < len(data):
+            wd, _, _, length = self.EVENT_HEADER.unpack_from(data, offset)
+            offset += self.EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0").decode("utf-8", "replace")
+            offset += length
+            if wd in self.watches and name:
+                changed.add(self.watches[wd] / name)
+        return changed
+
+
+class PollingWatcher:
+    """Fallback watcher comparing file modification times."""
+
+    def __init__(self, directories):
+        self.directories = [Path(d) for d in directories]
+        self.snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        for directory in self.directories:
+            if not directory.is_dir():
+                continue
+            for path in directory.iterdir():
+                if path.is_file():
+                    try:
+                        snapshot[path] = path.stat().st_mtime_ns
+                    except FileNotFoundError:
+                        continue
+        return snapshot
+
+    def wait(self, timeout):
+        time.sleep(timeout)
+        current = self._scan()
+        changed = {path for path, mtime in current.items() if self.snapshot.get(path) != mtime}
+        changed |= set(self.snapshot) - set(current)
+        self.snapshot = current
+        return changed
+
+
+def create_watcher(directories):
+    try:
+        watcher = InotifyWatcher(directories)
+        print("Watching sources with inotify")
+        return watcher
+    except OSError:
+        print("Watching sources by polling")
+        return PollingWatcher(directories)
+
+
+# ---------------------------------------------------------------------------
+# Dependency mapping and rebuilding
+# ---------------------------------------------------------------------------
+
+def question_file_episode(path):
+    """Episode of a question set file, from its name or else its content; None if unknown."""
+    match = EPISODE_FILE_RE.search(path.name)
+    if match:
+        return int(match.group(1))
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('episode')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def prepare_preview(docs_path=DOCS_PATH, preview_path=PREVIEW_PATH):
+    """Fresh copy of docs/ to serve and rebuild; precompressed siblings are left out."""
+    preview = Path(preview_path)
+    if preview.exists():
+        shutil.rmtree(preview)
+    shutil.copytree(docs_path, preview, ignore=shutil.ignore_patterns("*.gz", "*.br"))
+    return preview
+
+
+class SiteBuilder:
+    """Maps changed source files to dependent pages and re-renders them into the preview."""
+
+    def __init__(self, docs_path=PREVIEW_PATH):
+        self.docs_path = Path(docs_path)
+        self.archive_path = self.docs_path / "archive"
+        self.cache = generate_question.EnhancementCache()
+        self.reload_data()
+
+    def reload_data(self):
+        self.modules = generate_question.load_modules()['modules']
+        self.module_snapshot = {m['id']: json.dumps(m, sort_keys=True, ensure_ascii=False) for m in self.modules}
+        self.concept_graph = concept_graph.load_concept_graph(modules=self.modules)
+        # The system prompt carries the course outline, so cached content is matched against the new one
+        enhancement_prompts.system_prompt.cache_clear()
+
+    def archive_dates(self):
+        return archive_store.list_archived_dates(self.archive_path)
+
+    def dates_for_modules(self, module_ids):
+        """Archive dates on which any of the given modules is shown."""
+        return {
+            date_str for date_str in self.archive_dates()
+            if generate_question.calculate_daily_module(self.modules, target_date=date_str)[0]['id'] in module_ids
+        }
+
+    def dates_for_episode(self, episode):
+        """Archive dates of the modules that cover the given episode."""
+        return self.dates_for_modules({
+            module['id'] for module in self.modules
+            if episode in concept_graph.parse_episode_numbers(module.get('episode', ''))
+        })
+
+    def affected_outputs(self, changed_paths):
+        """
+        Map changed source files to the outputs that depend on them.
+
+        Returns a set of targets: archive dates, "main", "index", or ALL_PAGES.
+        """
+        targets = set()
+        for path in changed_paths:
+            path = Path(os.path.normpath(path))
+            name = path.name
+            if not name.endswith(WATCH_SUFFIXES) or name.startswith("."):
+                continue
+
+            if path.parent.name == "enhancement_cache":
+                targets |= self.dates_for_modules({path.stem})
+                targets.add("main")
+            elif path.parent.name == "episode_outlines":
+                targets |= self.dates_for_episode(int(path.stem.split("_")[-1]))
+                targets.add("main")
+            elif path.parent.name == "question_bank" or fnmatch.fnmatch(name, concept_graph.QUESTIONS_GLOB):
+                episode = question_file_episode(path)
+                if episode is None:
+                    return {ALL_PAGES}
+                # Related lessons come from the concept graph, which is built from the question sets
+                self.reload_data()
+                targets |= self.dates_for_episode(episode)
+                targets.add("main")
+            elif name == "modules.json":
+                old_snapshot = self.module_snapshot
+                self.reload_data()
+                if len(old_snapshot) != len(self.module_snapshot):
+                    return {ALL_PAGES}
+                changed_ids = {
+                    module_id for module_id, dumped in self.module_snapshot.items()
+                    if old_snapshot.get(module_id) != dumped
+                }
+                targets |= self.dates_for_modules(changed_ids)
+                targets |= {"main", "index"}
+            elif name in ("concept_graph.json", "question_duplicates.json", "teachback_keywords.json") or name.endswith(".py") or path.parent.name == "templates":
+                # Calendar/page templates and generator code affect every page
+                if name.endswith(".py"):
+                    self.reload_code()
+                else:
+                    self.reload_data()
+                return {ALL_PAGES}
+        return targets
+
+    def reload_code(self):
+        """Re-import the generator modules so template and code edits take effect."""
+        for name in RENDER_MODULES:
+            importlib.reload(importlib.import_module(name))
+        self.cache = generate_question.EnhancementCache()
+        self.reload_data()
+
+    def render_day(self, date_str):
+        gq = generate_question
+        module, current_num, total_num = gq.calculate_daily_module(self.modules, target_date=date_str)
+        related = concept_graph.related_lessons(self.concept_graph, module)
+        enhanced_content = self.cache.get(module) or gq.default_enhancement(module, related)
+        return gq.render_day_content(module, current_num, total_num, date_str, enhanced_content, related)
+
+    def render_date(self, date_str, is_archive_page):
+        return generate_question.render_page(self.render_day(date_str), is_archive_page)
+
+    def rebuild(self, targets):
+        today_str = datetime.now().strftime("%Y-%m-%d")
+        if ALL_PAGES in targets:
+            targets = set(self.archive_dates()) | {"main", "index"}
+
+        for target in sorted(targets):
+            if target == "main":
+                calendar_data.write_site_state(today_str, output_root=self.docs_path)
+                html = self.render_date(today_str, is_archive_page=False)
+                with open(self.docs_path / "index.html", 'w', encoding='utf-8') as f:
+                    f.write(html)
+            elif target == "index":
+                generate_question.generate_archive_index(self.modules, str(self.archive_path))
+                if archive_store.ARCHIVE_MODE == "fragments":
+                    archive_store.write_archive_shell(self.archive_path)
+            elif archive_store.fragment_path(target, self.archive_path).exists():
+                archive_store.write_fragment(self.render_day(target), self.archive_path)
+            else:
+                html = self.render_date(target, is_archive_page=True)
+                with open(self.archive_path / f"{target}.html", 'w', encoding='utf-8') as f:
+                    f.write(html)
+        return targets
+
+
+# ---------------------------------------------------------------------------
+# HTTP + WebSocket live reload
+# ---------------------------------------------------------------------------
+
+class LiveReloadHub:
+    """Keeps open WebSocket connections and broadcasts reload messages."""
+
+    def __init__(self):
+        self.clients = set()
+        self.lock = threading.Lock()
+
+    def add(self, sock):
+        with self.lock:
+            self.clients.add(sock)
+
+    def remove(self, sock):
+        with self.lock:
+            self.clients.discard(sock)
+
+    def broadcast(self, message):
+        payload = message.encode('utf-8')
+        frame = bytes([0x81, len(payload)]) + payload
+        with self.lock:
+            for sock in list(self.clients):
+                try:
+                    sock.sendall(frame)
+                except OSError:
+                    self.clients.discard(sock)
+
+
+class DevRequestHandler(SimpleHTTPRequestHandler):
+    """
+    Serves the preview, injects the reload script into HTML (and disables the
+    service worker) and upgrades /__livereload.
+    """
+
+    hub = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == LIVERELOAD_PATH and self.headers.get("Upgrade", "").lower() == "websocket":
+            self.handle_websocket()
+            return
+
+        path = Path(self.translate_path(self.path))
+        if path.is_dir():
+            path = path / "index.html"
+        if path.name == "sw.js":
+            self.send_text(SERVICE_WORKER_KILL_SWITCH, "text/javascript; charset=utf-8")
+            return
+        if path.suffix == ".html" and path.exists():
+            html = path.read_text(encoding='utf-8')
+            html = html.replace("<head>", "<head>\n" + NO_SERVICE_WORKER_SCRIPT, 1)
+            html = html.replace("</body>", RELOAD_SCRIPT + "\n</body>", 1)
+            self.send_text(html, "text/html; charset=utf-8")
+            return
+
+        super().do_GET()
+
+    def send_text(self, text, content_type):
+        body = text.encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_websocket(self):
+        key = self.headers.get("Sec-WebSocket-Key", "")
+        accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode()).digest()).decode()
+        self.send_response(101, "Switching Protocols")
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", accept)
+        self.end_headers()
+        self.wfile.flush()
+
+        sock = self.connection
+        self.hub.add(sock)
+        try:
+            # Block until the browser closes the connection
+            while sock.recv(1024):
+                pass
+        except OSError:
+            pass
+        finally:
+            self.hub.remove(sock)
+            self.close_connection = True
+
+
+def watch_and_rebuild(builder, hub, watch_dirs=WATCH_DIRS):
+    """Background worker: collect changes, rebuild affected pages, push reload."""
+    watcher = create_watcher(watch_dirs)
+    events = queue.Queue()
+
+    def produce():
+        while True:
+            for path in watcher.wait(POLL_INTERVAL):
+                events.put(path)
+
+    threading.Thread(target=produce, daemon=True).start()
+
+    while True:
+        changed = {events.get()}
+        # Coalesce bursts of events from a single save
+        time.sleep(DEBOUNCE)
+        while not events.empty():
+            changed.add(events.get())
+
+        started = time.perf_counter()
+        try:
+            targets = builder.affected_outputs(changed)
+            if not targets:
+                continue
+            rebuilt = builder.rebuild(targets)
+        except Exception as e:
+            print(f"Rebuild failed: {e}")
+            continue
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"Rebuilt {len(rebuilt)} page(s) in {elapsed:.0f} ms: {', '.join(sorted(rebuilt)[:5])}")
+        hub.broadcast("reload")
+
+
+def serve(port=8000, docs_path=DOCS_PATH, preview_path=PREVIEW_PATH):
+    preview = prepare_preview(docs_path, preview_path)
+    builder = SiteBuilder(preview)
+    hub = LiveReloadHub()
+
+    handler = partial(DevRequestHandler, directory=str(preview))
+    DevRequestHandler.hub = hub
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+
+    threading.Thread(target=watch_and_rebuild, args=(builder, hub), daemon=True).start()
+    print(f"Serving a preview of {docs_path}/ from {preview}/ at http://127.0.0.1:{port}/ (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a preview of docs/ with live rebuild")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args(argv)
+    serve(args.port)
+
+
+if __name__ == "__main__":
+    main()
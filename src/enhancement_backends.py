@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+Enhancement Backends
+Pluggable text-generation backends for generate_enhanced_content:
+
+- claude:  the real Claude Agent SDK query()
+- record:  Claude, with every response captured to the fixture store
+- replay:  serve recorded responses locally, with configurable latency,
+           failure injection and provider-style throttling (no CLI or
+           network needed)
+
+Select one with the ENHANCEMENT_BACKEND environment variable. get_backend()
+routes every backend through the shared model scheduler (model_scheduler.py)
+for rate limiting, priority lanes and cost accounting. Run directly for an
+offline load test of the concurrent enhancement path:
+    ENHANCEMENT_BACKEND=replay REPLAY_SYNTHESIZE=1 python src/enhancement_backends.py --requests 200
+
+The replay backend raises BackendError for prompts that were never recorded;
+REPLAY_SYNTHESIZE=1 serves a canned reply instead, for load tests only.
+
+With REPLAY_RATE_LIMIT=20 the replay backend rejects calls beyond 20 per
+second, like a throttling provider; compare MODEL_RPM=1200 (scheduled) with
+MODEL_RPM=0 (unscheduled).
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+from collections import deque
+from contextlib import aclosing, asynccontextmanager
+from pathlib import Path
+
+FIXTURE_DIR = os.getenv("ENHANCEMENT_FIXTURES", "fixtures/claude_responses")
+# Prompts per Claude conversation before a fresh one is opened; every prompt
+# in a conversation resends all earlier turns, so long sessions grow costly
+SESSION_MAX_PROMPTS = int(os.getenv("CLAUDE_SESSION_PROMPTS", "4"))
+
+# Canned reply used by the replay backend when synthesizing missing fixtures
+SYNTHETIC_RESPONSE = json.dumps({
+    "daily_tip": "先看视频再读教材，把核心概念用自己的话讲一遍。",
+    "deeper_question": "这个概念在日常生活中有哪些体现？",
+    "connection_hint": "对照前面学过的模块，找出相同的概念。",
+    "motivation": "学而时习之，不亦说乎。"
+}, ensure_ascii=False)
+
+
+class BackendError(Exception):
+    """Raised when a backend cannot produce a response."""
+
+
+class ThrottledError(BackendError):
+    """Raised when the provider rejects a call for rate reasons; safe to retry later."""
+
+
+def prompt_key(prompt, system=None):
+    """Stable fixture key for a prompt and its system prompt."""
+    text = f"{system}\0{prompt}" if system else prompt
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+class FixtureStore:
+    """Directory of recorded prompt/response pairs, one JSON file per prompt."""
+
+    def __init__(self, fixture_dir=FIXTURE_DIR):
+        self.fixture_dir = Path(fixture_dir)
+
+    def path_for(self, prompt, system=None):
+        return self.fixture_dir / f"{prompt_key(prompt, system)}.json"
+
+    def load(self, prompt, system=None):
+        path = self.path_for(prompt, system)
+        if not path.exists():
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)['response']
+
+    def save(self, prompt, response, system=None):
+        path = self.path_for(prompt, system)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"system": system, "prompt": prompt, "response": response}, f, ensure_ascii=False, indent=2)
+
+
+class EnhancementBackend:
+    """
+    Interface for enhancement backends.
+
+    stream() is an async generator yielding response text chunks; callers may
+    stop iterating early once they have what they need. system is the shared
+    prefix (see enhancement_prompts.py), sent separately so the provider can
+    cache it.
+
+    session() opens a backend for a sequence of calls with the same system
+    prompt (e.g. one batch); backends that keep a conversation open reuse it
+    for every call in the session.
+    """
+
+    name = "base"
+
+    async def stream(self, prompt, system=None):
+        raise NotImplementedError
+        yield  # pragma: no cover
+
+    @asynccontextmanager
+    async def session(self, system=None):
+        yield self
+
+
+class ClaudeSDKBackend(EnhancementBackend):
+    """Generate text with the Claude Agent SDK."""
+
+    name = "claude"
+
+    def __init__(self, max_turns=1):
+        self.max_turns = max_turns
+
+    def options(self, system=None):
+        from claude_code_sdk import ClaudeCodeOptions
+
+        return ClaudeCodeOptions(
+            allowed_tools=[],  # No tools needed, just text generation
+            max_turns=self.max_turns,
+            system_prompt=system
+        )
+
+    async def stream(self, prompt, system=None):
+        from claude_code_sdk import query, AssistantMessage, TextBlock
+
+        # Closing the query ends the CLI process when the caller stops early
+        async with aclosing(query(prompt=prompt, options=self.options(system))) as messages:
+            async for message in messages:
+                if isinstance(message, AssistantMessage):
+                    for block in message.content:
+                        if isinstance(block, TextBlock):
+                            yield block.text
+
+    @asynccontextmanager
+    async def session(self, system=None):
+        session = ClaudeSessionBackend(self.options(system))
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
+class ClaudeSessionBackend(EnhancementBackend):
+    """
+    Calls within an open Claude conversation, so the CLI is started and the
+    system prompt processed once per conversation rather than once per call.
+    Every call adds its prompt and response to the conversation, so after
+    max_prompts calls (SESSION_MAX_PROMPTS) the next one opens a fresh
+    conversation. Calls run one at a time; the system prompt was fixed when
+    the session was opened.
+    """
+
+    name = "claude"
+
+    def __init__(self, options, max_prompts=SESSION_MAX_PROMPTS):
+        self.options = options
+        self.max_prompts = max(1, max_prompts)
+        self.client = None
+        self.prompts = 0
+        self.response = None
+
+    async def _drain(self):
+        # Finish reading a response the previous caller stopped early
+        if self.response is not None:
+            async for _ in self.response:
+                pass
+            self.response = None
+
+    async def _conversation(self):
+        """The open client, replaced by a fresh one once it has had max_prompts calls."""
+        from claude_code_sdk import ClaudeSDKClient
+
+        await self._drain()
+        if self.client is not None and self.prompts >= self.max_prompts:
+            await self.close()
+        if self.client is None:
+            self.client = ClaudeSDKClient(options=self.options)
+            await self.client.connect()
+            self.prompts = 0
+        self.prompts += 1
+        return self.client
+
+    async def close(self):
+        if self.client is not None:
+            self.response = None
+            await self.client.disconnect()
+            self.client = None
+
+    async def stream(self, prompt, system=None):
+        from claude_code_sdk import AssistantMessage, TextBlock
+
+        client = await self._conversation()
+        await client.query(prompt)
+        self.response = client.receive_response()
+        async for message in self.response:
+            if isinstance(message, AssistantMessage):
+                for block in message.content:
+                    if isinstance(block, TextBlock):
+                        yield block.text
+        self.response = None
+
+    @asynccontextmanager
+    async def session(self, system=None):
+        yield self
+
+
+class RecordingBackend(EnhancementBackend):
+    """Pass through to another backend and record complete responses."""
+
+    name = "record"
+
+    def __init__(self, inner, store):
+        self.inner = inner
+        self.store = store
+
+    async def stream(self, prompt, system=None):
+        chunks = []
+        async with aclosing(self.inner.stream(prompt, system)) as stream:
+            async for chunk in stream:
+                chunks.append(chunk)
+        # Read the whole response before yielding so the fixture is complete
+        # even if the caller stops early
+        response = ''.join(chunks)
+        self.store.save(prompt, response, system)
+        for chunk in chunks:
+            yield chunk
+
+    @asynccontextmanager
+    async def session(self, system=None):
+        async with self.inner.session(system) as inner:
+            yield RecordingBackend(inner, self.store)
+
+
+class ReplayBackend(EnhancementBackend):
+    """
+    Serve recorded responses from the fixture store.
+
+    latency is the simulated time to first chunk in seconds (with +/- jitter
+    as a fraction of it), failure_rate the probability of raising
+    BackendError, and synthesize serves SYNTHETIC_RESPONSE for prompts that
+    were never recorded instead of failing. With rate_limit set, calls beyond
+    that many per second raise ThrottledError, like a provider's 429.
+    input_latency adds seconds per 1000 characters of input that is not a
+    previously seen system prompt, like a provider's prompt cache.
+    """
+
+    name = "replay"
+
+    def __init__(self, store, latency=0.0, jitter=0.0, failure_rate=0.0,
+                 synthesize=False, chunk_size=32, rate_limit=0, input_latency=0.0, seed=None):
+        self.store = store
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.synthesize = synthesize
+        self.chunk_size = chunk_size
+        self.rate_limit = rate_limit
+        self.input_latency = input_latency
+        self.random = random.Random(seed)
+        self.cached_prefixes = set()
+        self.recent_calls = deque()
+        self.throttled = 0
+
+    def _check_rate(self):
+        now = time.monotonic()
+        while self.recent_calls and now - self.recent_calls[0] >= 1.0:
+            self.recent_calls.popleft()
+        if len(self.recent_calls) >= self.rate_limit:
+            self.throttled += 1
+            raise ThrottledError("429 rate limit exceeded (replay)")
+        self.recent_calls.append(now)
+
+    async def stream(self, prompt, system=None):
+        if self.rate_limit:
+            self._check_rate()
+
+        delay = 0.0
+        if self.latency:
+            spread = self.latency * self.jitter
+            delay = max(0.0, self.latency + self.random.uniform(-spread, spread))
+        if self.input_latency:
+            processed = len(prompt)
+            if system and system not in self.cached_prefixes:
+                self.cached_prefixes.add(system)
+                processed += len(system)
+            delay += self.input_latency * processed / 1000
+        if delay:
+            await asyncio.sleep(delay)
+
+        if self.random.random() < self.failure_rate:
+            raise BackendError("Injected replay failure")
+
+        response = self.store.load(prompt, system)
+        if response is None:
+            if not self.synthesize:
+                raise BackendError(f"No recorded response for prompt {prompt_key(prompt, system)}")
+            response = SYNTHETIC_RESPONSE
+
+        for start in range(0, len(response), self.chunk_size):
+            yield response[start:start + self.chunk_size]
+            await asyncio.sleep(0)
+
+
+_backends = {}
+
+
+def create_backend(name):
+    """Create an unscheduled backend by name."""
+    store = FixtureStore()
+
+    if name == "claude":
+        return ClaudeSDKBackend()
+    if name == "record":
+        return RecordingBackend(ClaudeSDKBackend(), store)
+    if name == "replay":
+        return ReplayBackend(
+            store,
+            latency=float(os.getenv("REPLAY_LATENCY", "0")),
+            jitter=float(os.getenv("REPLAY_JITTER", "0")),
+            failure_rate=float(os.getenv("REPLAY_FAILURE_RATE", "0")),
+            synthesize=os.getenv("REPLAY_SYNTHESIZE", "0") == "1",
+            rate_limit=float(os.getenv("REPLAY_RATE_LIMIT", "0")),
+            input_latency=float(os.getenv("REPLAY_INPUT_LATENCY", "0"))
+        )
+    raise ValueError(f"Unknown enhancement backend: {name}")
+
+
+def get_backend(name=None, lane=None):
+    """
+    The backend selected by name or the ENHANCEMENT_BACKEND env var, routed
+    through the shared model scheduler in the given lane (today by default).
+
+    Backends are created once per name, so every caller shares the same
+    provider-side state (e.g. the replay backend's simulated rate limit).
+    """
+    from model_scheduler import LANE_TODAY, ScheduledBackend, get_scheduler
+
+    name = name or os.getenv("ENHANCEMENT_BACKEND", "claude")
+    if name not in _backends:
+        _backends[name] = create_backend(name)
+    backend = _backends[name]
+
+    scheduler = get_scheduler()
+    if scheduler is None:
+        return backend
+    return ScheduledBackend(backend, scheduler, LANE_TODAY if lane is None else lane)
+
+
+async def run_load_test(modules, requests, concurrency, backend):
+    """Run generate_enhanced_content concurrently and report latency percentiles."""
+    from generate_question import generate_enhanced_content
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i):
+        module = modules[i % len(modules)]
+        async with semaphore:
+            started = time.perf_counter()
+            await generate_enhanced_content(module, i % len(modules) + 1, len(modules), backend=backend)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2)
+    }
+
+
+def main():
+    from generate_question import load_modules
+
+    parser = argparse.ArgumentParser(description="Offline load test of the enhancement path")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    modules = load_modules()['modules']
+    backend = get_backend()
+    print(f"Backend: {backend.name}")
+    report = asyncio.run(run_load_test(modules, args.requests, args.concurrency, backend))
+    throttled = getattr(_backends.get(backend.name), "throttled", None)
+    if throttled is not None:
+        report["provider_throttled"] = throttled
+    print(json.dumps(report, indent=2))
+
+    from model_scheduler import write_run_report
+    write_run_report()
+
+
+if __name__ == "__main__":
+    main()
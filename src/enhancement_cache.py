@@ -0,0 +1,59 @@
+"""
+Enhancement Cache
+Stores validated enhanced content per module, keyed by a hash of everything
+sent to Claude for it: the system prompt and the module prompt, including
+its lecture passages. Content is regenerated when the module, the shared
+system prompt (field rules, course outline) or the transcripts change.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from enhancement_prompts import system_prompt, build_module_prompt
+
+CACHE_DIR = os.getenv("ENHANCEMENT_CACHE_DIR", "src/enhancement_cache")
+
+# Module fields that affect the enhancement prompt
+PROMPT_FIELDS = ("id", "title", "episode", "textbook_pages", "question", "key_concepts")
+
+
+def module_hash(module):
+    """Hash of the prompt-relevant module fields."""
+    payload = json.dumps({field: module.get(field) for field in PROMPT_FIELDS},
+                         ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def prompt_hash(module):
+    """Hash of the system prompt and the module prompt the content is generated from."""
+    payload = f"{system_prompt()}\0{build_module_prompt(module)}"
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+class EnhancementCache:
+    """One JSON file per module: {"hash": ..., "content": {...}}."""
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+
+    def path_for(self, module):
+        return self.cache_dir / f"{module['id']}.json"
+
+    def get(self, module):
+        """Return cached content for the module, or None if missing or stale."""
+        path = self.path_for(module)
+        if not path.exists():
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+        if entry.get("hash") != prompt_hash(module):
+            return None
+        return entry["content"]
+
+    def put(self, module, content):
+        path = self.path_for(module)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"hash": prompt_hash(module), "content": content}, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,123 @@
+"""
+Enhancement Prompts
+Every enhancement call sends the same system prompt (role, field rules,
+output format and, optionally, an outline of the whole course) followed by
+a short per-module prompt. The system prompt is byte-identical across calls,
+so providers can cache it and only the module lines are processed per call.
+
+The module lines include the lecture passages that best match the module
+(BM25 over the transcripts, see transcript_index.py), up to
+PROMPT_TRANSCRIPT_TOKENS estimated tokens, so the deeper question and the
+connection hint are grounded in what was actually taught.
+
+Set PROMPT_COURSE_CONTEXT=0 to leave the course outline out of the system
+prompt, and PROMPT_TRANSCRIPT_TOKENS=0 to leave out the lecture passages.
+"""
+
+import os
+from functools import lru_cache
+
+from response_parser import ENHANCEMENT_SCHEMA
+
+INCLUDE_COURSE_CONTEXT = os.getenv("PROMPT_COURSE_CONTEXT", "1") == "1"
+TRANSCRIPT_TOKENS = int(os.getenv("PROMPT_TRANSCRIPT_TOKENS", "800"))
+
+# Field name -> (what to write, guidance); length limits come from ENHANCEMENT_SCHEMA
+FIELD_RULES = {
+    "daily_tip": ("今日学习小贴士", "针对本模块的学习建议"),
+    "deeper_question": ("一个更深层次的思考问题", "引导学生深入思考"),
+    "connection_hint": ("与其他知识的关联提示", "如何将本模块与命理学其他知识联系"),
+    "motivation": ("一句激励语", "古人智慧或倪海厦老师的教导风格")
+}
+
+
+def course_outline(modules):
+    """One line per module: episode, title and key concepts."""
+    return "\n".join(
+        f"- 第{module['episode']}集 {module['title']}：{'、'.join(module['key_concepts'])}"
+        for module in modules
+    )
+
+
+def field_rules():
+    """One prompt line per enhancement field, with its length limit if it has one."""
+    lines = []
+    for field, max_len in ENHANCEMENT_SCHEMA.items():
+        label, guidance = FIELD_RULES[field]
+        limit = f"{max_len}字以内，" if max_len else ""
+        lines.append(f'- "{field}": {label}（{limit}{guidance}）')
+    return "\n".join(lines)
+
+
+def build_system_prompt(modules=None):
+    """The shared prefix; with modules, an outline of the course is appended."""
+    prompt = f"""你是一位精通倪海厦天纪课程的学习助手，为每日学习模块生成增强内容。
+
+每个模块的增强内容包含以下字段：
+{field_rules()}
+
+模块信息后如附有课堂原话摘录（标注集数和时间），deeper_question 和 connection_hint 应以摘录中老师实际讲的内容为依据，不要编造课程中没有的说法。
+
+只输出JSON，不要其他内容：
+- 一个模块时，输出一个JSON对象，包含以上四个字段
+- 多个模块时，输出一个JSON数组，每个模块一个对象，按给出的顺序排列，每个对象另加 "module_id" 字段
+"""
+    if modules:
+        prompt += f"""
+课程大纲（供关联提示参考）：
+{course_outline(modules)}
+"""
+    return prompt
+
+
+@lru_cache(maxsize=None)
+def system_prompt():
+    """The system prompt for this run's modules.json (cached per process)."""
+    if not INCLUDE_COURSE_CONTEXT:
+        return build_system_prompt()
+    from generate_question import load_modules
+    try:
+        modules = load_modules()['modules']
+    except (OSError, ValueError, KeyError):
+        modules = None
+    return build_system_prompt(modules)
+
+
+def transcript_excerpts(module, max_tokens=TRANSCRIPT_TOKENS):
+    """Lecture passages for the module as prompt lines; empty without transcripts."""
+    from transcript_index import module_passages
+
+    passages = module_passages(module, max_tokens)
+    if not passages:
+        return ""
+    lines = "\n".join(
+        f"  [第{p['episode']}集 {p['start']}-{p['end']}] {p['text']}" for p in passages
+    )
+    return f"\n- 课堂原话摘录:\n{lines}"
+
+
+def module_fields(module):
+    """The module-specific lines of a prompt."""
+    return f"""模块ID: {module['id']}
+- 标题: {module['title']}
+- 视频集数: 第{module['episode']}集
+- 教材页码: 第{module['textbook_pages']}页
+- 学习问题: {module['question']}
+- 核心概念: {', '.join(module['key_concepts'])}{transcript_excerpts(module)}"""
+
+
+def build_module_prompt(module):
+    """Per-call prompt for one module."""
+    return f"""请为今天的学习模块生成增强内容（一个JSON对象）。
+
+{module_fields(module)}
+"""
+
+
+def build_batch_prompt(modules):
+    """Per-call prompt for several modules answered as one JSON array."""
+    modules_text = "\n\n".join(module_fields(module) for module in modules)
+    return f"""请为以下{len(modules)}个学习模块分别生成增强内容（一个JSON数组）。
+
+{modules_text}
+"""
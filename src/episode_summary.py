@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Episode Summarizer
+Map-reduce summaries of the episode transcripts into timestamped outlines
+for the daily pages.
+
+- map: each transcript is split into overlapping, token-budgeted chunks and
+  every chunk is summarized into a few timestamped points. Chunk summaries
+  are cached by a hash of the map prompt and the chunk text, so they are
+  reused as long as the transcript and the map prompt are unchanged.
+- reduce: an episode's points are merged into an outline of sections
+  [{"time", "title", "points"}], written to src/episode_outlines/ and shown
+  on the pages of the modules covering that episode. An outline is only
+  reduced again when its points or the reduce prompt changed.
+
+All episodes run in parallel within one concurrency budget, through the
+shared model scheduler (backfill lane):
+    python src/episode_summary.py --concurrency 16
+    python src/episode_summary.py --episodes 10 11
+"""
+
+import argparse
+import asyncio
+import hashlib
+import html
+import json
+import os
+from pathlib import Path
+
+from transcripts import load_all_transcripts, format_timestamp, parse_timestamp, transcript_lines
+from response_parser import request_json
+from enhancement_backends import get_backend
+from model_scheduler import LANE_BACKFILL, estimate_tokens, write_run_report
+
+OUTLINE_DIR = "src/episode_outlines"
+CHUNK_CACHE_DIR = ".build-cache/summary_chunks"
+
+CHUNK_TOKENS = 1500
+OVERLAP_TOKENS = 150
+CONCURRENCY = 16
+
+POINT_MAX = 60
+SECTION_TITLE_MAX = 20
+MAX_SECTIONS = 12
+
+MAP_SYSTEM_PROMPT = f"""你是一位精通倪海厦天纪课程的学习助手，为课堂录音的文字稿片段写摘要。
+
+文字稿每行以 [HH:MM:SS] 开头，表示该行在视频中的开始时间。
+
+输出一个JSON数组（只输出JSON，不要其他内容），按时间顺序列出片段中讲到的3到6个要点，每个要点一个对象：
+- "time": 讲到这个要点的时间，格式 HH:MM:SS，必须在片段时间范围内
+- "point": 要点内容（{POINT_MAX}字以内，写清楚老师讲了什么，不要写"老师说"）
+
+如果片段只有寒暄或没有实质内容，输出空数组 []。
+"""
+
+REDUCE_SYSTEM_PROMPT = f"""你是一位精通倪海厦天纪课程的学习助手，把一集课程的要点整理成提纲。
+
+输入是按时间排列的要点，每行以 [HH:MM:SS] 开头；相邻片段有重叠，可能有重复要点，请合并。
+
+输出一个JSON数组（只输出JSON，不要其他内容），按时间顺序分成4到{MAX_SECTIONS}节，每节一个对象：
+- "time": 本节开始时间，格式 HH:MM:SS，取自输入中的时间
+- "title": 本节标题（{SECTION_TITLE_MAX}字以内）
+- "points": 本节的1到4个要点（每个{POINT_MAX}字以内）
+"""
+
+
+def _hash(*parts):
+    return hashlib.sha256("\0".join(parts).encode('utf-8')).hexdigest()[:16]
+
+
+def transcript_chunks(transcript, max_tokens=CHUNK_TOKENS, overlap_tokens=OVERLAP_TOKENS):
+    """
+    Split a transcript into chunks of about max_tokens (estimated), each
+    starting with the last overlap_tokens of the previous chunk.
+
+    Returns a list of {"start", "end", "text"}.
+    """
+    lines = [
+        (start, f"[{format_timestamp(start)}] {text}")
+        for start, text in transcript_lines(transcript['cues'])
+    ]
+    costs = [estimate_tokens(line) for _, line in lines]
+    end_of_episode = transcript['cues'][-1]['end'] if transcript['cues'] else 0
+
+    chunks = []
+    first = 0
+    while first < len(lines):
+        last = first
+        tokens = costs[first]
+        while last + 1 < len(lines) and tokens + costs[last + 1] <= max_tokens:
+            last += 1
+            tokens += costs[last]
+        end = lines[last + 1][0] if last + 1 < len(lines) else end_of_episode
+        chunks.append({
+            "start": lines[first][0],
+            "end": end,
+            "text": "\n".join(line for _, line in lines[first:last + 1])
+        })
+        if last + 1 >= len(lines):
+            break
+
+        # Repeat at least the last line, and more up to overlap_tokens, but
+        # always move forward
+        next_first = max(last, first + 1)
+        overlap = costs[next_first]
+        while next_first - 1 > first and overlap + costs[next_first - 1] <= overlap_tokens:
+            next_first -= 1
+            overlap += costs[next_first]
+        first = next_first
+    return chunks
+
+
+def build_map_prompt(transcript, chunk):
+    return f"""第{transcript['episode']}集《{transcript['title']}》文字稿片段（{format_timestamp(chunk['start'])} - {format_timestamp(chunk['end'])}）：
+
+{chunk['text']}
+"""
+
+
+def build_reduce_prompt(transcript, points):
+    lines = "\n".join(f"[{format_timestamp(p['time'])}] {p['point']}" for p in points)
+    return f"""第{transcript['episode']}集《{transcript['title']}》的要点：
+
+{lines}
+"""
+
+
+def validate_points(data, chunk):
+    """Timestamped points inside the chunk's time range, in time order."""
+    points = []
+    for item in data:
+        if not isinstance(item, dict):
+            continue
+        seconds = parse_timestamp(item.get('time'))
+        point = item.get('point')
+        if seconds is None or not isinstance(point, str) or not point.strip() or len(point.strip()) > POINT_MAX:
+            continue
+        if int(chunk['start']) <= seconds <= int(chunk['end']) + 1:
+            points.append({"time": seconds, "point": point.strip()})
+    return sorted(points, key=lambda p: p['time'])
+
+
+def validate_outline(data, episode_end):
+    """Outline sections with valid times, titles and points, in time order."""
+    sections = []
+    for item in data:
+        if not isinstance(item, dict):
+            continue
+        seconds = parse_timestamp(item.get('time'))
+        title = item.get('title')
+        if seconds is None or seconds > episode_end + 1:
+            continue
+        if not isinstance(title, str) or not title.strip() or len(title.strip()) > SECTION_TITLE_MAX:
+            continue
+        points = item.get('points')
+        if not isinstance(points, list):
+            continue
+        points = [p.strip() for p in points if isinstance(p, str) and p.strip() and len(p.strip()) <= POINT_MAX]
+        if points:
+            sections.append({"time": seconds, "title": title.strip(), "points": points[:4]})
+    sections.sort(key=lambda s: s['time'])
+    return sections[:MAX_SECTIONS]
+
+
+class ChunkCache:
+    """Chunk summaries keyed by a hash of the map prompt and the chunk text."""
+
+    def __init__(self, cache_dir=CHUNK_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+
+    def path_for(self, text):
+        return self.cache_dir / f"{_hash(MAP_SYSTEM_PROMPT, text)}.json"
+
+    def get(self, text):
+        path = self.path_for(text)
+        if not path.exists():
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def put(self, text, points):
+        path = self.path_for(text)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(points, f, ensure_ascii=False)
+
+
+async def summarize_chunk(transcript, chunk, backend, cache, semaphore):
+    """Map step for one chunk; returns its points, or None on failure (not cached)."""
+    cached = cache.get(chunk['text'])
+    if cached is not None:
+        return cached
+
+    def validate(data):
+        if not isinstance(data, list):
+            return None, {"points": "没有JSON数组"}
+        return validate_points(data, chunk), {}
+
+    try:
+        async with semaphore:
+            points, errors = await request_json(
+                backend, build_map_prompt(transcript, chunk), MAP_SYSTEM_PROMPT, validate, opener='['
+            )
+    except Exception as e:
+        print(f"  EP{transcript['episode']:02d} {format_timestamp(chunk['start'])}: {e}")
+        return None
+    if errors:
+        return None
+    cache.put(chunk['text'], points)
+    return points
+
+
+def outline_path(episode, outline_dir=OUTLINE_DIR):
+    return Path(outline_dir) / f"episode_{int(episode):02d}.json"
+
+
+def load_outline(episode, outline_dir=OUTLINE_DIR):
+    path = outline_path(episode, outline_dir)
+    if not path.exists():
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_outline(outline, outline_dir=OUTLINE_DIR):
+    path = outline_path(outline['episode'], outline_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(outline, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+    os.replace(tmp_path, path)
+    return path
+
+
+async def summarize_episode(transcript, backend, cache, semaphore, outline_dir=OUTLINE_DIR):
+    """Map all chunks concurrently, then reduce; returns the outline path or None."""
+    episode = transcript['episode']
+    chunks = transcript_chunks(transcript)
+    results = await asyncio.gather(*(
+        summarize_chunk(transcript, chunk, backend, cache, semaphore) for chunk in chunks
+    ))
+    if any(points is None for points in results):
+        print(f"EP{episode:02d}: 部分片段摘要失败，重新运行以继续")
+        return None
+
+    seen = set()
+    points = []
+    for point in sorted((p for ps in results for p in ps), key=lambda p: p['time']):
+        if point['point'] not in seen:
+            seen.add(point['point'])
+            points.append(point)
+    if not points:
+        return None
+
+    prompt = build_reduce_prompt(transcript, points)
+    source = _hash(REDUCE_SYSTEM_PROMPT, prompt)
+    existing = load_outline(episode, outline_dir)
+    if existing and existing.get('source') == source:
+        return outline_path(episode, outline_dir)
+
+    episode_end = int(transcript['cues'][-1]['end'])
+
+    def validate(data):
+        sections = validate_outline(data, episode_end) if isinstance(data, list) else []
+        return sections, {} if sections else {"sections": "没有有效的提纲"}
+
+    try:
+        async with semaphore:
+            sections, _ = await request_json(backend, prompt, REDUCE_SYSTEM_PROMPT, validate, opener='[')
+    except Exception as e:
+        print(f"EP{episode:02d}: 提纲合并失败: {e}")
+        return None
+    if not sections:
+        print(f"EP{episode:02d}: 提纲合并失败，重新运行以继续")
+        return None
+
+    path = write_outline({
+        "episode": episode,
+        "title": transcript['title'],
+        "video_url": transcript['video_url'],
+        "source": source,
+        "sections": [
+            {"time": format_timestamp(s['time']), "seconds": s['time'], "title": s['title'], "points": s['points']}
+            for s in sections
+        ]
+    }, outline_dir)
+    print(f"EP{episode:02d}: {len(chunks)} 个片段 → {len(sections)} 节提纲")
+    return path
+
+
+async def summarize_episodes(episodes=None, concurrency=CONCURRENCY, outline_dir=OUTLINE_DIR, backend=None):
+    """Summarize all (or the given) episodes in parallel; returns the outline paths."""
+    backend = backend or get_backend(lane=LANE_BACKFILL)
+    cache = ChunkCache()
+    semaphore = asyncio.Semaphore(concurrency)
+    transcripts = [t for t in load_all_transcripts() if not episodes or t['episode'] in episodes]
+
+    paths = await asyncio.gather(*(
+        summarize_episode(transcript, backend, cache, semaphore, outline_dir) for transcript in transcripts
+    ))
+    written = [path for path in paths if path]
+    print(f"提纲生成完成: {len(written)}/{len(transcripts)} 集")
+    return written
+
+
+def module_outlines(module, outline_dir=OUTLINE_DIR):
+    """Outlines of the episodes a module covers (those that have been summarized)."""
+    from concept_graph import parse_episode_numbers
+
+    outlines = []
+    for episode in parse_episode_numbers(module.get('episode', '')):
+        outline = load_outline(episode, outline_dir)
+        if outline:
+            outlines.append(outline)
+    return outlines
+
+
+def build_outline_html(outlines):
+    """Collapsible outline section for a page, with links to each section's time in the video."""
+    if not outlines:
+        return ""
+
+    items_html = ""
+    for outline in outlines:
+        separator = '&' if '?' in outline['video_url'] else '?'
+        for section in outline['sections']:
+            points = "；".join(html.escape(point) for point in section['points'])
+            items_html += f'''
+                        <li class="outline-item">
+                            <a class="outline-time" href="{outline['video_url']}{separator}t={section['seconds']}s" target="_blank" rel="noopener">第{outline['episode']}集 {section['time']}</a>
+                            <span class="outline-title">{html.escape(section['title'])}</span>
+                            <span class="outline-points">{points}</span>
+                        </li>'''
+
+    return f'''
+                <details class="outline-section">
+                    <summary class="section-label">本集提纲</summary>
+                    <ul class="outline-list">{items_html}
+                    </ul>
+                </details>
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize episode transcripts into outlines")
+    parser.add_argument("--episodes", type=int, nargs="*", help="episode numbers (default: all)")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="model calls in flight")
+    args = parser.parse_args()
+
+    asyncio.run(summarize_episodes(args.episodes, args.concurrency))
+    write_run_report()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Font Subsetting
+Collects every character used by the generated pages (titles, questions,
+concepts, lunar day names, search results) and subsets local copies of
+Noto Serif SC / Noto Sans SC into small WOFF2 files, then rewrites the
+pages to load them instead of the full families from Google Fonts.
+
+Put the source fonts (static weights or variable fonts, .ttf/.otf) in
+fonts/, e.g. fonts/NotoSansSC-VariableFont_wght.ttf, then run:
+    python src/font_subset.py
+
+Requires fonttools and brotli; without them (or without source fonts) the
+pages keep the Google Fonts links.
+"""
+
+import hashlib
+import re
+import string
+from pathlib import Path
+
+from calendar_data import LUNAR_DAY_NAMES
+
+FONT_SOURCE_DIR = "fonts"
+DOCS_PATH = "docs"
+FONT_OUTPUT_DIR = "docs/fonts"
+
+# Family name -> source file name prefix
+FONT_FAMILIES = {
+    "Noto Serif SC": "NotoSerifSC",
+    "Noto Sans SC": "NotoSansSC"
+}
+
+GOOGLE_FONTS_RE = re.compile(
+    r'[ \t]*<link rel="preconnect" href="https://fonts\.googleapis\.com">\s*'
+    r'<link rel="preconnect" href="https://fonts\.gstatic\.com" crossorigin>\s*'
+    r'<link href="https://fonts\.googleapis\.com/css2\?[^"]*" rel="stylesheet">'
+)
+LOCAL_FONTS_RE = re.compile(r'[ \t]*<link href="[^"]*fonts/fonts(-[0-9a-f]+)?\.css" rel="stylesheet">')
+# Stable name, so pages do not change when the glyph set (and the subsets) change
+FONT_CSS_NAME = "fonts.css"
+
+# Characters that may be rendered without appearing in any page source
+EXTRA_CHARACTERS = string.printable + "，。、：；！？「」『』（）《》“”‘’…—·年月日一二三四五六日▼◀▶"
+
+
+def collect_charset(docs_path=DOCS_PATH):
+    """Set of characters used by all generated HTML pages, archive fragments and search results."""
+    docs_dir = Path(docs_path)
+    characters = set(EXTRA_CHARACTERS)
+    characters.update("".join(LUNAR_DAY_NAMES))
+
+    pages = list(docs_dir.glob("**/*.html")) + list(docs_dir.glob("archive/days/*.json"))
+    for path in pages + list(docs_dir.glob("search/docs-*.json")):
+        characters.update(path.read_text(encoding='utf-8'))
+
+    return {c for c in characters if c.isprintable() and c not in "\n\r\t"} | {" "}
+
+
+def find_font_sources(font_dir=FONT_SOURCE_DIR):
+    """Map family name to its source font files."""
+    sources = {}
+    for family, prefix in FONT_FAMILIES.items():
+        files = sorted(
+            path for path in Path(font_dir).glob(f"{prefix}*")
+            if path.suffix.lower() in (".ttf", ".otf")
+        )
+        if files:
+            sources[family] = files
+    return sources
+
+
+def _weight_range(font):
+    """CSS font-weight for a font: the fvar wght range or the OS/2 weight class."""
+    if "fvar" in font:
+        for axis in font["fvar"].axes:
+            if axis.axisTag == "wght":
+                return f"{int(axis.minValue)} {int(axis.maxValue)}"
+    return str(font["OS/2"].usWeightClass)
+
+
+def subset_font(source_path, charset, output_dir):
+    """
+    Subset one font to the charset as WOFF2.
+
+    The output name includes a hash of the source file and glyph set, so an
+    unchanged glyph set reuses the existing file. Returns (filename, weight).
+    """
+    from fontTools import subset
+    from fontTools.ttLib import TTFont
+
+    text = "".join(sorted(charset))
+    with open(source_path, 'rb') as f:
+        source_hash = hashlib.sha256(f.read()).hexdigest()
+    digest = hashlib.sha256((source_hash + text).encode('utf-8')).hexdigest()[:12]
+    output_path = Path(output_dir) / f"{source_path.stem}-{digest}.woff2"
+
+    if output_path.exists():
+        font = TTFont(output_path, lazy=True)
+        return output_path.name, _weight_range(font)
+
+    options = subset.Options()
+    options.flavor = "woff2"
+    options.layout_features = ["*"]
+    options.name_IDs = ["*"]
+    options.notdef_outline = True
+
+    font = subset.load_font(str(source_path), options)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(text=text)
+    subsetter.subset(font)
+    weight = _weight_range(font)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    subset.save_font(font, str(output_path), options)
+
+    print(f"  Subset {source_path.name} -> {output_path.name} "
+          f"({output_path.stat().st_size // 1024} KB, {len(text)} glyphs)")
+    return output_path.name, weight
+
+
+def generate_font_css(faces):
+    """Build @font-face rules for [(family, filename, weight), ...]."""
+    rules = []
+    for family, filename, weight in faces:
+        rules.append(f"""@font-face {{
+    font-family: '{family}';
+    font-style: normal;
+    font-weight: {weight};
+    font-display: swap;
+    src: url('{filename}') format('woff2');
+}}""")
+    return "\n".join(rules) + "\n"
+
+
+def rewrite_font_links(css_name, docs_path=DOCS_PATH):
+    """Point every page at the local font stylesheet instead of Google Fonts."""
+    docs_dir = Path(docs_path)
+    rewritten = 0
+    for path in docs_dir.glob("**/*.html"):
+        depth = len(path.relative_to(docs_dir).parts) - 1
+        href = "../" * depth + f"fonts/{css_name}"
+        link = f'    <link href="{href}" rel="stylesheet">'
+
+        html = path.read_text(encoding='utf-8')
+        updated = GOOGLE_FONTS_RE.sub(link, html, count=1)
+        updated = LOCAL_FONTS_RE.sub(link, updated, count=1)
+        if updated != html:
+            path.write_text(updated, encoding='utf-8')
+            rewritten += 1
+    return rewritten
+
+
+def subset_fonts(docs_path=DOCS_PATH, font_dir=FONT_SOURCE_DIR, output_dir=FONT_OUTPUT_DIR):
+    """Run the subsetting stage; returns False if it was skipped."""
+    sources = find_font_sources(font_dir)
+    if not sources:
+        print("Font subsetting skipped: no source fonts in fonts/")
+        return False
+    try:
+        import fontTools  # noqa: F401
+        import brotli  # noqa: F401
+    except ImportError as e:
+        print(f"Font subsetting skipped: {e}")
+        return False
+
+    charset = collect_charset(docs_path)
+    print(f"Subsetting fonts to {len(charset)} characters...")
+
+    faces = []
+    for family, files in sources.items():
+        for source_path in files:
+            filename, weight = subset_font(source_path, charset, output_dir)
+            faces.append((family, filename, weight))
+
+    css = generate_font_css(faces)
+    css_name = FONT_CSS_NAME
+    output = Path(output_dir)
+    (output / css_name).write_text(css, encoding='utf-8')
+
+    # Remove subsets and stylesheets from previous glyph sets
+    in_use = {css_name} | {filename for _, filename, _ in faces}
+    for old_file in output.iterdir():
+        if old_file.name not in in_use:
+            old_file.unlink()
+
+    rewritten = rewrite_font_links(css_name, docs_path)
+    print(f"Generated font subsets: {len(faces)} file(s), {rewritten} page(s) updated")
+    return True
+
+
+if __name__ == "__main__":
+    subset_fonts()
@@ -14,9 +14,31 @@ from datetime import datetime, timedelta
 from pathlib import Path
 import calendar
 
-from claude_code_sdk import query, ClaudeCodeOptions, AssistantMessage, TextBlock
 from lunarcalendar import Converter, Solar, Lunar
 from lunar_calendar_template import generate_calendar_html, generate_calendar_css, generate_calendar_js
+from calendar_data import LUNAR_DAY_NAMES, calendar_range, page_months, write_site_state
+from archive_store import (
+    ARCHIVE_MODE, archive_url, list_archived_dates, write_fragment, write_archive_shell, generate_shell_js
+)
+from date_utils import to_ordinals, module_indices, weekday_labels, display_dates, slash_dates
+from concept_graph import load_concept_graph, related_lessons, connection_hint
+from episode_summary import module_outlines, build_outline_html
+from question_dedup import load_duplicates, module_key
+from teachback_keywords import (
+    module_keywords, update_keywords, build_teachback_html, generate_teachback_css, generate_teachback_js
+)
+from response_parser import (
+    ENHANCEMENT_SCHEMA, request_json, validate_enhancement, record_field_results, build_retry_prompt,
+    get_parse_stats
+)
+from enhancement_backends import get_backend
+from enhancement_prompts import system_prompt, build_module_prompt
+from enhancement_cache import EnhancementCache
+from model_scheduler import write_run_report
+from search_index import generate_search_css, generate_search_html, generate_search_js, generate_site_search_index
+from service_worker import generate_service_worker, generate_sw_registration_js
+from font_subset import subset_fonts
+from optimize import minify_site, precompress_site
 
 # Configuration
 START_DATE = os.getenv("START_DATE", "2026-01-21")
@@ -24,6 +46,9 @@ MODULES_PATH = "src/modules.json"
 OUTPUT_PATH = "docs/index.html"
 ARCHIVE_PATH = "docs/archive"
 
+# Stands in for the path from a page to docs/ until a page variant is derived
+ROOT_PREFIX_MARK = "__ROOT_PREFIX__"
+
 
 def load_modules(modules_path=MODULES_PATH):
     """Load learning modules from JSON file."""
@@ -31,21 +56,37 @@ def load_modules(modules_path=MODULES_PATH):
         return json.load(f)
 
 
-def calculate_daily_module(modules, start_date=START_DATE):
-    """Calculate which module to display today based on rotation."""
-    start = datetime.fromisoformat(start_date)
-    today = datetime.now()
-    days_elapsed = (today - start).days
+def skipped_modules(modules):
+    """
+    Rotation index -> first date ordinal from which the module is skipped,
+    for modules that question_dedup.py found to repeat an earlier module.
+    """
+    duplicates = load_duplicates()
+    return {
+        index: to_ordinals([duplicates[module_key(module)]])[0]
+        for index, module in enumerate(modules)
+        if module_key(module) in duplicates
+    }
+
 
-    if days_elapsed < 0:
-        days_elapsed = 0
+def calculate_daily_module(modules, start_date=START_DATE, target_date=None):
+    """
+    Calculate which module to display on target_date (default today) based on rotation.
 
-    module_index = days_elapsed % len(modules)
+    Duplicate modules are dropped from the rotation from the date they were
+    found on; earlier dates keep their module.
+    """
+    today = datetime.fromisoformat(target_date) if target_date else datetime.now()
+    module_index = module_indices([today.toordinal()], start_date, len(modules), skipped_modules(modules))[0]
     return modules[module_index], module_index + 1, len(modules)
 
 
-def generate_lunar_calendar_data(date_str):
-    """Generate lunar calendar data for the given date's month."""
+def generate_lunar_calendar_data(date_str, as_of=None):
+    """
+    Generate lunar calendar data for the given date's month.
+
+    Days from the first day of content up to as_of (default today) are clickable.
+    """
     date_obj = datetime.fromisoformat(date_str)
     year = date_obj.year
     month = date_obj.month
@@ -69,15 +110,13 @@ def generate_lunar_calendar_data(date_str):
                 lunar_day = lunar_date.day
                 is_leap = lunar_date.isleap
 
-                # Chinese numerals for lunar dates
-                lunar_day_cn = ['初一', '初二', '初三', '初四', '初五', '初六', '初七', '初八', '初九', '初十',
-                               '十一', '十二', '十三', '十四', '十五', '十六', '十七', '十八', '十九', '二十',
-                               '廿一', '廿二', '廿三', '廿四', '廿五', '廿六', '廿七', '廿八', '廿九', '三十'][lunar_day - 1]
+                lunar_day_cn = LUNAR_DAY_NAMES[lunar_day - 1]
 
-                # Check if date is clickable (from Jan 21 to today)
+                # Check if date is clickable (from the first day of content to today)
                 current_date = datetime(year, month, day)
-                start_date = datetime(2026, 1, 21)  # First day of content
-                today_actual = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+                start_date = datetime.fromisoformat(START_DATE)
+                today_actual = datetime.fromisoformat(as_of or date_str).replace(
+                    hour=0, minute=0, second=0, microsecond=0)
                 is_clickable = start_date <= current_date <= today_actual
 
                 week_data.append({
@@ -106,44 +145,33 @@ def generate_lunar_calendar_data(date_str):
     }
 
 
-def generate_multi_month_calendar_data(today_date):
-    """Generate calendar data from January 2026 to December 2026."""
-    all_months_data = []
-
-    # Generate data for all months in 2026 (Jan to Dec)
-    for month in range(1, 13):
-        target_date = f"2026-{month:02d}-01"
-        month_data = generate_lunar_calendar_data(target_date)
-        all_months_data.append(month_data)
-
-    return all_months_data
-
-
 def get_archived_dates(archive_path=ARCHIVE_PATH, is_archive_page=False):
     """Get list of archived dates for the dropdown."""
     archive_dir = Path(archive_path)
     if not archive_dir.exists():
         return []
 
-    dates = []
-    for file in sorted(archive_dir.glob("*.html"), reverse=True):
-        date_str = file.stem
-        try:
-            date_obj = datetime.fromisoformat(date_str)
-            # Use relative path for archive pages, full path for main page
-            url_prefix = "" if is_archive_page else "archive/"
-            dates.append({
-                "date": date_str,
-                "display": date_obj.strftime("%Y/%m/%d"),
-                "url": f"{url_prefix}{date_str}.html"
-            })
-        except ValueError:
-            continue
-
-    return dates[:30]
-
-
-async def generate_enhanced_content(module, current_num, total_num):
+    date_strs = list_archived_dates(archive_path)[::-1][:30]
+
+    # Use relative path for archive pages, full path for main page
+    url_prefix = "" if is_archive_page else "archive/"
+    return [
+        {"date": date_str, "display": display, "url": archive_url(date_str, url_prefix)}
+        for date_str, display in zip(date_strs, slash_dates(date_strs))
+    ]
+
+
+def default_enhancement(module, related=None):
+    """Fallback enhanced content used when Claude is unavailable or a field never validates."""
+    return {
+        "daily_tip": "认真观看视频，做好笔记，理解比记忆更重要。",
+        "deeper_question": module['question'],
+        "connection_hint": connection_hint(related) if related else "思考本模块与整体命理体系的关系。",
+        "motivation": "学无止境，温故知新。"
+    }
+
+
+async def generate_enhanced_content(module, current_num, total_num, related=None, backend=None, cache=None):
     """
     Use Claude Agent SDK to generate enhanced learning content.
 
@@ -151,59 +179,48 @@ async def generate_enhanced_content(module, current_num, total_num):
     1. Generate a personalized study tip for today's topic
     2. Create a deeper exploration question
     3. Suggest connections to previous modules
-    """
-
-    prompt = f"""你是一位精通倪海厦天纪课程的学习助手。请为今天的学习模块生成增强内容。
-
-今日模块信息：
-- 模块ID: {module['id']}
-- 标题: {module['title']}
-- 视频集数: 第{module['episode']}集
-- 教材页码: 第{module['textbook_pages']}页
-- 学习问题: {module['question']}
-- 核心概念: {', '.join(module['key_concepts'])}
-
-请生成以下JSON格式的增强内容（只输出JSON，不要其他内容）：
 
-{{
-    "daily_tip": "今日学习小贴士（50字以内，针对本模块的学习建议）",
-    "deeper_question": "一个更深层次的思考问题（引导学生深入思考）",
-    "connection_hint": "与其他知识的关联提示（如何将本模块与命理学其他知识联系）",
-    "motivation": "一句激励语（古人智慧或倪海厦老师的教导风格）"
-}}
-"""
-
-    enhanced_content = {
-        "daily_tip": "认真观看视频，做好笔记，理解比记忆更重要。",
-        "deeper_question": module['question'],
-        "connection_hint": "思考本模块与整体命理体系的关系。",
-        "motivation": "学无止境，温故知新。"
-    }
+    When related lessons from the concept graph are given, the fallback
+    connection hint is built from them, so it is meaningful even if Claude
+    is unavailable.
+
+    The response is read only until the first JSON object closes (see
+    request_json), validated field by field, and retried with the validation
+    errors when some fields are missing or too long. Fields that never
+    validate keep their default value.
+
+    The prompt is the shared system prompt plus a short module-specific part
+    (see enhancement_prompts.py). The text comes from the given backend, or
+    from the one selected by the ENHANCEMENT_BACKEND environment variable
+    (see enhancement_backends.py).
+    With a cache, a previously validated result is returned without calling
+    Claude, and fully validated results are stored.
+    """
+    if cache is not None:
+        cached = cache.get(module)
+        if cached is not None:
+            return cached
+
+    enhanced_content = default_enhancement(module, related)
+    pending_fields = set(ENHANCEMENT_SCHEMA)
+
+    def validate(data):
+        # Fields that validated in an earlier attempt are kept
+        valid, errors = validate_enhancement(data)
+        errors = {field: reason for field, reason in errors.items() if field in pending_fields}
+        valid = {field: value for field, value in valid.items() if field in pending_fields}
+        record_field_results(valid, errors)
+        enhanced_content.update(valid)
+        pending_fields.difference_update(valid)
+        return enhanced_content, errors
 
     try:
-        options = ClaudeCodeOptions(
-            allowed_tools=[],  # No tools needed, just text generation
-            max_turns=1
+        _, errors = await request_json(
+            backend or get_backend(), build_module_prompt(module), system_prompt(), validate,
+            retry_prompt=build_retry_prompt
         )
-
-        async for message in query(prompt=prompt, options=options):
-            if isinstance(message, AssistantMessage):
-                for block in message.content:
-                    if isinstance(block, TextBlock):
-                        text = block.text.strip()
-                        # Try to parse JSON from response
-                        if text.startswith('{'):
-                            try:
-                                enhanced_content = json.loads(text)
-                            except json.JSONDecodeError:
-                                # Extract JSON from text if wrapped
-                                import re
-                                json_match = re.search(r'\{[\s\S]*\}', text)
-                                if json_match:
-                                    try:
-                                        enhanced_content = json.loads(json_match.group())
-                                    except:
-                                        pass
+        if not errors and cache is not None:
+            cache.put(module, enhanced_content)
     except Exception as e:
         print(f"Claude SDK enhancement skipped: {e}")
         # Fall back to default content
@@ -240,32 +257,63 @@ def parse_prompt_template(template):
     return ''.join(html_parts)
 
 
-def generate_html(module, current_num, total_num, archived_dates, today_date, enhanced_content, is_archive_page=False):
-    """Generate HTML content with enhanced AI-generated content."""
+def build_related_html(related, hint):
+    """Build the related lessons section from concept graph results."""
+    if not related or not (related['modules'] or related['episodes']):
+        return ""
+
+    items_html = ""
+    for entry in related['modules']:
+        shared = "、".join(entry['shared'])
+        detail = f"共同概念：{shared}" if shared else f"天纪第 {entry['episode']} 集"
+        items_html += f'''
+                        <li class="related-item">
+                            <span class="related-title">📘 {entry['title']}</span>
+                            <span class="related-detail">{detail}</span>
+                        </li>'''
+    for entry in related['episodes']:
+        shared = "、".join(entry['shared'])
+        detail = f"共同概念：{shared}" if shared else ""
+        title = f"🎬 第{entry['id']}集 {entry['title']}"
+        if entry.get('video_url'):
+            title = f'<a href="{entry["video_url"]}" target="_blank" rel="noopener">{title}</a>'
+        items_html += f'''
+                        <li class="related-item">
+                            <span class="related-title">{title}</span>
+                            <span class="related-detail">{detail}</span>
+                        </li>'''
+
+    return f'''
+                <div class="related-section">
+                    <div class="section-label">相关课程</div>
+                    <div class="related-hint">{hint}</div>
+                    <ul class="related-list">{items_html}
+                    </ul>
+                </div>
+'''
 
-    # Use the provided today_date parameter instead of datetime.now()
-    date_obj = datetime.fromisoformat(today_date)
-    today_display = date_obj.strftime("%Y/%m/%d")
-    progress_percent = int((current_num / total_num) * 100)
-    generation_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-    # Generate lunar calendar data for current month
-    lunar_data = generate_lunar_calendar_data(today_date)
+def generate_html(module, current_num, total_num, archived_dates, today_date, enhanced_content, is_archive_page=False, related=None, as_of=None):
+    """
+    Generate HTML content with enhanced AI-generated content.
 
-    # Generate multi-month calendar data for navigation
-    all_months_data = generate_multi_month_calendar_data(today_date)
+    as_of is the date the page is published on (default today); it decides
+    which calendar days are clickable, so pages can be rendered ahead of time.
+    """
+    day = render_day_content(module, current_num, total_num, today_date, enhanced_content, related)
+    return render_page(day, is_archive_page, as_of)
 
-    # Generate calendar HTML
-    calendar_html = generate_calendar_html(lunar_data, today_display, is_archive_page)
-    calendar_css = generate_calendar_css()
-    calendar_js = generate_calendar_js(all_months_data, date_obj.year, date_obj.month, is_archive_page)
 
-    # Build archive options HTML (exclude current date since it's shown as default)
-    archive_options = ""
-    for item in archived_dates:
-        # Skip the current date to avoid duplication
-        if item["date"] != today_date:
-            archive_options += f'<option value="{item["url"]}">{item["display"]}</option>\n'
+def render_day_content(module, current_num, total_num, today_date, enhanced_content, related=None):
+    """
+    Render the parts of a page that belong to one day: the module title and
+    the card body (question, materials, episode outline, concepts, related
+    lessons, prompt with teach-back concept feedback).
+
+    Returns {"date", "display", "title", "body"}, which is also the archive
+    fragment format (see archive_store.py).
+    """
+    date_obj = datetime.fromisoformat(today_date)
 
     # Build concepts HTML
     concepts_html = ""
@@ -275,12 +323,165 @@ def generate_html(module, current_num, total_num, archived_dates, today_date, en
     # Parse prompt template to create interactive HTML
     prompt_html = parse_prompt_template(module['prompt_template'])
 
+    # Related lessons from the concept graph
+    related_html = build_related_html(related, enhanced_content.get('connection_hint', ''))
+
+    # Outline of the module's episodes (see episode_summary.py)
+    outline_html = build_outline_html(module_outlines(module))
+
+    # Concepts the teach-back answer should cover (see teachback_keywords.py)
+    teachback_html = build_teachback_html(module_keywords(module))
+
+    body = f'''
+                <div class="question-section">
+                    <div class="section-label">今日一问</div>
+                    <div class="question-text">{module['question']}</div>
+                </div>
+
+                <div class="question-section">
+                    <div class="section-label">学习材料</div>
+                    <div class="resources-section">
+                        <a href="{module['video_url']}" target="_blank" rel="noopener" class="resource-link">
+                            <span class="resource-icon">🎬</span>
+                            <div class="resource-info">
+                                <div class="resource-title">观看视频</div>
+                                <div class="resource-detail">天纪第 {module['episode']} 集</div>
+                            </div>
+                        </a>
+                        <a href="天机道教材.pdf" target="_blank" rel="noopener" class="resource-link">
+                            <span class="resource-icon">📖</span>
+                            <div class="resource-info">
+                                <div class="resource-title">阅读教材</div>
+                                <div class="resource-detail">天机道 第 {module['textbook_pages']} 页</div>
+                            </div>
+                        </a>
+                    </div>
+                </div>
+{outline_html}
+                <div class="concepts-section">
+                    <div class="section-label">核心概念</div>
+                    <div class="concepts-grid">
+                        {concepts_html}
+                    </div>
+                </div>
+{related_html}
+                <div class="prompt-section">
+                    <div class="prompt-header">
+                        <span class="prompt-title">教给我的AI</span>
+                        <button class="copy-btn" onclick="copyPrompt()">复制提示词</button>
+                    </div>
+                    <div class="prompt-content" id="prompt-container">{prompt_html}</div>{teachback_html}
+                </div>
+            '''
+
+    return {
+        "date": today_date,
+        "display": date_obj.strftime("%Y/%m/%d"),
+        "title": module['title'],
+        "body": body
+    }
+
+
+def enhancement_slots():
+    """Placeholder content for the enhanced fields; see fill_enhancement_slots()."""
+    return {field: f"__ENHANCED_{field.upper()}__" for field in ENHANCEMENT_SCHEMA}
+
+
+def fill_enhancement_slots(text, enhanced_content):
+    """Replace the enhancement placeholders in rendered output with the real content."""
+    for field, placeholder in enhancement_slots().items():
+        text = text.replace(placeholder, enhanced_content.get(field, ""))
+    return text
+
+
+def prepare_day_pages(module, current_num, total_num, date_str, related=None):
+    """
+    Render a day's content and pages with placeholder enhanced content, so it
+    can run while Claude is still generating.
+
+    Returns (day, pages) with pages["main"] and, unless the archive stores
+    fragments, pages["archive"].
+    """
+    day = render_day_content(module, current_num, total_num, date_str, enhancement_slots(), related)
+    if ARCHIVE_MODE == "fragments":
+        return day, {"main": render_page(day)}
+    main_html, archive_html = render_page_variants(day)
+    return day, {"main": main_html, "archive": archive_html}
+
+
+def render_page(day, is_archive_page=False, as_of=None):
+    """Render the main (index.html) or archive variant of a day's page."""
+    return page_variant(render_page_template(day, as_of), is_archive_page)
+
+
+def render_page_variants(day, as_of=None):
+    """
+    Render a day's page once and derive both variants from it.
+
+    Returns (main_html, archive_html); they differ only in relative links.
+    """
+    template = render_page_template(day, as_of)
+    return page_variant(template, False), page_variant(template, True)
+
+
+def page_variant(template, is_archive_page):
+    """Fill in the path to docs/: "" for docs/index.html, "../" for pages in docs/archive/."""
+    return template.replace(ROOT_PREFIX_MARK, "../" if is_archive_page else "")
+
+
+def render_page_template(day, as_of=None):
+    """
+    Wrap a rendered day (see render_day_content) in the full page: styles,
+    header, calendar and scripts. Links to other files go through
+    ROOT_PREFIX_MARK; page_variant() turns the template into a page.
+
+    With day=None this renders the archive shell page, which loads the day
+    named in its URL from the archive fragments.
+
+    The output depends only on the arguments: days after the page's date (or
+    as_of) become clickable in the browser via site-state.json, so pages are
+    not rewritten as time passes.
+    """
+    shell = day is None
+    if shell:
+        day = {
+            "date": START_DATE,
+            "display": "",
+            "title": "",
+            "body": '<div class="question-text">加载中…</div>'
+        }
+    today_date = day['date']
+    today_display = day['display']
+    date_obj = datetime.fromisoformat(today_date)
+    generation_note = "" if shell else f" · 生成于 {today_date}"
+
+    # Generate lunar calendar data for current month
+    lunar_data = generate_lunar_calendar_data(today_date, as_of)
+
+    # Embed the surrounding months; the rest are loaded per year on navigation
+    first_key, last_key = calendar_range(START_DATE, today_date, as_of)
+    calendar_months = page_months(today_date, first_key, last_key)
+    last_clickable = max(today_date, as_of or today_date)
+
+    # Generate calendar HTML
+    calendar_html = generate_calendar_html(lunar_data, today_display, ROOT_PREFIX_MARK)
+    calendar_css = generate_calendar_css()
+    calendar_js = generate_calendar_js(calendar_months, date_obj.year, date_obj.month,
+                                       START_DATE, last_clickable, last_key // 12, ROOT_PREFIX_MARK)
+    search_css = generate_search_css()
+    search_html = generate_search_html()
+    search_js = generate_search_js(ROOT_PREFIX_MARK)
+    teachback_css = generate_teachback_css()
+    teachback_js = generate_teachback_js()
+    sw_js = generate_sw_registration_js(ROOT_PREFIX_MARK)
+    shell_js = generate_shell_js() if shell else ""
+
     html = f'''<!DOCTYPE html>
 <html lang="zh-CN">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>天纪每日学习 - {module['title']}</title>
+    <title>天纪每日学习 - {day['title']}</title>
     <link rel="preconnect" href="https://fonts.googleapis.com">
     <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
     <link href="https://fonts.googleapis.com/css2?family=Noto+Serif+SC:wght@400;600;700&family=Noto+Sans+SC:wght@300;400;500;600&display=swap" rel="stylesheet">
@@ -486,6 +687,49 @@ def generate_html(module, current_num, total_num, archived_dates, today_date, en
         .prompt-static {{
             margin: 8px 0;
         }}
+        .related-section {{ margin-bottom: 28px; }}
+        .related-hint {{
+            font-size: 0.95rem;
+            color: var(--color-secondary);
+            margin-bottom: 12px;
+        }}
+        .related-list {{ list-style: none; display: grid; gap: 8px; }}
+        .related-item {{
+            display: flex;
+            justify-content: space-between;
+            flex-wrap: wrap;
+            gap: 8px;
+            padding: 10px 16px;
+            background: var(--color-background);
+            border: 1px solid var(--color-border);
+            border-radius: var(--radius-sm);
+        }}
+        .related-title a {{ color: var(--color-primary); text-decoration: none; }}
+        .related-title a:hover {{ text-decoration: underline; }}
+        .related-detail {{ font-size: 0.85rem; color: var(--color-text-light); }}
+        .outline-section {{ margin-bottom: 28px; }}
+        .outline-section summary {{ cursor: pointer; }}
+        .outline-list {{ list-style: none; display: grid; gap: 8px; margin-top: 12px; }}
+        .outline-item {{
+            padding: 10px 16px;
+            background: var(--color-background);
+            border: 1px solid var(--color-border);
+            border-radius: var(--radius-sm);
+        }}
+        .outline-time {{
+            font-size: 0.85rem;
+            color: var(--color-primary);
+            text-decoration: none;
+            margin-right: 8px;
+        }}
+        .outline-time:hover {{ text-decoration: underline; }}
+        .outline-title {{ font-weight: 600; }}
+        .outline-points {{
+            display: block;
+            font-size: 0.9rem;
+            color: var(--color-text-light);
+            margin-top: 4px;
+        }}
         .resources-section {{
             display: grid;
             grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
@@ -546,6 +790,8 @@ def generate_html(module, current_num, total_num, archived_dates, today_date, en
             border-color: var(--color-primary);
         }}
         {calendar_css}
+        {search_css}
+        {teachback_css}
         footer {{
             text-align: center;
             padding-top: 32px;
@@ -591,14 +837,15 @@ def generate_html(module, current_num, total_num, archived_dates, today_date, en
         <header>
             <h1 class="site-title">天纪每日学习</h1>
             <p class="site-subtitle">倪海厦天纪课程 · 费曼学习法 · Claude AI增强</p>
+            {search_html}
         </header>
 
         <div class="question-card">
             <div class="card-header">
-                <a href="archive/index.html" class="archive-btn-card">📚 问题集锦</a>
+                <a href="{ROOT_PREFIX_MARK}archive/index.html" class="archive-btn-card">📚 问题集锦</a>
                 <div class="calendar-container">
                     <button class="calendar-button" onclick="toggleCalendar()">
-                        <span>📅 {today_display}</span>
+                        <span id="calendar-date-label">📅 {today_display}</span>
                         <span>▼</span>
                     </button>
                     <div id="calendar-dropdown" class="calendar-dropdown">
@@ -619,54 +866,14 @@ def generate_html(module, current_num, total_num, archived_dates, today_date, en
                         {calendar_html}
                     </div>
                 </div>
-                <h2 class="module-title">{module['title']}</h2>
+                <h2 class="module-title" id="module-title">{day['title']}</h2>
             </div>
 
-            <div class="card-body">
-                <div class="question-section">
-                    <div class="section-label">今日一问</div>
-                    <div class="question-text">{module['question']}</div>
-                </div>
-
-                <div class="question-section">
-                    <div class="section-label">学习材料</div>
-                    <div class="resources-section">
-                        <a href="{module['video_url']}" target="_blank" rel="noopener" class="resource-link">
-                            <span class="resource-icon">🎬</span>
-                            <div class="resource-info">
-                                <div class="resource-title">观看视频</div>
-                                <div class="resource-detail">天纪第 {module['episode']} 集</div>
-                            </div>
-                        </a>
-                        <a href="天机道教材.pdf" target="_blank" rel="noopener" class="resource-link">
-                            <span class="resource-icon">📖</span>
-                            <div class="resource-info">
-                                <div class="resource-title">阅读教材</div>
-                                <div class="resource-detail">天机道 第 {module['textbook_pages']} 页</div>
-                            </div>
-                        </a>
-                    </div>
-                </div>
-
-                <div class="concepts-section">
-                    <div class="section-label">核心概念</div>
-                    <div class="concepts-grid">
-                        {concepts_html}
-                    </div>
-                </div>
-
-                <div class="prompt-section">
-                    <div class="prompt-header">
-                        <span class="prompt-title">教给我的AI</span>
-                        <button class="copy-btn" onclick="copyPrompt()">复制提示词</button>
-                    </div>
-                    <div class="prompt-content" id="prompt-container">{prompt_html}</div>
-                </div>
-            </div>
+            <div class="card-body" id="day-content">{day['body']}</div>
         </div>
 
         <footer>
-            <p>基于费曼学习法设计 · 生成于 {generation_time}</p>
+            <p>基于费曼学习法设计{generation_note}</p>
             <div class="powered-by">🤖 Powered by Claude Agent SDK</div>
         </footer>
     </div>
@@ -724,6 +931,10 @@ def generate_html(module, current_num, total_num, archived_dates, today_date, en
             if (url) window.location.href = url;
         }}
         {calendar_js}
+        {search_js}
+        {teachback_js}
+        {sw_js}
+        {shell_js}
     </script>
 </body>
 </html>'''
@@ -740,9 +951,9 @@ def save_html(html_content, output_path):
     print(f"Generated: {output_path}")
 
 
-def archive_today(html_content, archive_path=ARCHIVE_PATH):
-    """Save today's question to archive."""
-    today_str = datetime.now().strftime("%Y-%m-%d")
+def archive_today(html_content, archive_path=ARCHIVE_PATH, date_str=None):
+    """Save today's (or date_str's) question to archive."""
+    today_str = date_str or datetime.now().strftime("%Y-%m-%d")
     archive_file = Path(archive_path) / f"{today_str}.html"
     archive_file.parent.mkdir(parents=True, exist_ok=True)
     with open(archive_file, 'w', encoding='utf-8') as f:
@@ -756,32 +967,25 @@ def generate_archive_index(modules, archive_path=ARCHIVE_PATH):
     if not archive_dir.exists():
         return
 
-    # Get all archived files with their metadata
+    # Get all archived files with their metadata, converting the dates in one batch
+    date_strs = list_archived_dates(archive_path)[::-1]
+    ordinals = to_ordinals(date_strs)
+
     archive_entries = []
-    for file in sorted(archive_dir.glob("*.html"), reverse=True):
-        date_str = file.stem
-        try:
-            date_obj = datetime.fromisoformat(date_str)
-
-            # Calculate which module was shown on that date
-            start = datetime.fromisoformat(os.getenv("START_DATE", "2026-01-21"))
-            days_elapsed = (date_obj - start).days
-            if days_elapsed < 0:
-                days_elapsed = 0
-            module_index = days_elapsed % len(modules)
-            module = modules[module_index]
-
-            archive_entries.append({
-                "date": date_str,
-                "date_display": date_obj.strftime("%Y年%m月%d日"),
-                "weekday": date_obj.strftime("%A"),
-                "module_id": module['id'],
-                "module_title": module['title'],
-                "episode": module['episode'],
-                "url": f"{date_str}.html"
-            })
-        except ValueError:
-            continue
+    for date_str, date_display, weekday, module_index in zip(
+            date_strs, display_dates(date_strs), weekday_labels(ordinals),
+            module_indices(ordinals, START_DATE, len(modules), skipped_modules(modules))):
+        # The module that was shown on that date
+        module = modules[module_index]
+        archive_entries.append({
+            "date": date_str,
+            "date_display": date_display,
+            "weekday": weekday,
+            "module_id": module['id'],
+            "module_title": module['title'],
+            "episode": module['episode'],
+            "url": archive_url(date_str)
+        })
 
     # Build archive entries HTML
     entries_html = ""
@@ -801,6 +1005,11 @@ def generate_archive_index(modules, archive_path=ARCHIVE_PATH):
         </div>
         '''
 
+    search_css = generate_search_css()
+    search_html = generate_search_html()
+    search_js = generate_search_js("../")
+    sw_js = generate_sw_registration_js("../")
+
     # Generate index HTML
     index_html = f'''<!DOCTYPE html>
 <html lang="zh-CN">
@@ -940,6 +1149,7 @@ def generate_archive_index(modules, archive_path=ARCHIVE_PATH):
             font-size: 0.85rem;
             border-top: 1px solid var(--color-border);
         }}
+        {search_css}
         @media (max-width: 768px) {{
             .archive-card {{
                 grid-template-columns: 1fr;
@@ -956,6 +1166,7 @@ def generate_archive_index(modules, archive_path=ARCHIVE_PATH):
             <h1 class="site-title">天纪学习历史记录</h1>
             <p class="site-subtitle">所有每日学习内容汇总</p>
             <a href="../index.html" class="back-link">← 返回今日学习</a>
+            {search_html}
         </header>
 
         <div class="stats">
@@ -978,6 +1189,10 @@ def generate_archive_index(modules, archive_path=ARCHIVE_PATH):
             <p style="margin-top: 8px;">🤖 Powered by Claude Agent SDK</p>
         </footer>
     </div>
+    <script>
+        {search_js}
+        {sw_js}
+    </script>
 </body>
 </html>'''
 
@@ -1000,55 +1215,72 @@ async def main():
     modules = data['modules']
     print(f"已加载 {len(modules)} 个学习模块")
 
-    # Calculate today's module
+    # Publish pre-generated pages if today is in the staging buffer
+    from pregenerate import promote_staged_day
     today_str = datetime.now().strftime("%Y-%m-%d")
+    if promote_staged_day(today_str, modules):
+        if ARCHIVE_MODE == "fragments":
+            write_archive_shell()
+        write_site_state(today_str, output_root=Path(OUTPUT_PATH).parent)
+        generate_archive_index(modules)
+        generate_site_search_index(modules)
+        subset_fonts()
+        minify_site()
+        generate_service_worker()
+        precompress_site()
+        print("\n" + "=" * 50)
+        print("已发布预生成页面！(Powered by Claude Agent SDK)")
+        print("=" * 50)
+        return
+
+    # Calculate today's module
     module, current_num, total_num = calculate_daily_module(modules)
     print(f"\n今日模块: {module['title']} (第 {current_num}/{total_num} 个)")
 
-    # Generate enhanced content with Claude
+    # Look up related lessons in the precomputed concept graph
+    concept_graph = load_concept_graph(modules=modules)
+    related = related_lessons(concept_graph, module)
+
+    # Precompute teach-back concepts for new or edited modules
+    update_keywords(modules)
+
+    # Generate enhanced content with Claude while everything that does not
+    # depend on its answer (calendar, listings, assets, page skeleton) is
+    # rendered in a worker thread; only the enhanced-content slots wait for it
     print("\n正在使用 Claude AI 生成增强内容...")
-    enhanced_content = await generate_enhanced_content(module, current_num, total_num)
+    enhance_task = asyncio.create_task(generate_enhanced_content(
+        module, current_num, total_num, related, cache=EnhancementCache()
+    ))
+    print("\n正在生成HTML页面...")
+    day, pages = await asyncio.to_thread(prepare_day_pages, module, current_num, total_num, today_str, related)
+    print(f"已找到 {len(list_archived_dates())} 个历史记录")
+
+    enhanced_content = await enhance_task
     print("AI增强内容生成完成")
+    print(f"字段校验统计: {get_parse_stats()}")
 
-    # Get archived dates for main page (with archive/ prefix)
-    archived_dates_main = get_archived_dates(is_archive_page=False)
-    print(f"已找到 {len(archived_dates_main)} 个历史记录")
+    day['body'] = fill_enhancement_slots(day['body'], enhanced_content)
+    pages = {name: fill_enhancement_slots(html, enhanced_content) for name, html in pages.items()}
 
-    # Generate HTML for main page
-    print("\n正在生成HTML页面...")
-    html_content_main = generate_html(
-        module=module,
-        current_num=current_num,
-        total_num=total_num,
-        archived_dates=archived_dates_main,
-        today_date=today_str,
-        enhanced_content=enhanced_content,
-        is_archive_page=False
-    )
-
-    # Save main page
-    save_html(html_content_main, OUTPUT_PATH)
-
-    # Get archived dates for archive page (without archive/ prefix)
-    archived_dates_archive = get_archived_dates(is_archive_page=True)
-
-    # Generate HTML for archive page with corrected URLs
-    html_content_archive = generate_html(
-        module=module,
-        current_num=current_num,
-        total_num=total_num,
-        archived_dates=archived_dates_archive,
-        today_date=today_str,
-        enhanced_content=enhanced_content,
-        is_archive_page=True
-    )
-
-    # Archive today's question with corrected URLs
-    archive_today(html_content_archive)
+    save_html(pages['main'], OUTPUT_PATH)
+    if ARCHIVE_MODE == "fragments":
+        # Archive today's content as a fragment rendered by the shared shell page
+        write_fragment(day)
+        write_archive_shell()
+    else:
+        archive_today(pages['archive'])
+
+    write_site_state(today_str, output_root=Path(OUTPUT_PATH).parent)
 
     # Generate archive index page
     print("\n正在生成历史记录索引页面...")
     generate_archive_index(modules)
+    generate_site_search_index(modules)
+    subset_fonts()
+    minify_site()
+    generate_service_worker()
+    precompress_site()
+    write_run_report()
 
     print("\n" + "=" * 50)
     print("生成完成！(Powered by Claude Agent SDK)")
@@ -1056,4 +1288,9 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    import sys
+    if sys.argv[1:2] == ["serve"]:
+        from dev_server import main as serve_main
+        serve_main(sys.argv[2:])
+    else:
+        asyncio.run(main())
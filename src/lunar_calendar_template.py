@@ -3,8 +3,13 @@ Lunar Calendar Template Generator
 Generates the HTML/CSS/JS for the lunar calendar dropdown
 """
 
-def generate_calendar_html(lunar_data, today_display, is_archive_page=False):
-    """Generate the calendar HTML with lunar information."""
+def generate_calendar_html(lunar_data, today_display, root_prefix=""):
+    """
+    Generate the calendar HTML with lunar information.
+
+    root_prefix is the relative path from the page to docs/ ("" or "../").
+    """
+    from archive_store import archive_url
 
     # Build calendar grid
     calendar_html = ""
@@ -27,8 +32,7 @@ def generate_calendar_html(lunar_data, today_display, is_archive_page=False):
                 disabled_class = '' if is_clickable else ' disabled'
 
                 # Build URL for navigation
-                url_prefix = "" if is_archive_page else "archive/"
-                onclick = f'onclick="navigateToDate(\'{url_prefix}{date_str}.html\')"' if is_clickable else ''
+                onclick = f'onclick="navigateToDate(\'{archive_url(date_str, root_prefix + "archive/")}\')"' if is_clickable else ''
 
                 calendar_html += f'''
                 <div class="calendar-day{today_class}{disabled_class}" {onclick}>
@@ -159,23 +163,41 @@ def generate_calendar_css():
     '''
 
 
-def generate_calendar_js(all_months_data, current_year, current_month, is_archive_page=False):
-    """Generate JavaScript for calendar interaction with month navigation."""
-    import json
+def generate_calendar_js(months, current_year, current_month, first_date, last_date, last_year, root_prefix=""):
+    """
+    Generate JavaScript for calendar interaction with month navigation.
 
-    # Convert Python data to JSON for JavaScript
-    months_json = json.dumps(all_months_data, ensure_ascii=False)
+    months are the compact entries embedded in the page (see calendar_data.py);
+    other months are fetched from calendar/<year>.json on demand. Days from
+    first_date to last_date are clickable, and navigation stops at the month
+    of first_date and December of last_year. At load time the page reads
+    site-state.json and extends both to the latest published day.
 
-    # Calculate the index of the current month (0-based, so January = 0, February = 1, etc.)
-    current_index = current_month - 1
+    root_prefix is the relative path from the page to docs/ ("" or "../").
+    """
+    import json
+    from archive_store import archive_url
+    from calendar_data import LUNAR_DAY_NAMES, month_key
 
-    url_prefix = "" if is_archive_page else "archive/"
+    months_json = json.dumps({month_key(m[0], m[1]): m for m in months}, separators=(',', ':'))
+    lunar_names_json = json.dumps(LUNAR_DAY_NAMES, ensure_ascii=False, separators=(',', ':'))
+    first = first_date.split('-')
+
+    url_pattern = archive_url("{date}", root_prefix + "archive/")
 
     return f'''
-        // Store all months data (Jan 2026 to Dec 2026)
-        const allMonthsData = {months_json};
-        let currentMonthIndex = {current_index};
-        const urlPrefix = "{url_prefix}";
+        // Months keyed by year * 12 + month - 1, each entry:
+        // [year, month, firstWeekdayOffset, dayCount, lunarDayIndexes]
+        const LUNAR_DAY_NAMES = {lunar_names_json};
+        const calendarMonths = {months_json};
+        const calendarFirstDate = "{first_date}";
+        let calendarLastDate = "{last_date}";
+        const calendarFirstKey = {month_key(int(first[0]), int(first[1]))};
+        let calendarLastKey = {month_key(last_year, 12)};
+        const calendarYearRequests = {{}};
+        let currentMonthKey = {month_key(current_year, current_month)};
+        const archiveUrlPattern = "{url_pattern}";
+        const calendarRoot = "{root_prefix}";
 
         function toggleCalendar() {{
             const dropdown = document.getElementById('calendar-dropdown');
@@ -186,59 +208,83 @@ def generate_calendar_js(all_months_data, current_year, current_month, is_archiv
             window.location.href = url;
         }}
 
-        function changeMonth(direction) {{
-            currentMonthIndex += direction;
-
-            // Boundary check (0 = January 2026, 11 = December 2026)
-            if (currentMonthIndex < 0) {{
-                currentMonthIndex = 0;
-                return;
+        function loadCalendarYear(year) {{
+            if (!calendarYearRequests[year]) {{
+                calendarYearRequests[year] = fetch(calendarRoot + 'calendar/' + year + '.json')
+                    .then(r => r.json())
+                    .then(entries => entries.forEach(entry => {{
+                        calendarMonths[entry[0] * 12 + entry[1] - 1] = entry;
+                    }}))
+                    .catch(error => {{
+                        delete calendarYearRequests[year];
+                        throw error;
+                    }});
             }}
-            if (currentMonthIndex >= allMonthsData.length) {{
-                currentMonthIndex = allMonthsData.length - 1;
+            return calendarYearRequests[year];
+        }}
+
+        function loadCalendarMonth(key) {{
+            if (key < calendarFirstKey || key > calendarLastKey) return Promise.resolve(null);
+            if (calendarMonths[key]) return Promise.resolve(calendarMonths[key]);
+            return loadCalendarYear(Math.floor(key / 12)).then(() => calendarMonths[key] || null);
+        }}
+
+        function showCalendarMonth(year, month) {{
+            const key = year * 12 + month - 1;
+            currentMonthKey = key;
+            return loadCalendarMonth(key)
+                .then(entry => {{ if (entry && key === currentMonthKey) renderCalendar(entry); }})
+                .catch(() => {{}});
+        }}
+
+        async function changeMonth(direction) {{
+            const key = currentMonthKey + direction;
+            if (key < calendarFirstKey || key > calendarLastKey) return;
+            currentMonthKey = key;
+
+            const entry = await loadCalendarMonth(key).catch(() => null);
+            if (key !== currentMonthKey) return;
+            if (!entry) {{
+                // Year file unavailable (e.g. offline): stay on the previous month
+                currentMonthKey -= direction;
                 return;
             }}
+            renderCalendar(entry);
 
-            renderCalendar(currentMonthIndex);
+            // Fetch the next month in the same direction ahead of time
+            loadCalendarMonth(key + direction).catch(() => {{}});
         }}
 
-        function renderCalendar(monthIndex) {{
-            const monthData = allMonthsData[monthIndex];
-            const year = monthData.year;
-            const month = monthData.month;
+        function renderCalendar(entry) {{
+            const [year, month, offset, dayCount, lunarDays] = entry;
 
             // Update header
             document.getElementById('calendar-month-year').textContent = year + '年' + month + '月';
 
             // Generate calendar HTML
-            let calendarHTML = '';
             const today = new Date();
-            const todayYear = today.getFullYear();
-            const todayMonth = today.getMonth() + 1;
-            const todayDay = today.getDate();
-
-            monthData.calendar.forEach(week => {{
-                calendarHTML += '<div class="calendar-week">';
-                week.forEach(dayData => {{
-                    if (dayData === null) {{
-                        calendarHTML += '<div class="calendar-day empty"></div>';
-                    }} else {{
-                        const isToday = (year === todayYear && month === todayMonth && dayData.day === todayDay);
-                        const todayClass = isToday ? ' today' : '';
-                        const disabledClass = dayData.is_clickable ? '' : ' disabled';
-
-                        const dateStr = year + '-' + String(month).padStart(2, '0') + '-' + String(dayData.day).padStart(2, '0');
-                        const onclick = dayData.is_clickable ?
-                            'onclick="navigateToDate(\\'' + urlPrefix + dateStr + '.html\\')"' : '';
-
-                        calendarHTML += '<div class="calendar-day' + todayClass + disabledClass + '" ' + onclick + '>';
-                        calendarHTML += '<div class="solar-day">' + dayData.day + '</div>';
-                        calendarHTML += '<div class="lunar-day">' + dayData.lunar_day + '</div>';
-                        calendarHTML += '</div>';
-                    }}
-                }});
-                calendarHTML += '</div>';
-            }});
+            const todayDay = (year === today.getFullYear() && month === today.getMonth() + 1) ? today.getDate() : 0;
+            const datePrefix = year + '-' + (month < 10 ? '0' : '') + month + '-';
+            const cellCount = Math.ceil((offset + dayCount) / 7) * 7;
+
+            let calendarHTML = '';
+            for (let cell = 0; cell < cellCount; cell++) {{
+                if (cell % 7 === 0) calendarHTML += '<div class="calendar-week">';
+                const day = cell - offset + 1;
+                if (day < 1 || day > dayCount) {{
+                    calendarHTML += '<div class="calendar-day empty"></div>';
+                }} else {{
+                    const dateStr = datePrefix + (day < 10 ? '0' : '') + day;
+                    const isClickable = dateStr >= calendarFirstDate && dateStr <= calendarLastDate;
+                    calendarHTML += '<div class="calendar-day' + (day === todayDay ? ' today' : '') +
+                        (isClickable
+                            ? '" onclick="navigateToDate(\\'' + archiveUrlPattern.replace('{{date}}', dateStr) + '\\')"'
+                            : ' disabled"') +
+                        '><div class="solar-day">' + day + '</div>' +
+                        '<div class="lunar-day">' + LUNAR_DAY_NAMES[lunarDays[day - 1]] + '</div></div>';
+                }}
+                if (cell % 7 === 6) calendarHTML += '</div>';
+            }}
 
             // Update calendar grid
             const calendarContainer = document.querySelector('.calendar-dropdown');
@@ -252,6 +298,16 @@ def generate_calendar_js(all_months_data, current_year, current_month, is_archiv
             weekdaysDiv.insertAdjacentHTML('afterend', calendarHTML);
         }}
 
+        // Extend the clickable range to the latest published day
+        fetch(calendarRoot + 'site-state.json', {{ cache: 'no-cache' }})
+            .then(r => r.json())
+            .then(state => {{
+                if (state.last_date > calendarLastDate) calendarLastDate = state.last_date;
+                calendarLastKey = Math.max(calendarLastKey, Number(state.last_date.slice(0, 4)) * 12 + 11);
+                if (calendarMonths[currentMonthKey]) renderCalendar(calendarMonths[currentMonthKey]);
+            }})
+            .catch(() => {{}});
+
         // Close calendar when clicking outside
         document.addEventListener('click', function(event) {{
             const container = document.querySelector('.calendar-container');
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Model Call Scheduler
+Shared admission control for every Claude call: token buckets for requests
+per minute and tokens per minute, a concurrency cap, priority lanes (today's
+page is served before backfills), exponential backoff when the provider
+throttles, and per-run cost/latency accounting written to a JSON report.
+A system prompt sent again within PROMPT_CACHE_TTL seconds is counted as a
+provider cache read: billed at the cached price and not charged against the
+tokens-per-minute budget.
+
+Backends are wrapped in a ScheduledBackend by get_backend(); limits come from
+the environment:
+
+    MODEL_RPM              requests per minute (default 50, 0 disables scheduling)
+    MODEL_TPM              input + output tokens per minute (default 40000)
+    MODEL_MAX_CONCURRENCY  calls in flight (default 8)
+    MODEL_MAX_RETRIES      retries after throttling (default 5)
+    MODEL_INPUT_PRICE      USD per million input tokens (default 3.0)
+    MODEL_OUTPUT_PRICE     USD per million output tokens (default 15.0)
+    MODEL_CACHED_PRICE     USD per million cached input tokens (default 0.3)
+    MODEL_REPORT_PATH      report location (default .build-cache/model-report.json)
+
+Token counts are estimates from the prompt and response text.
+"""
+
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import random
+import re
+import time
+from contextlib import aclosing, asynccontextmanager
+from pathlib import Path
+
+from enhancement_backends import BackendError, EnhancementBackend, ThrottledError
+
+LANE_TODAY = 0
+LANE_BACKFILL = 1
+LANE_NAMES = {LANE_TODAY: "today", LANE_BACKFILL: "backfill"}
+
+REPORT_PATH = os.getenv("MODEL_REPORT_PATH", ".build-cache/model-report.json")
+# Output tokens reserved per call until the actual response length is known
+OUTPUT_TOKEN_RESERVE = 600
+# How long a provider keeps a prompt prefix cached after its last use
+PROMPT_CACHE_TTL = 300
+
+CJK_CHAR_RE = re.compile(r'[　-鿿豈-﫿＀-￯]')
+THROTTLE_RE = re.compile(r'rate.?limit|\b(?:429|529)\b|overloaded|too many requests', re.I)
+THROTTLE_STATUSES = {429, 529}
+
+
+def is_throttling_error(error):
+    """
+    True for errors that mean "slow down" rather than "this call is broken".
+
+    Our own backends say so with ThrottledError; any other BackendError is a
+    real failure. Provider errors are classified by their HTTP status if they
+    carry one, otherwise by their message.
+    """
+    if isinstance(error, ThrottledError):
+        return True
+    if isinstance(error, BackendError):
+        return False
+    status = getattr(error, "status_code", None) or getattr(error, "status", None)
+    if isinstance(status, int):
+        return status in THROTTLE_STATUSES
+    return bool(THROTTLE_RE.search(str(error)))
+
+
+def estimate_tokens(text):
+    """Rough token count: one per CJK character, one per four other characters."""
+    cjk = len(CJK_CHAR_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+class TokenBucket:
+    """
+    Continuously refilling bucket of `rate_per_minute` units.
+
+    A request larger than the bucket's capacity waits for a full bucket and
+    leaves it in debt, so oversized calls still get through.
+    """
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or max(1.0, self.rate)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay_for(self, amount):
+        """Seconds until `amount` units can be taken (0 if available now)."""
+        self._refill()
+        needed = min(amount, self.capacity) - self.level
+        return max(0.0, needed / self.rate) if self.rate else 0.0
+
+    def take(self, amount):
+        self._refill()
+        self.level -= amount
+
+    def adjust(self, amount):
+        """Return (positive) or charge (negative) units after the fact."""
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class ModelScheduler:
+    """Admits model calls in priority order within rate, token and concurrency limits."""
+
+    def __init__(self, requests_per_minute=50, tokens_per_minute=40000, max_concurrency=8,
+                 max_retries=5, base_delay=1.0, max_delay=60.0,
+                 input_price=3.0, output_price=15.0, cached_price=0.3, seed=None):
+        # Requests are paced one at a time so no window of the provider's
+        # limit ever sees a burst above the rate
+        self.requests = TokenBucket(requests_per_minute, capacity=1.0)
+        self.tokens = TokenBucket(tokens_per_minute, capacity=max(tokens_per_minute / 60.0, 1.0)) \
+            if tokens_per_minute else None
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.input_price = input_price
+        self.output_price = output_price
+        self.cached_price = cached_price
+        self.random = random.Random(seed)
+
+        self.active = 0
+        self.paused_until = 0.0
+        self.records = []
+        self.prefixes = {}
+        self.started = time.time()
+        self._waiting = []
+        self._counter = itertools.count()
+        self._changed = None
+
+    # -- admission ----------------------------------------------------------
+
+    def _notify(self):
+        if self._changed is not None:
+            self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def _wait(self, timeout):
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def _delay_for(self, tokens):
+        if self.active >= self.max_concurrency:
+            return None  # wait for a release
+        delays = [self.paused_until - time.monotonic(), self.requests.delay_for(1)]
+        if self.tokens is not None:
+            delays.append(self.tokens.delay_for(tokens))
+        return max(0.0, *delays)
+
+    async def acquire(self, lane, tokens):
+        """Wait for this call's turn; returns the time spent waiting in seconds."""
+        started = time.monotonic()
+        entry = (lane, next(self._counter))
+        heapq.heappush(self._waiting, entry)
+        try:
+            while True:
+                timeout = None
+                if self._waiting[0] == entry:
+                    timeout = self._delay_for(tokens)
+                    if timeout == 0:
+                        heapq.heappop(self._waiting)
+                        self.active += 1
+                        self.requests.take(1)
+                        if self.tokens is not None:
+                            self.tokens.take(tokens)
+                        self._notify()
+                        return time.monotonic() - started
+                await self._wait(timeout)
+        except BaseException:
+            if entry in self._waiting:
+                self._waiting.remove(entry)
+                heapq.heapify(self._waiting)
+                self._notify()
+            raise
+
+    def release(self, reserved_tokens, used_tokens):
+        """Mark a call finished and settle its token reservation."""
+        self.active -= 1
+        if self.tokens is not None:
+            self.tokens.adjust(reserved_tokens - used_tokens)
+        self._notify()
+
+    def throttled(self, attempt):
+        """Pause all admissions after the provider throttled; returns the backoff delay."""
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        delay *= 0.5 + self.random.random() / 2
+        self.paused_until = max(self.paused_until, time.monotonic() + delay)
+        self._notify()
+        return delay
+
+    def prefix_cached(self, system):
+        """Whether the provider still has this system prompt cached; marks it used."""
+        now = time.monotonic()
+        cached = self.prefixes.get(system, 0) > now
+        self.prefixes[system] = now + PROMPT_CACHE_TTL
+        return cached
+
+    # -- accounting ---------------------------------------------------------
+
+    def record(self, **fields):
+        self.records.append(fields)
+
+    def report(self):
+        """Per-run summary: totals and per-lane calls, tokens, cost and latency."""
+        def summarize(records):
+            ok = [r for r in records if r['status'] == "ok"]
+            input_tokens = sum(r['input_tokens'] for r in records)
+            cached_tokens = sum(r['cached_input_tokens'] for r in records)
+            output_tokens = sum(r['output_tokens'] for r in records)
+            cost = input_tokens * self.input_price + cached_tokens * self.cached_price \
+                + output_tokens * self.output_price
+            return {
+                "calls": len(records),
+                "ok": len(ok),
+                "failed": len(records) - len(ok),
+                "throttled_retries": sum(r['retries'] for r in records),
+                "input_tokens": input_tokens,
+                "cached_input_tokens": cached_tokens,
+                "output_tokens": output_tokens,
+                "cost_usd": round(cost / 1e6, 4),
+                "latency_p50_ms": round(_percentile([r['latency_ms'] for r in ok], 0.5), 1),
+                "latency_p95_ms": round(_percentile([r['latency_ms'] for r in ok], 0.95), 1),
+                "first_chunk_p50_ms": round(_percentile([r['first_chunk_ms'] for r in ok], 0.5), 1),
+                "queue_wait_p95_ms": round(_percentile([r['wait_ms'] for r in records], 0.95), 1)
+            }
+
+        lanes = {}
+        for lane, name in LANE_NAMES.items():
+            records = [r for r in self.records if r['lane'] == lane]
+            if records:
+                lanes[name] = summarize(records)
+        return {
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "elapsed_s": round(time.time() - self.started, 3),
+            "limits": {
+                "requests_per_minute": round(self.requests.rate * 60),
+                "tokens_per_minute": round(self.tokens.rate * 60) if self.tokens else None,
+                "max_concurrency": self.max_concurrency
+            },
+            "total": summarize(self.records),
+            "lanes": lanes
+        }
+
+    def write_report(self, path=REPORT_PATH):
+        """Write the report as JSON; returns it. Does nothing if no calls were made."""
+        if not self.records:
+            return None
+        report = self.report()
+        report_path = Path(path)
+        report_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        total = report['total']
+        print(f"模型调用统计: {total['calls']} 次, 失败 {total['failed']}, 限流重试 {total['throttled_retries']}, "
+              f"约 ${total['cost_usd']} → {report_path}")
+        return report
+
+
+class ScheduledBackend(EnhancementBackend):
+    """Backend wrapper that routes every call through a ModelScheduler lane."""
+
+    def __init__(self, inner, scheduler, lane=LANE_TODAY):
+        self.inner = inner
+        self.scheduler = scheduler
+        self.lane = lane
+        self.name = inner.name
+
+    def for_lane(self, lane):
+        """The same backend and scheduler in another priority lane."""
+        return ScheduledBackend(self.inner, self.scheduler, lane)
+
+    @asynccontextmanager
+    async def session(self, system=None):
+        async with self.inner.session(system) as inner:
+            yield ScheduledBackend(inner, self.scheduler, self.lane)
+
+    async def stream(self, prompt, system=None):
+        scheduler = self.scheduler
+        prompt_tokens = estimate_tokens(prompt)
+        system_tokens = estimate_tokens(system) if system else 0
+        wait = 0.0
+
+        for attempt in range(scheduler.max_retries + 1):
+            cached_tokens = system_tokens if system and scheduler.prefix_cached(system) else 0
+            input_tokens = prompt_tokens + system_tokens - cached_tokens
+            reserved = input_tokens + OUTPUT_TOKEN_RESERVE
+            wait += await scheduler.acquire(self.lane, reserved)
+            started = time.monotonic()
+            first_chunk = None
+            output = []
+            status = "failed"
+            try:
+                async with aclosing(self.inner.stream(prompt, system)) as stream:
+                    async for chunk in stream:
+                        if first_chunk is None:
+                            first_chunk = time.monotonic()
+                        output.append(chunk)
+                        yield chunk
+                status = "ok"
+                return
+            except Exception as e:
+                # Only retry if nothing was passed on to the caller yet
+                if first_chunk is not None or not is_throttling_error(e) or attempt == scheduler.max_retries:
+                    raise
+                status = "throttled"
+            finally:
+                if status == "failed" and first_chunk is not None:
+                    # The caller stopped reading early (e.g. the JSON closed)
+                    status = "ok"
+                output_tokens = estimate_tokens(''.join(output))
+                scheduler.release(reserved, input_tokens + output_tokens)
+                if status != "throttled":
+                    now = time.monotonic()
+                    scheduler.record(
+                        lane=self.lane,
+                        status=status,
+                        retries=attempt,
+                        input_tokens=input_tokens,
+                        cached_input_tokens=cached_tokens,
+                        output_tokens=output_tokens,
+                        wait_ms=wait * 1000,
+                        latency_ms=(now - started) * 1000,
+                        first_chunk_ms=((first_chunk or now) - started) * 1000
+                    )
+            await asyncio.sleep(scheduler.throttled(attempt))
+
+
+_scheduler = None
+
+
+def get_scheduler():
+    """The process-wide scheduler configured from the environment (None if disabled)."""
+    global _scheduler
+    rpm = float(os.getenv("MODEL_RPM", "50"))
+    if rpm <= 0:
+        return None
+    if _scheduler is None:
+        _scheduler = ModelScheduler(
+            requests_per_minute=rpm,
+            tokens_per_minute=float(os.getenv("MODEL_TPM", "40000")),
+            max_concurrency=int(os.getenv("MODEL_MAX_CONCURRENCY", "8")),
+            max_retries=int(os.getenv("MODEL_MAX_RETRIES", "5")),
+            input_price=float(os.getenv("MODEL_INPUT_PRICE", "3.0")),
+            output_price=float(os.getenv("MODEL_OUTPUT_PRICE", "15.0")),
+            cached_price=float(os.getenv("MODEL_CACHED_PRICE", "0.3"))
+        )
+    return _scheduler
+
+
+def write_run_report(path=REPORT_PATH):
+    """Write the report for this run's model calls, if any were scheduled."""
+    if _scheduler is not None:
+        return _scheduler.write_report(path)
+    return None
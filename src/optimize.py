@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Output Optimization
+Post-render stage that minifies the generated HTML (including inline CSS and
+JavaScript such as the calendar script) and writes precompressed .gz/.br
+siblings for the static files in docs/. Pages are processed in parallel;
+files whose committed .gz sibling already decompresses to the current content
+are not recompressed, so no cache outside docs/ is needed.
+
+    python src/optimize.py
+"""
+
+import gzip
+import re
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+DOCS_PATH = "docs"
+COMPRESS_SUFFIXES = (".html", ".css", ".js", ".json", ".svg")
+MIN_COMPRESS_SIZE = 1024
+
+# CSS punctuation that needs no surrounding whitespace. A space before ":" is
+# kept because it is significant in selectors (".a :hover").
+CSS_NO_SPACE_BEFORE = set('{};,>)')
+CSS_NO_SPACE_AFTER = set('{};:,>(')
+
+# Characters after which a "/" starts a regex literal rather than a division
+REGEX_PRECEDERS = set("(,=:[!&|?{};+-*%<>~^")
+# Keywords after which "/" starts a regex; whole words only, so "margin / 2" is a division
+REGEX_KEYWORD_RE = re.compile(r'(?<![\w$])(?:return|typeof|case|do|else|in|of|void|yield)$')
+
+PRESERVE_TAGS_RE = re.compile(r'(<(pre|textarea|script|style)\b[^>]*>)(.*?)(</\2>)', re.S | re.I)
+HTML_COMMENT_RE = re.compile(r'<!--(?!\[if).*?-->', re.S)
+# Whitespace between tags (or between a tag and a stashed <script>/<style> block)
+INTER_TAG_WS_RE = re.compile(r'([>\x00])\s+([<\x00])')
+
+
+def _skip_string(text, i, quote):
+    """Return the index just past the string literal starting at text[i]."""
+    i += 1
+    while i < len(text):
+        char = text[i]
+        if char == '\\':
+            i += 2
+            continue
+        if char == quote:
+            return i + 1
+        i += 1
+    return i
+
+
+def minify_css(css):
+    """Remove comments and redundant whitespace from CSS, preserving strings."""
+    out = []
+    i = 0
+    pending_space = False
+    while i < len(css):
+        char = css[i]
+        if char in '"\'':
+            end = _skip_string(css, i, char)
+            if pending_space and out and out[-1] not in CSS_NO_SPACE_AFTER:
+                out.append(' ')
+            pending_space = False
+            out.append(css[i:end])
+            i = end
+        elif css.startswith('/*', i):
+            end = css.find('*/', i + 2)
+            i = len(css) if end == -1 else end + 2
+            pending_space = True
+        elif char.isspace():
+            pending_space = True
+            i += 1
+        else:
+            if char in CSS_NO_SPACE_BEFORE:
+                pending_space = False
+                if char == '}' and out and out[-1] == ';':
+                    out.pop()
+            elif pending_space and out and out[-1] not in CSS_NO_SPACE_AFTER:
+                out.append(' ')
+            pending_space = False
+            out.append(char)
+            i += 1
+    return ''.join(out).strip()
+
+
+def minify_js(js):
+    """
+    Conservatively minify JavaScript: strip comments and indentation and drop
+    blank lines. Line breaks are kept so automatic semicolon insertion is
+    never affected.
+    """
+    out = []
+    i = 0
+    last_significant = ''
+    while i < len(js):
+        char = js[i]
+        if char in '"\'`':
+            end = _skip_string(js, i, char)
+            out.append(js[i:end])
+            last_significant = char
+            i = end
+        elif js.startswith('//', i):
+            end = js.find('\n', i)
+            i = len(js) if end == -1 else end
+        elif js.startswith('/*', i):
+            end = js.find('*/', i + 2)
+            i = len(js) if end == -1 else end + 2
+            out.append(' ')
+        elif char == '/':
+            preceding = ''.join(out[-16:]).rstrip()
+            # "i++ / 2": a postfix increment ends an operand, like an identifier
+            is_regex = (not preceding
+                        or (last_significant in REGEX_PRECEDERS and not preceding.endswith(('++', '--')))
+                        or bool(REGEX_KEYWORD_RE.search(preceding)))
+            if is_regex:
+                j = i + 1
+                in_class = False
+                while j < len(js) and js[j] != '\n':
+                    if js[j] == '\\':
+                        j += 2
+                        continue
+                    if js[j] == '[':
+                        in_class = True
+                    elif js[j] == ']':
+                        in_class = False
+                    elif js[j] == '/' and not in_class:
+                        break
+                    j += 1
+                j += 1
+                while j < len(js) and js[j].isalpha():
+                    j += 1
+                out.append(js[i:j])
+                last_significant = ')'
+                i = j
+            else:
+                out.append(char)
+                last_significant = char
+                i += 1
+        else:
+            out.append(char)
+            if not char.isspace():
+                last_significant = char
+            i += 1
+
+    lines = (line.strip() for line in ''.join(out).split('\n'))
+    return '\n'.join(line for line in lines if line)
+
+
+def minify_html(html):
+    """
+    Minify an HTML document: collapse whitespace between tags, drop comments,
+    and minify inline <style> and <script> blocks. <pre> and <textarea>
+    contents are left untouched.
+    """
+    preserved = []
+
+    def stash(match):
+        open_tag, tag, body, close_tag = match.groups()
+        tag = tag.lower()
+        if tag == 'style':
+            body = minify_css(body)
+        elif tag == 'script' and 'src=' not in open_tag:
+            body = minify_js(body)
+        preserved.append(open_tag + body + close_tag)
+        return f'\x00{len(preserved) - 1}\x00'
+
+    html = PRESERVE_TAGS_RE.sub(stash, html)
+    html = HTML_COMMENT_RE.sub('', html)
+    html = INTER_TAG_WS_RE.sub(r'\1 \2', html)
+    html = re.sub(r'^\s+|\s+$', '', html)
+    html = re.sub(r'\x00(\d+)\x00', lambda m: preserved[int(m.group(1))], html)
+    return html + '\n'
+
+
+def _minify_file(path):
+    path = Path(path)
+    html = path.read_text(encoding='utf-8')
+    minified = minify_html(html)
+    if minified != html:
+        path.write_text(minified, encoding='utf-8')
+    return str(path), len(html.encode('utf-8')), len(minified.encode('utf-8'))
+
+
+def _is_compressed(data, gz_path):
+    """Whether gz_path holds exactly data (decompressing is far cheaper than compressing)."""
+    try:
+        return gzip.decompress(gz_path.read_bytes()) == data
+    except (OSError, EOFError, zlib.error):
+        return False
+
+
+def _compress_file(path):
+    path = Path(path)
+    data = path.read_bytes()
+    gz_path = path.with_name(path.name + '.gz')
+    br_path = path.with_name(path.name + '.br')
+
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+
+    if _is_compressed(data, gz_path) and (brotli is None or br_path.exists()):
+        return str(path), False
+
+    # mtime=0 keeps the .gz bytes identical for identical input
+    gz_path.write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        br_path.write_bytes(brotli.compress(data, quality=11))
+    return str(path), True
+
+
+def minify_site(docs_path=DOCS_PATH, workers=None):
+    """Minify every generated HTML page in parallel."""
+    pages = sorted(str(p) for p in Path(docs_path).glob("**/*.html"))
+    if not pages:
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(_minify_file, pages, chunksize=8))
+    before = sum(r[1] for r in results)
+    after = sum(r[2] for r in results)
+    print(f"Minified {len(results)} page(s): {before // 1024} KB -> {after // 1024} KB")
+
+
+def precompress_site(docs_path=DOCS_PATH, workers=None):
+    """Write .gz/.br siblings for static files whose content changed."""
+    files = sorted(
+        str(p) for p in Path(docs_path).glob("**/*")
+        if p.is_file() and p.suffix in COMPRESS_SUFFIXES and p.stat().st_size >= MIN_COMPRESS_SIZE
+    )
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(_compress_file, files, chunksize=8))
+
+    compressed = sum(1 for _, changed in results if changed)
+
+    # Remove stale siblings whose source no longer exists
+    for sibling in list(Path(docs_path).glob("**/*.gz")) + list(Path(docs_path).glob("**/*.br")):
+        if not sibling.with_suffix('').exists():
+            sibling.unlink()
+
+    print(f"Precompressed {compressed} file(s), {len(results) - compressed} unchanged")
+
+
+def main():
+    minify_site()
+    precompress_site()
+
+
+if __name__ == "__main__":
+    main()
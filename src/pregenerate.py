@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Ahead-of-Time Page Generation
+Renders the next N days (enhanced content + main and archive pages) into a
+staging buffer, so the daily job only has to move the ready files into docs/.
+The buffer lives in .build-cache/staging (STAGING_PATH) and is not committed;
+CI keeps it between runs with actions/cache.
+
+Fill the buffer for the next 7 days:
+    python src/pregenerate.py --days 7
+Publish today's staged pages:
+    python src/pregenerate.py --promote
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from generate_question import (
+    load_modules,
+    calculate_daily_module,
+    generate_enhanced_content,
+    render_day_content,
+    render_page,
+    render_page_variants,
+    OUTPUT_PATH,
+    ARCHIVE_PATH
+)
+from archive_store import ARCHIVE_MODE, fragment_path
+from batch_enhance import enhance_modules_batched
+from concept_graph import load_concept_graph, related_lessons
+from enhancement_cache import EnhancementCache, module_hash
+from enhancement_backends import get_backend
+from model_scheduler import LANE_BACKFILL, write_run_report
+
+STAGING_PATH = os.getenv("STAGING_PATH", ".build-cache/staging")
+BUFFER_DAYS = 7
+
+
+def staged_dir(date_str, staging_path=STAGING_PATH):
+    return Path(staging_path) / date_str
+
+
+def staged_dates(staging_path=STAGING_PATH):
+    """Dates that have a complete staged page set."""
+    staging_dir = Path(staging_path)
+    if not staging_dir.exists():
+        return []
+    return sorted(
+        path.name for path in staging_dir.iterdir()
+        if (path / "meta.json").exists()
+    )
+
+
+async def pregenerate_days(modules, days=BUFFER_DAYS, start_date=None, staging_path=STAGING_PATH):
+    """
+    Render the pages for `days` days starting at start_date (default today).
+
+    Days already in the buffer are skipped. Enhanced content for the modules
+    involved is generated in batches first, so rendering never waits on
+    Claude per page.
+    """
+    start = datetime.fromisoformat(start_date) if start_date else datetime.now()
+    already_staged = {
+        date_str for date_str in staged_dates(staging_path)
+        if staged_day_is_current(date_str, modules, staging_path)
+    }
+
+    targets = []
+    for offset in range(days):
+        date_str = (start + timedelta(days=offset)).strftime("%Y-%m-%d")
+        if date_str not in already_staged:
+            targets.append(date_str)
+
+    if not targets:
+        print("Staging buffer is full")
+        return []
+
+    plan = [(date_str, *calculate_daily_module(modules, target_date=date_str)) for date_str in targets]
+
+    cache = EnhancementCache()
+    backend = get_backend(lane=LANE_BACKFILL)
+    unique_modules = list({module['id']: module for _, module, _, _ in plan}.values())
+    await enhance_modules_batched(unique_modules, backend=backend, cache=cache)
+
+    concept_graph = load_concept_graph(modules=modules)
+
+    for date_str, module, current_num, total_num in plan:
+        related = related_lessons(concept_graph, module)
+        enhanced_content = await generate_enhanced_content(
+            module, current_num, total_num, related, backend=backend, cache=cache
+        )
+
+        # Render once; the archive copy is a fragment or the page's archive variant
+        day = render_day_content(module, current_num, total_num, date_str, enhanced_content, related)
+        if ARCHIVE_MODE == "fragments":
+            pages = {
+                "index.html": render_page(day, as_of=date_str),
+                "fragment.json": json.dumps(day, ensure_ascii=False, separators=(',', ':'))
+            }
+        else:
+            main_html, archive_html = render_page_variants(day, as_of=date_str)
+            pages = {"index.html": main_html, "archive.html": archive_html}
+
+        day_dir = staged_dir(date_str, staging_path)
+        day_dir.mkdir(parents=True, exist_ok=True)
+        for name, html in pages.items():
+            with open(day_dir / name, 'w', encoding='utf-8') as f:
+                f.write(html)
+        # meta.json is written last and marks the day as complete
+        with open(day_dir / "meta.json", 'w', encoding='utf-8') as f:
+            json.dump({
+                "date": date_str,
+                "module_id": module['id'],
+                "module_hash": module_hash(module),
+                "enhanced_content": enhanced_content
+            }, f, ensure_ascii=False, indent=2)
+        print(f"Staged: {date_str} - {module['title']}")
+
+    return targets
+
+
+def staged_day_is_current(date_str, modules, staging_path=STAGING_PATH):
+    """
+    Whether a staged day still shows the module the rotation picks for it.
+
+    A day goes stale when modules.json is edited or a duplicate is skipped
+    after it was staged. Stale days are removed so they get rendered again.
+    """
+    day_dir = staged_dir(date_str, staging_path)
+    try:
+        with open(day_dir / "meta.json", 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        meta = {}
+
+    module, _, _ = calculate_daily_module(modules, target_date=date_str)
+    if meta.get("module_id") == module['id'] and meta.get("module_hash") == module_hash(module):
+        return True
+
+    if day_dir.exists():
+        shutil.rmtree(day_dir)
+        print(f"Discarded stale staged day: {date_str}")
+    return False
+
+
+def promote_staged_day(date_str=None, modules=None, staging_path=STAGING_PATH,
+                       output_path=OUTPUT_PATH, archive_path=ARCHIVE_PATH):
+    """
+    Publish a staged day by moving its files into docs/.
+
+    Returns True if the day was staged for the module the rotation currently
+    picks and has been promoted; stale days are discarded and return False.
+    """
+    date_str = date_str or datetime.now().strftime("%Y-%m-%d")
+    day_dir = staged_dir(date_str, staging_path)
+    if not (day_dir / "meta.json").exists():
+        return False
+    if modules is None:
+        modules = load_modules()['modules']
+    if not staged_day_is_current(date_str, modules, staging_path):
+        return False
+
+    # Days staged in fragments mode carry the archive fragment instead of a page
+    if (day_dir / "fragment.json").exists():
+        staged_archive, archive_file = day_dir / "fragment.json", fragment_path(date_str, archive_path)
+    else:
+        staged_archive, archive_file = day_dir / "archive.html", Path(archive_path) / f"{date_str}.html"
+    archive_file.parent.mkdir(parents=True, exist_ok=True)
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+
+    os.replace(day_dir / "index.html", output_path)
+    os.replace(staged_archive, archive_file)
+    shutil.rmtree(day_dir)
+    print(f"Promoted staged pages for {date_str}")
+    return True
+
+
+def prune_staged_days(before_date=None, staging_path=STAGING_PATH):
+    """Remove staged days older than before_date (default today) that were never promoted."""
+    before_date = before_date or datetime.now().strftime("%Y-%m-%d")
+    for date_str in staged_dates(staging_path):
+        if date_str < before_date:
+            shutil.rmtree(staged_dir(date_str, staging_path))
+            print(f"Pruned stale staged day: {date_str}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate upcoming daily pages")
+    parser.add_argument("--days", type=int, default=BUFFER_DAYS, help="number of days to keep staged")
+    parser.add_argument("--start", help="first day to stage (YYYY-MM-DD, default today)")
+    parser.add_argument("--promote", action="store_true", help="publish today's staged pages")
+    args = parser.parse_args()
+
+    if args.promote:
+        if not promote_staged_day(args.start):
+            print("No staged pages for today")
+        return
+
+    modules = load_modules()['modules']
+    prune_staged_days()
+    asyncio.run(pregenerate_days(modules, days=args.days, start_date=args.start))
+    write_run_report()
+
+
+if __name__ == "__main__":
+    main()
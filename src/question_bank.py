@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Question Bank Generator
+Generates question sets in the schema of episode_01_all_questions.json for
+every transcribed episode. Each transcript is cut into token-budgeted
+windows of timestamped lines; each window is one Claude call (through the
+shared model scheduler, backfill lane) asking for a few questions, and the
+validated questions are cached per window. An episode file is written once
+all of its windows have answered, with ids EPxx-Qyy in time order.
+
+The job is restartable: finished episodes are skipped and cached windows
+are not requested again, so an interrupted run picks up where it stopped.
+Episodes with a hand-curated file in the repository root are never
+generated.
+
+    python src/question_bank.py                     # all missing episodes
+    python src/question_bank.py --episodes 10 11    # selected episodes
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from transcripts import load_all_transcripts, format_timestamp, parse_timestamp, transcript_lines
+from response_parser import request_json
+from enhancement_backends import get_backend
+from model_scheduler import LANE_BACKFILL, estimate_tokens, write_run_report
+
+QUESTION_BANK_DIR = "question_bank"
+CURATED_DIR = "."
+WINDOW_CACHE_DIR = ".build-cache/question_windows"
+
+# Transcript tokens per model call, and questions asked per window
+WINDOW_TOKENS = 1200
+QUESTIONS_PER_WINDOW = 3
+# Windows requested at once (the model scheduler applies the rate limits)
+CONCURRENCY = 16
+
+# textbook fields until textbook_align.py finds the page
+TEXTBOOK_PLACEHOLDER = "N/A (待对照教材)"
+
+TITLE_MAX = 60
+CONCEPT_MAX = 12
+SUMMARY_MAX = 80
+
+QUESTION_SYSTEM_PROMPT = f"""你是一位精通倪海厦天纪课程的学习助手，根据课堂录音的文字稿片段编写复习问题。
+
+文字稿每行以 [HH:MM:SS] 开头，表示该行在视频中的开始时间。请只根据给出的片段出题，每个问题对应片段中连续讲解的一段内容。
+
+输出一个JSON数组（只输出JSON，不要其他内容），每个问题一个对象：
+- "title": 问题本身（{TITLE_MAX}字以内，以问号结尾）
+- "start_time": 这段讲解的开始时间，格式 HH:MM:SS，必须在片段时间范围内
+- "end_time": 这段讲解的结束时间，格式 HH:MM:SS，不早于开始时间
+- "key_concepts": 2到6个核心概念（每个{CONCEPT_MAX}字以内）
+- "video_summary": 2到6条要点，概括老师在这段时间里讲了什么（每条{SUMMARY_MAX}字以内）
+
+如果片段只有寒暄或没有实质内容，输出空数组 []。
+"""
+
+
+def episode_file_name(episode):
+    return f"episode_{episode:02d}_all_questions.json"
+
+
+def transcript_windows(transcript, max_tokens=WINDOW_TOKENS):
+    """
+    Split a transcript into windows of at most max_tokens (estimated).
+
+    Returns a list of {"start", "end", "text"} where text is the window's
+    lines formatted as "[HH:MM:SS] ...".
+    """
+    windows = []
+    current = []
+    tokens = 0
+    for start, text in transcript_lines(transcript['cues']):
+        line = f"[{format_timestamp(start)}] {text}"
+        line_tokens = estimate_tokens(line)
+        if current and tokens + line_tokens > max_tokens:
+            windows.append(current)
+            current, tokens = [], 0
+        current.append((start, line))
+        tokens += line_tokens
+    if current:
+        windows.append(current)
+
+    end_of_episode = transcript['cues'][-1]['end'] if transcript['cues'] else 0
+    result = []
+    for i, lines in enumerate(windows):
+        end = windows[i + 1][0][0] if i + 1 < len(windows) else end_of_episode
+        result.append({
+            "start": lines[0][0],
+            "end": end,
+            "text": "\n".join(line for _, line in lines)
+        })
+    return result
+
+
+def build_window_prompt(transcript, window, count=QUESTIONS_PER_WINDOW):
+    return f"""第{transcript['episode']}集《{transcript['title']}》文字稿片段（{format_timestamp(window['start'])} - {format_timestamp(window['end'])}）：
+
+{window['text']}
+
+请根据这个片段编写{count}个问题。
+"""
+
+
+def _clean_strings(values, max_len, min_count=1, max_count=6):
+    if not isinstance(values, list):
+        return None
+    cleaned = [v.strip() for v in values if isinstance(v, str) and v.strip() and len(v.strip()) <= max_len]
+    if len(cleaned) < min_count:
+        return None
+    return cleaned[:max_count]
+
+
+def validate_question(data, window):
+    """
+    Check one generated question against the schema and its window.
+
+    Returns the cleaned question (without id, url or textbook fields), or
+    None if it cannot be used.
+    """
+    if not isinstance(data, dict):
+        return None
+
+    title = data.get('title')
+    if not isinstance(title, str) or not title.strip() or len(title.strip()) > TITLE_MAX:
+        return None
+
+    start = parse_timestamp(data.get('start_time'))
+    end = parse_timestamp(data.get('end_time'))
+    window_start, window_end = int(window['start']), int(window['end']) + 1
+    if start is None or end is None or not window_start <= start <= window_end:
+        return None
+    end = min(max(end, start), window_end)
+
+    key_concepts = _clean_strings(data.get('key_concepts'), CONCEPT_MAX)
+    video_summary = _clean_strings(data.get('video_summary'), SUMMARY_MAX)
+    if key_concepts is None or video_summary is None:
+        return None
+
+    return {
+        "title": title.strip(),
+        "start": start,
+        "end": end,
+        "key_concepts": key_concepts,
+        "video_summary": video_summary
+    }
+
+
+class WindowCache:
+    """Validated questions per window, keyed by a hash of the full prompt."""
+
+    def __init__(self, cache_dir=WINDOW_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+
+    def path_for(self, prompt):
+        key = hashlib.sha256(f"{QUESTION_SYSTEM_PROMPT}\0{prompt}".encode('utf-8')).hexdigest()[:16]
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, prompt):
+        path = self.path_for(prompt)
+        if not path.exists():
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def put(self, prompt, questions):
+        path = self.path_for(prompt)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(questions, f, ensure_ascii=False)
+
+
+async def generate_window_questions(transcript, window, backend, cache, semaphore):
+    """
+    Questions for one window, from the cache or from Claude.
+
+    Returns a list (possibly empty, if the window has no real content), or
+    None if no usable answer was obtained; failed windows are not cached, so
+    the next run asks again.
+    """
+    prompt = build_window_prompt(transcript, window)
+    cached = cache.get(prompt)
+    if cached is not None:
+        return cached
+
+    def validate(data):
+        if not isinstance(data, list):
+            return None, {"questions": "没有JSON数组"}
+        questions = [q for q in (validate_question(item, window) for item in data) if q]
+        if data and not questions:
+            return None, {"questions": "没有可用的问题"}
+        return questions, {}
+
+    try:
+        async with semaphore:
+            questions, errors = await request_json(backend, prompt, QUESTION_SYSTEM_PROMPT, validate, opener='[')
+    except Exception as e:
+        print(f"  EP{transcript['episode']:02d} {format_timestamp(window['start'])}: {e}")
+        return None
+    if errors:
+        return None
+    cache.put(prompt, questions)
+    return questions
+
+
+def assemble_episode(transcript, window_questions):
+    """Merge window results into the episode file structure with EPxx-Qyy ids."""
+    questions = sorted(
+        (q for qs in window_questions for q in qs),
+        key=lambda q: (q['start'], q['end'])
+    )
+    seen_titles = set()
+    unique = []
+    for question in questions:
+        if question['title'] not in seen_titles:
+            seen_titles.add(question['title'])
+            unique.append(question)
+
+    episode = transcript['episode']
+    separator = '&' if '?' in transcript['video_url'] else '?'
+    return {
+        "episode": episode,
+        "total_questions": len(unique),
+        "questions": [
+            {
+                "title": q['title'],
+                "id": f"EP{episode:02d}-Q{i:02d}",
+                "start_time": format_timestamp(q['start']),
+                "end_time": format_timestamp(q['end']),
+                "video_url": f"{transcript['video_url']}{separator}t={q['start']}s",
+                "key_concepts": q['key_concepts'],
+                "textbook_pages": TEXTBOOK_PLACEHOLDER,
+                "textbook_content": "",
+                "video_summary": q['video_summary']
+            }
+            for i, q in enumerate(unique, start=1)
+        ]
+    }
+
+
+def write_episode_file(data, output_dir=QUESTION_BANK_DIR):
+    """Write atomically, so an interrupted run never leaves a partial file."""
+    path = Path(output_dir) / episode_file_name(data['episode'])
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+    os.replace(tmp_path, path)
+    return path
+
+
+async def generate_episode(transcript, backend, cache, semaphore, output_dir=QUESTION_BANK_DIR):
+    """Generate and write one episode's questions; returns the path or None if incomplete."""
+    windows = transcript_windows(transcript)
+    results = await asyncio.gather(*(
+        generate_window_questions(transcript, window, backend, cache, semaphore) for window in windows
+    ))
+    failed = sum(1 for result in results if result is None)
+    episode = transcript['episode']
+    if failed:
+        print(f"EP{episode:02d}: {failed}/{len(windows)} 个片段未完成，重新运行以继续")
+        return None
+
+    data = assemble_episode(transcript, results)
+    path = write_episode_file(data, output_dir)
+    print(f"EP{episode:02d}: {data['total_questions']} 个问题 → {path}")
+    return path
+
+
+def pending_episodes(transcripts, episodes=None, output_dir=QUESTION_BANK_DIR, curated_dir=CURATED_DIR, force=False):
+    """Transcripts still to generate: not curated, and not written yet unless force."""
+    pending = []
+    for transcript in transcripts:
+        episode = transcript['episode']
+        if episodes and episode not in episodes:
+            continue
+        name = episode_file_name(episode)
+        if (Path(curated_dir) / name).exists():
+            continue
+        if not force and (Path(output_dir) / name).exists():
+            continue
+        pending.append(transcript)
+    return pending
+
+
+async def generate_question_bank(episodes=None, output_dir=QUESTION_BANK_DIR, force=False,
+                                 concurrency=CONCURRENCY, backend=None):
+    """Generate every pending episode concurrently; returns the paths written."""
+    backend = backend or get_backend(lane=LANE_BACKFILL)
+    cache = WindowCache()
+    semaphore = asyncio.Semaphore(concurrency)
+    transcripts = pending_episodes(load_all_transcripts(), episodes, output_dir, force=force)
+    print(f"待生成 {len(transcripts)} 集")
+
+    paths = await asyncio.gather(*(
+        generate_episode(transcript, backend, cache, semaphore, output_dir) for transcript in transcripts
+    ))
+    written = [path for path in paths if path]
+    print(f"问题库生成完成: {len(written)}/{len(transcripts)} 集")
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate question sets from episode transcripts")
+    parser.add_argument("--episodes", type=int, nargs="*", help="episode numbers (default: all missing)")
+    parser.add_argument("--output", default=QUESTION_BANK_DIR, help="output directory")
+    parser.add_argument("--force", action="store_true", help="regenerate episodes that already have a file")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    args = parser.parse_args()
+
+    asyncio.run(generate_question_bank(args.episodes, args.output, args.force, args.concurrency))
+    write_run_report()
+
+
+if __name__ == "__main__":
+    main()
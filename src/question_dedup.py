@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Near-Duplicate Question Detection
+Finds questions that ask the same thing in different words, across the
+learning modules and every question file, without comparing all pairs.
+
+- Each question is reduced to character shingles (bigrams over Han
+  characters, letters and digits) of its title, key_concepts and
+  video_summary (for modules: title, question and key_concepts).
+- A MinHash signature of NUM_PERM hashes summarizes each shingle set; the
+  signature is cut into BANDS bands of ROWS hashes and questions sharing a
+  band bucket become candidates (locality-sensitive hashing). Every
+  candidate pair is checked by exact Jaccard similarity; pairs already in
+  the same cluster, and buckets with the same members as one already
+  checked, are skipped.
+- Matches above THRESHOLD are grouped into clusters; the first question of a
+  cluster (modules in rotation order, then episodes in order) is kept and the
+  others are its duplicates.
+
+The clusters are written to src/question_duplicates.json. Each duplicate
+records the date from which it is skipped (the day after it was first
+found, kept on later runs); from then on the daily rotation runs over the
+remaining modules only, so published dates never change.
+With --merge, duplicates are also removed from the generated question_bank
+files:
+    python src/question_dedup.py
+    python src/question_dedup.py --threshold 0.6 --merge
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+from collections import defaultdict
+from datetime import date, timedelta
+from pathlib import Path
+
+DUPLICATES_PATH = "src/question_duplicates.json"
+QUESTION_DIRS = (".", "question_bank")
+# Only generated files are rewritten by --merge; curated ones are reported
+MERGE_DIRS = ("question_bank",)
+
+SHINGLE_SIZE = 2
+NUM_PERM = 64
+# BANDS * ROWS == NUM_PERM. A pair with Jaccard similarity s shares a bucket
+# with probability 1 - (1 - s ** ROWS) ** BANDS: 0.9999 at s = 0.5, 0.95 at
+# s = 0.3, so pairs at THRESHOLD are practically never missed, at the cost
+# of more candidates to verify
+BANDS = 32
+ROWS = 2
+THRESHOLD = 0.5
+SEED = 42
+
+# Mersenne prime for the (a * x + b) % p hash family
+HASH_PRIME = (1 << 61) - 1
+TOKEN_RE = re.compile(r'[0-9A-Za-z㐀-䶿一-鿿豈-﫿]')
+
+
+def module_key(module):
+    return f"module:{module['id']}"
+
+
+def question_text(item):
+    """Text compared for one question or module."""
+    parts = [item.get('title', ''), item.get('question', '')]
+    parts += item.get('key_concepts', [])
+    parts += item.get('video_summary', [])
+    return ' '.join(part for part in parts if isinstance(part, str))
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Character shingles, ignoring punctuation, spaces and case."""
+    chars = ''.join(TOKEN_RE.findall(text.lower()))
+    if len(chars) < size:
+        return {chars} if chars else set()
+    return {chars[i:i + size] for i in range(len(chars) - size + 1)}
+
+
+def shingle_hash(shingle):
+    return int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class MinHasher:
+    """NUM_PERM seeded hash functions standing in for random permutations."""
+
+    def __init__(self, num_perm=NUM_PERM, seed=SEED):
+        rng = random.Random(seed)
+        self.params = [(rng.randrange(1, HASH_PRIME), rng.randrange(HASH_PRIME)) for _ in range(num_perm)]
+
+    def signature(self, shingle_set):
+        values = [shingle_hash(s) for s in shingle_set]
+        if not values:
+            return None
+        return tuple(min((a * x + b) % HASH_PRIME for x in values) for a, b in self.params)
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def find_clusters(items, threshold=THRESHOLD, bands=BANDS, rows=ROWS):
+    """
+    Group near-duplicate items.
+
+    items is a list of (key, text) in priority order. Returns clusters as
+    lists of (index, similarity to the kept item), kept item first.
+    """
+    hasher = MinHasher(bands * rows)
+    shingle_sets = [shingles(text) for _, text in items]
+
+    buckets = defaultdict(list)
+    for index, shingle_set in enumerate(shingle_sets):
+        signature = hasher.signature(shingle_set)
+        if signature is None:
+            continue
+        for band in range(bands):
+            buckets[(band, signature[band * rows:(band + 1) * rows])].append(index)
+
+    parent = list(range(len(items)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    checked = set()
+    seen_buckets = set()
+    for members in buckets.values():
+        if len(members) < 2 or tuple(members) in seen_buckets:
+            continue
+        seen_buckets.add(tuple(members))
+        for i, first in enumerate(members):
+            for second in members[i + 1:]:
+                root_a, root_b = find(first), find(second)
+                if root_a == root_b or (first, second) in checked:
+                    continue
+                checked.add((first, second))
+                if jaccard(shingle_sets[first], shingle_sets[second]) >= threshold:
+                    # Union towards the lower index, so the root is the item kept
+                    parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    groups = defaultdict(list)
+    for index in range(len(items)):
+        groups[find(index)].append(index)
+    return [
+        [(index, round(jaccard(shingle_sets[root], shingle_sets[index]), 3)) for index in members]
+        for root, members in sorted(groups.items())
+        if len(members) > 1
+    ]
+
+
+def load_question_items(modules=None, question_dirs=QUESTION_DIRS):
+    """(key, text, title) for modules, then every question file by episode."""
+    items = [(module_key(m), question_text(m), m['title']) for m in modules or []]
+    files = []
+    for question_dir in question_dirs:
+        files += Path(question_dir).glob("episode_*_all_questions.json")
+    for path in sorted(files, key=lambda p: (p.name, str(p))):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        for question in data.get('questions', []):
+            items.append((question['id'], question_text(question), question.get('title', '')))
+    return items
+
+
+def build_report(items, threshold=THRESHOLD, known=None, since=None):
+    """
+    Clusters of near-duplicates. known maps already reported duplicate ids
+    to their since date, which they keep; new duplicates get since (default
+    tomorrow, so the page already published today is not affected).
+    """
+    known = known or {}
+    since = since or (date.today() + timedelta(days=1)).isoformat()
+    clusters = find_clusters([(key, text) for key, text, _ in items], threshold)
+    return {
+        "threshold": threshold,
+        "questions": len(items),
+        "clusters": [
+            {
+                "keep": items[members[0][0]][0],
+                "title": items[members[0][0]][2],
+                "duplicates": [
+                    {
+                        "id": items[index][0],
+                        "title": items[index][2],
+                        "similarity": similarity,
+                        "since": known.get(items[index][0], since)
+                    }
+                    for index, similarity in members[1:]
+                ]
+            }
+            for members in clusters
+        ]
+    }
+
+
+_cache = {}
+
+
+def load_duplicates(path=DUPLICATES_PATH):
+    """Id -> since date for questions and modules that duplicate an earlier one."""
+    report_file = Path(path)
+    mtime = report_file.stat().st_mtime if report_file.exists() else None
+    if _cache.get('key') != (str(path), mtime):
+        duplicates = {}
+        if mtime is not None:
+            with open(report_file, 'r', encoding='utf-8') as f:
+                report = json.load(f)
+            duplicates = {
+                dup['id']: dup['since']
+                for cluster in report.get('clusters', []) for dup in cluster['duplicates']
+            }
+        _cache.update(key=(str(path), mtime), duplicates=duplicates)
+    return _cache['duplicates']
+
+
+def merge_duplicates(duplicate_ids, question_dirs=MERGE_DIRS):
+    """Drop duplicate questions from generated question files; returns the number removed."""
+    removed = 0
+    for question_dir in question_dirs:
+        for path in sorted(Path(question_dir).glob("episode_*_all_questions.json")):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            kept = [q for q in data['questions'] if q['id'] not in duplicate_ids]
+            if len(kept) == len(data['questions']):
+                continue
+            removed += len(data['questions']) - len(kept)
+            data['questions'] = kept
+            data['total_questions'] = len(kept)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+                f.write("\n")
+    return removed
+
+
+def main():
+    from generate_question import load_modules
+
+    parser = argparse.ArgumentParser(description="Find near-duplicate questions with MinHash/LSH")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="minimum Jaccard similarity")
+    parser.add_argument("--merge", action="store_true", help="remove duplicates from generated question files")
+    args = parser.parse_args()
+
+    items = load_question_items(load_modules()['modules'])
+    report = build_report(items, args.threshold, known=load_duplicates())
+    with open(DUPLICATES_PATH, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+        f.write("\n")
+
+    duplicates = sum(len(cluster['duplicates']) for cluster in report['clusters'])
+    for cluster in report['clusters']:
+        print(f"{cluster['keep']} {cluster['title']}")
+        for dup in cluster['duplicates']:
+            print(f"  ~ {dup['id']} {dup['title']} ({dup['similarity']:.2f})")
+    print(f"{duplicates} duplicate(s) in {len(report['clusters'])} cluster(s) among {len(items)} questions"
+          f" -> {DUPLICATES_PATH}")
+
+    if args.merge:
+        removed = merge_duplicates({dup['id'] for cluster in report['clusters'] for dup in cluster['duplicates']})
+        print(f"Removed {removed} duplicate question(s) from {', '.join(MERGE_DIRS)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+Claude Response Parser
+Incremental JSON extraction, schema validation and bounded repair for the
+enhanced content returned by Claude, and request_json(), the one
+stream/extract/parse/validate/retry loop every JSON request goes through.
+"""
+
+import json
+import re
+from collections import defaultdict
+from contextlib import aclosing
+
+# Field name -> maximum length in characters, or None where the prompt sets
+# no limit. The field rules in the prompt (enhancement_prompts.py) are
+# written from this table.
+ENHANCEMENT_SCHEMA = {
+    "daily_tip": 50,
+    "deeper_question": None,
+    "connection_hint": None,
+    "motivation": None
+}
+
+MAX_ATTEMPTS = 2
+
+# Per-field validation counters for the current run
+FIELD_STATS = defaultdict(lambda: {"ok": 0, "failed": 0})
+
+
+class StreamingJSONExtractor:
+    """
+    Incrementally scan text chunks for the first complete top-level JSON value.
+
+    Text before the opening bracket (e.g. "```json" or a short preamble) is
+    skipped. feed() returns the raw value text as soon as its closing bracket
+    arrives, so the caller can stop reading the response. Use opener='[' to
+    extract an array instead of an object.
+    """
+
+    def __init__(self, opener='{'):
+        self.opener = opener
+        self.buffer = []
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.started = False
+        self.result = None
+
+    def feed(self, chunk):
+        if self.result is not None:
+            return self.result
+
+        for char in chunk:
+            if not self.started:
+                if char != self.opener:
+                    continue
+                self.started = True
+
+            self.buffer.append(char)
+
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+                continue
+
+            if char == '"':
+                self.in_string = True
+            elif char in '{[':
+                self.depth += 1
+            elif char in '}]':
+                self.depth -= 1
+                if self.depth == 0:
+                    self.result = ''.join(self.buffer)
+                    return self.result
+
+        return None
+
+    @property
+    def complete(self):
+        return self.result is not None
+
+    def partial_text(self):
+        """Text collected so far (used for repair when the object never closed)."""
+        return ''.join(self.buffer)
+
+
+def repair_json_text(text):
+    """
+    Apply cheap, well-bounded repairs to almost-JSON text:
+    strip code fences, drop trailing commas, escape raw newlines inside
+    strings and close an unterminated object.
+    """
+    text = re.sub(r'^\s*```(?:json)?\s*|\s*```\s*$', '', text.strip())
+
+    repaired = []
+    in_string = False
+    escaped = False
+    closers = []
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+            elif char == '\n':
+                repaired.append('\\n')
+                continue
+        elif char == '"':
+            in_string = True
+        elif char in '{[':
+            closers.append('}' if char == '{' else ']')
+        elif char in '}]':
+            # Drop a trailing comma before the closer; commas in strings are kept
+            last = len(repaired) - 1
+            while last >= 0 and repaired[last].isspace():
+                last -= 1
+            if last >= 0 and repaired[last] == ',':
+                del repaired[last]
+            if closers:
+                closers.pop()
+        repaired.append(char)
+
+    if in_string:
+        repaired.append('"')
+    text = ''.join(repaired)
+    if closers:
+        # A response cut off after a comma would otherwise close as {"a": 1,}
+        text = text.rstrip().rstrip(',')
+    return text + ''.join(reversed(closers))
+
+
+def validate_enhancement(data, schema=ENHANCEMENT_SCHEMA):
+    """
+    Validate a parsed enhancement object against the schema.
+
+    Returns (valid_fields, errors) where errors maps field name to a
+    human-readable reason (in Chinese, since it is fed back to Claude).
+    """
+    valid = {}
+    errors = {}
+
+    if not isinstance(data, dict):
+        return valid, {field: "缺少该字段" for field in schema}
+
+    for field, max_len in schema.items():
+        value = data.get(field)
+        if not isinstance(value, str) or not value.strip():
+            errors[field] = "缺少该字段或内容为空"
+            continue
+        value = value.strip()
+        if max_len and len(value) > max_len:
+            errors[field] = f"长度为{len(value)}字，超过{max_len}字限制"
+            continue
+        valid[field] = value
+
+    return valid, errors
+
+
+def parse_enhancement_text(text, opener='{'):
+    """
+    Extract and decode the JSON object (or array, with opener='[') from a
+    complete response text.
+
+    Returns the decoded value, or None if nothing could be recovered.
+    """
+    extractor = StreamingJSONExtractor(opener)
+    raw = extractor.feed(text) or extractor.partial_text()
+    if not raw:
+        return None
+
+    for candidate in (raw, repair_json_text(raw)):
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+    return None
+
+
+async def request_json(backend, prompt, system, validate, opener='{', attempts=MAX_ATTEMPTS, retry_prompt=None):
+    """
+    Ask the backend for JSON until it validates, at most `attempts` times.
+
+    Each attempt reads the response only until the first JSON object (or
+    array, with opener='[') closes, decodes it with bounded repair and passes
+    the result (None if nothing was recovered) to validate(data), which
+    returns (result, errors). An attempt without errors ends the request;
+    otherwise the next one sends retry_prompt(prompt, errors), or the same
+    prompt if no retry_prompt is given.
+
+    Returns (result, errors) of the last attempt. Backend errors propagate.
+    """
+    attempt_prompt = prompt
+    for attempt in range(attempts):
+        extractor = StreamingJSONExtractor(opener)
+        response_text = ""
+        async with aclosing(backend.stream(attempt_prompt, system)) as stream:
+            async for chunk in stream:
+                response_text += chunk
+                if extractor.feed(chunk):
+                    # Stop reading as soon as the JSON value is closed
+                    break
+
+        result, errors = validate(parse_enhancement_text(extractor.result or response_text, opener))
+        if not errors:
+            break
+        print(f"Claude response invalid ({', '.join(sorted(errors))}), attempt {attempt + 1}/{attempts}")
+        if retry_prompt is not None:
+            attempt_prompt = retry_prompt(prompt, errors)
+    return result, errors
+
+
+def record_field_results(valid, errors):
+    """Update the per-field success/failure counters."""
+    for field in valid:
+        FIELD_STATS[field]["ok"] += 1
+    for field in errors:
+        FIELD_STATS[field]["failed"] += 1
+
+
+def get_parse_stats():
+    """Return a plain-dict copy of the per-field counters."""
+    return {field: dict(counts) for field, counts in FIELD_STATS.items()}
+
+
+def build_retry_prompt(original_prompt, errors, schema=ENHANCEMENT_SCHEMA):
+    """Build a corrective prompt listing the fields that failed validation."""
+    problems = "\n".join(
+        f"- {field}: {reason}" + (f"（限{schema[field]}字以内）" if schema[field] else "")
+        for field, reason in errors.items()
+    )
+    return f"""{original_prompt}
+
+上一次的回答存在以下问题，请修正后重新输出完整的JSON（只输出JSON）：
+{problems}
+"""
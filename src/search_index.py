@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Search Index Generator
+Builds a compact, sharded inverted index over module and question titles,
+key_concepts, video_summary and textbook_content (the curated episode files
+and the generated ones in question_bank/), plus the small search widget
+embedded in every page. The browser only downloads the shards that contain
+the query's terms.
+
+Text is indexed as CJK bigrams and single characters: longer queries are
+matched by their bigrams, a one-character query by its character.
+
+    python src/search_index.py
+"""
+
+import json
+import math
+import re
+from collections import defaultdict
+from pathlib import Path
+
+SEARCH_PATH = "docs/search"
+DOCS_PER_CHUNK = 500
+TERMS_PER_SHARD = 1500
+QUESTION_DIRS = (".", "question_bank")
+
+# Field weights for scoring
+FIELD_WEIGHTS = {
+    "title": 4,
+    "key_concepts": 3,
+    "question": 2,
+    "video_summary": 1,
+    "textbook_content": 1
+}
+
+CJK_RUN_RE = re.compile(r'[㐀-鿿豈-﫿]+')
+WORD_RE = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text):
+    """Split text into CJK bigrams (single characters for 1-char runs) and lowercase words."""
+    tokens = []
+    for run in CJK_RUN_RE.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    tokens.extend(WORD_RE.findall(text.lower()))
+    return tokens
+
+
+def index_tokens(text):
+    """Query tokens plus every CJK character, so one-character queries find their documents."""
+    tokens = tokenize(text)
+    for run in CJK_RUN_RE.findall(text):
+        if len(run) > 1:
+            tokens.extend(run)
+    return tokens
+
+
+def term_hash(term):
+    """32-bit FNV-1a over UTF-16 code units (mirrored by termHash() in the widget JS)."""
+    h = 0x811c9dc5
+    data = term.encode('utf-16-le')
+    for i in range(0, len(data), 2):
+        h ^= data[i] | (data[i + 1] << 8)
+        h = (h * 0x01000193) & 0xffffffff
+    return h
+
+
+def _field_text(value):
+    if isinstance(value, list):
+        return " ".join(str(v) for v in value)
+    return str(value or "")
+
+
+def collect_documents(modules, question_sets, archive_dates):
+    """
+    Build the searchable documents.
+
+    Modules link to the latest archive page that showed them; episode
+    questions link to their video timestamp.
+    """
+    from generate_question import START_DATE, skipped_modules
+    from date_utils import to_ordinals, module_indices
+    from archive_store import archive_url
+
+    archive_dates = sorted(archive_dates)
+    indices = module_indices(to_ordinals(archive_dates), START_DATE, len(modules), skipped_modules(modules))
+    module_dates = {}
+    for date_str, module_index in zip(archive_dates, indices):
+        module_dates[modules[module_index]['id']] = date_str
+
+    documents = []
+    for module in modules:
+        date_str = module_dates.get(module['id'])
+        documents.append({
+            "title": module['title'],
+            "url": archive_url(date_str, "archive/") if date_str else "",
+            "meta": f"模块 {module['id']} · 第{module['episode']}集" + (f" · {date_str}" if date_str else ""),
+            "fields": {
+                "title": module['title'],
+                "key_concepts": module.get('key_concepts', []),
+                "question": module.get('question', "")
+            }
+        })
+
+    for episode, questions in question_sets:
+        for question in questions:
+            documents.append({
+                "title": question['title'],
+                "url": question.get('video_url', ""),
+                "meta": f"{question.get('id', '')} · {question.get('start_time', '')}",
+                "fields": {
+                    "title": question['title'],
+                    "key_concepts": question.get('key_concepts', []),
+                    "video_summary": question.get('video_summary', []),
+                    "textbook_content": question.get('textbook_content', "")
+                }
+            })
+
+    return documents
+
+
+def build_search_index(documents, search_path=SEARCH_PATH):
+    """
+    Write the index files:
+
+    - meta.json: shard and chunk counts
+    - shard-N.json: {term: [docIndex, weight, docIndex, weight, ...]}
+    - docs-N.json: [[title, url, meta], ...] for DOCS_PER_CHUNK documents
+    """
+    postings = defaultdict(lambda: defaultdict(int))
+    for doc_index, document in enumerate(documents):
+        for field, value in document["fields"].items():
+            weight = FIELD_WEIGHTS.get(field, 1)
+            for term in index_tokens(_field_text(value)):
+                postings[term][doc_index] += weight
+
+    shard_count = max(1, math.ceil(len(postings) / TERMS_PER_SHARD))
+    shards = [dict() for _ in range(shard_count)]
+    for term in sorted(postings):
+        flat = []
+        for doc_index, weight in sorted(postings[term].items()):
+            flat.extend((doc_index, weight))
+        shards[term_hash(term) % shard_count][term] = flat
+
+    chunk_count = max(1, math.ceil(len(documents) / DOCS_PER_CHUNK))
+
+    search_dir = Path(search_path)
+    search_dir.mkdir(parents=True, exist_ok=True)
+    for old_file in search_dir.glob("*.json"):
+        old_file.unlink()
+
+    def write(name, data):
+        with open(search_dir / name, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+
+    for shard_index, shard in enumerate(shards):
+        write(f"shard-{shard_index}.json", shard)
+    for chunk_index in range(chunk_count):
+        chunk = documents[chunk_index * DOCS_PER_CHUNK:(chunk_index + 1) * DOCS_PER_CHUNK]
+        write(f"docs-{chunk_index}.json", [[d["title"], d["url"], d["meta"]] for d in chunk])
+    write("meta.json", {
+        "shards": shard_count,
+        "chunk_size": DOCS_PER_CHUNK,
+        "documents": len(documents),
+        "terms": len(postings)
+    })
+
+    print(f"Generated search index: {len(documents)} documents, {len(postings)} terms, "
+          f"{shard_count} shard(s)")
+
+
+def generate_search_css():
+    """Generate CSS for the search widget."""
+    return '''
+        .search-box {
+            position: relative;
+            max-width: 360px;
+            margin: 12px auto 0;
+        }
+        .search-input {
+            width: 100%;
+            padding: 8px 16px;
+            border: 1px solid var(--color-border);
+            border-radius: 20px;
+            background: var(--color-surface);
+            font-size: 0.9rem;
+            color: var(--color-text);
+        }
+        .search-input:focus {
+            outline: none;
+            border-color: var(--color-primary);
+        }
+        .search-results {
+            display: none;
+            position: absolute;
+            top: 42px;
+            left: 0;
+            right: 0;
+            max-height: 360px;
+            overflow-y: auto;
+            text-align: left;
+            background: var(--color-surface);
+            border: 1px solid var(--color-border);
+            border-radius: var(--radius-md);
+            box-shadow: 0 8px 24px rgba(0,0,0,0.15);
+            z-index: 1001;
+        }
+        .search-results.show { display: block; }
+        .search-result {
+            display: block;
+            padding: 10px 16px;
+            color: var(--color-text);
+            text-decoration: none;
+            border-bottom: 1px solid var(--color-background);
+        }
+        .search-result:hover { background: var(--color-background); }
+        .search-result-meta { font-size: 0.75rem; color: var(--color-text-light); }
+        .search-empty { padding: 10px 16px; font-size: 0.85rem; color: var(--color-text-light); }
+    '''
+
+
+def generate_search_html():
+    """Generate the search widget markup."""
+    return '''<div class="search-box">
+                <input type="search" class="search-input" id="search-input" placeholder="🔍 搜索历史问题、概念…" autocomplete="off">
+                <div class="search-results" id="search-results"></div>
+            </div>'''
+
+
+def generate_search_js(root_prefix=""):
+    """
+    Generate the search widget JavaScript.
+
+    root_prefix is the relative path from the page to docs/ ("" or "../").
+    """
+    return f'''
+        const searchRoot = "{root_prefix}";
+        const searchCache = {{}};
+
+        function fetchSearchJSON(name) {{
+            if (!searchCache[name]) {{
+                searchCache[name] = fetch(searchRoot + 'search/' + name).then(r => r.json());
+            }}
+            return searchCache[name];
+        }}
+
+        function termHash(term) {{
+            let h = 0x811c9dc5;
+            for (let i = 0; i < term.length; i++) {{
+                h ^= term.charCodeAt(i);
+                h = Math.imul(h, 0x01000193) >>> 0;
+            }}
+            return h >>> 0;
+        }}
+
+        function searchTokens(text) {{
+            const tokens = [];
+            const runs = text.match(/[\\u3400-\\u9fff\\uf900-\\ufaff]+/g) || [];
+            runs.forEach(run => {{
+                if (run.length === 1) tokens.push(run);
+                for (let i = 0; i + 1 < run.length; i++) tokens.push(run.substr(i, 2));
+            }});
+            (text.toLowerCase().match(/[a-z0-9]+/g) || []).forEach(w => tokens.push(w));
+            return Array.from(new Set(tokens));
+        }}
+
+        async function runSearch(query) {{
+            const terms = searchTokens(query);
+            if (!terms.length) return [];
+            const meta = await fetchSearchJSON('meta.json');
+            const shardIds = Array.from(new Set(terms.map(t => termHash(t) % meta.shards)));
+            const shards = await Promise.all(shardIds.map(id => fetchSearchJSON('shard-' + id + '.json')));
+            const shardById = {{}};
+            shardIds.forEach((id, i) => {{ shardById[id] = shards[i]; }});
+
+            const scores = new Map();
+            const hits = new Map();
+            terms.forEach(term => {{
+                const postings = shardById[termHash(term) % meta.shards][term];
+                if (!postings) return;
+                for (let i = 0; i < postings.length; i += 2) {{
+                    const doc = postings[i];
+                    scores.set(doc, (scores.get(doc) || 0) + postings[i + 1]);
+                    hits.set(doc, (hits.get(doc) || 0) + 1);
+                }}
+            }});
+
+            const ranked = Array.from(scores.keys())
+                .sort((a, b) => (hits.get(b) - hits.get(a)) || (scores.get(b) - scores.get(a)))
+                .slice(0, 10);
+            const chunkIds = Array.from(new Set(ranked.map(doc => Math.floor(doc / meta.chunk_size))));
+            const chunks = {{}};
+            await Promise.all(chunkIds.map(id => fetchSearchJSON('docs-' + id + '.json').then(c => {{ chunks[id] = c; }})));
+            return ranked.map(doc => chunks[Math.floor(doc / meta.chunk_size)][doc % meta.chunk_size]);
+        }}
+
+        function escapeSearchHTML(text) {{
+            const div = document.createElement('div');
+            div.textContent = text;
+            return div.innerHTML;
+        }}
+
+        (function() {{
+            const input = document.getElementById('search-input');
+            const results = document.getElementById('search-results');
+            if (!input || !results) return;
+            let latestQuery = '';
+
+            input.addEventListener('input', async () => {{
+                const query = input.value.trim();
+                latestQuery = query;
+                if (!query) {{
+                    results.classList.remove('show');
+                    return;
+                }}
+                const docs = await runSearch(query);
+                if (query !== latestQuery) return;
+                results.innerHTML = docs.length ? docs.map(([title, url, meta]) => {{
+                    const href = /^https?:/.test(url) ? url : searchRoot + url;
+                    return '<a class="search-result" href="' + escapeSearchHTML(href) + '">' +
+                        '<div>' + escapeSearchHTML(title) + '</div>' +
+                        '<div class="search-result-meta">' + escapeSearchHTML(meta) + '</div></a>';
+                }}).join('') : '<div class="search-empty">没有找到相关内容</div>';
+                results.classList.add('show');
+            }});
+
+            document.addEventListener('click', event => {{
+                if (!input.parentElement.contains(event.target)) results.classList.remove('show');
+            }});
+        }})();
+    '''
+
+
+def generate_site_search_index(modules, archive_path=None, search_path=SEARCH_PATH):
+    """Collect modules, episode questions and archive dates and build the index."""
+    from generate_question import ARCHIVE_PATH
+    from concept_graph import load_question_sets
+
+    from archive_store import list_archived_dates
+
+    archive_dates = list_archived_dates(archive_path or ARCHIVE_PATH)
+    question_sets = []
+    for question_dir in QUESTION_DIRS:
+        question_sets += load_question_sets(base_dir=question_dir)
+
+    documents = collect_documents(modules, question_sets, archive_dates)
+    build_search_index(documents, search_path)
+
+
+def main():
+    from generate_question import load_modules
+
+    generate_site_search_index(load_modules()['modules'])
+
+
+if __name__ == "__main__":
+    main()
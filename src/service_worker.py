@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Service Worker Generator
+Writes docs/sw.js with a build-time precache manifest (content-hashed
+pages and assets: today's page, the archive index, the last N archive pages,
+the search index, the calendar year files and any textbook PDF slices), so repeat visits paint from
+cache and studying works offline.
+
+The precache name changes with the manifest, but a new worker copies the
+entries whose revision is unchanged from the previous precache and only
+downloads the changed files.
+
+    python src/service_worker.py
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+DOCS_PATH = "docs"
+PRECACHE_ARCHIVE_DAYS = int(os.getenv("PRECACHE_ARCHIVE_DAYS", "14"))
+CACHE_PREFIX = "tianji"
+
+# Third-party origins served stale-while-revalidate from a runtime cache
+RUNTIME_ORIGINS = [
+    "https://fonts.googleapis.com",
+    "https://fonts.gstatic.com",
+    "https://cdnjs.cloudflare.com",
+    "https://www.youtube.com"
+]
+
+
+def file_revision(path):
+    """Short content hash used as the precache revision."""
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:12]
+
+
+def build_precache_manifest(docs_path=DOCS_PATH, archive_days=PRECACHE_ARCHIVE_DAYS):
+    """
+    List the files to precache as [{"url": ..., "revision": ...}], with URLs
+    relative to docs/ (the service worker scope).
+    """
+    from archive_store import list_archived_dates, fragment_path, SHELL_PAGE
+
+    docs_dir = Path(docs_path)
+    archive_dir = docs_dir / "archive"
+
+    # Recent days, stored as full pages or as fragments for the shell page
+    archive_dates = list_archived_dates(archive_dir)[::-1][:archive_days]
+    archive_pages = []
+    for date_str in archive_dates:
+        archive_pages += [archive_dir / f"{date_str}.html", fragment_path(date_str, archive_dir)]
+
+    candidates = [docs_dir / "index.html", archive_dir / "index.html", archive_dir / SHELL_PAGE] + archive_pages
+    candidates += sorted((docs_dir / "search").glob("*.json"))
+    candidates += sorted((docs_dir / "calendar").glob("*.json"))
+    candidates += sorted((docs_dir / "fonts").glob("*.css")) + sorted((docs_dir / "fonts").glob("*.woff2"))
+    # Textbook PDF slices for the precached days, if the build produced any
+    for date_str in archive_dates:
+        candidates += sorted(docs_dir.glob(f"**/{date_str}*.pdf"))
+
+    manifest = []
+    for path in candidates:
+        if path.exists():
+            manifest.append({
+                "url": path.relative_to(docs_dir).as_posix(),
+                "revision": file_revision(path)
+            })
+    return manifest
+
+
+def generate_service_worker_js(manifest):
+    """Generate the service worker source with the manifest inlined."""
+    manifest_json = json.dumps(manifest, ensure_ascii=False, separators=(',', ':'))
+    version = hashlib.sha256(manifest_json.encode('utf-8')).hexdigest()[:12]
+    runtime_origins = json.dumps(RUNTIME_ORIGINS)
+
+    return f'''// Generated by src/service_worker.py - do not edit
+const PRECACHE = '{CACHE_PREFIX}-precache-{version}';
+const RUNTIME = '{CACHE_PREFIX}-runtime';
+const PRECACHE_MANIFEST = {manifest_json};
+const RUNTIME_ORIGINS = {runtime_origins};
+// Pages whose content changes without a URL change: serve cached, refresh in background
+const REVALIDATE_PATHS = ['index.html', 'archive/index.html', 'archive/day.html', 'search/meta.json'];
+
+const scopeUrl = new URL(self.registration.scope);
+const precacheUrls = new Map(PRECACHE_MANIFEST.map(entry => [new URL(entry.url, scopeUrl).href, entry.revision]));
+
+// Revisions of the entries in a precache, so the next version can reuse them
+const REVISIONS_KEY = new URL('__precache-revisions', scopeUrl).href;
+
+async function previousPrecache() {{
+    const entries = new Map();
+    for (const key of await caches.keys()) {{
+        if (!key.startsWith('{CACHE_PREFIX}-precache-') || key === PRECACHE) continue;
+        const cache = await caches.open(key);
+        const record = await cache.match(REVISIONS_KEY);
+        if (!record) continue;
+        for (const [href, revision] of Object.entries(await record.json())) {{
+            entries.set(href, {{ revision, cache }});
+        }}
+    }}
+    return entries;
+}}
+
+self.addEventListener('install', event => {{
+    // Copy unchanged entries from the previous precache, fetch only the changed ones
+    event.waitUntil((async () => {{
+        const cache = await caches.open(PRECACHE);
+        const previous = await previousPrecache();
+        await Promise.all(PRECACHE_MANIFEST.map(async entry => {{
+            const href = new URL(entry.url, scopeUrl).href;
+            const old = previous.get(href);
+            const cached = old && old.revision === entry.revision && await old.cache.match(href);
+            if (cached) return cache.put(href, cached);
+            return cache.add(new Request(entry.url, {{ cache: 'reload' }}));
+        }}));
+        await cache.put(REVISIONS_KEY, new Response(JSON.stringify(Object.fromEntries(precacheUrls))));
+        await self.skipWaiting();
+    }})());
+}});
+
+self.addEventListener('activate', event => {{
+    event.waitUntil(
+        caches.keys()
+            .then(keys => Promise.all(keys
+                .filter(key => key.startsWith('{CACHE_PREFIX}-precache-') && key !== PRECACHE)
+                .map(key => caches.delete(key))))
+            .then(() => self.clients.claim())
+    );
+}});
+
+function staleWhileRevalidate(event, cacheName, cacheKey) {{
+    const request = event.request;
+    const key = cacheKey || request;
+    const cached = caches.open(cacheName).then(cache => cache.match(key, {{ ignoreSearch: true }}));
+    const network = fetch(request).then(response => {{
+        if (response && (response.ok || response.type === 'opaque')) {{
+            const copy = response.clone();
+            caches.open(cacheName).then(cache => cache.put(key, copy));
+        }}
+        return response;
+    }});
+    event.waitUntil(network.then(() => undefined, () => undefined));
+    return cached.then(response => response || network);
+}}
+
+function normalizedUrl(url) {{
+    const href = url.origin + url.pathname;
+    return href.endsWith('/') ? href + 'index.html' : href;
+}}
+
+self.addEventListener('fetch', event => {{
+    const request = event.request;
+    if (request.method !== 'GET') return;
+    const url = new URL(request.url);
+
+    if (RUNTIME_ORIGINS.includes(url.origin)) {{
+        event.respondWith(staleWhileRevalidate(event, RUNTIME));
+        return;
+    }}
+    if (url.origin !== scopeUrl.origin) return;
+
+    const href = normalizedUrl(url);
+    const relative = href.startsWith(scopeUrl.href) ? href.slice(scopeUrl.href.length) : null;
+
+    if (relative !== null && REVALIDATE_PATHS.includes(relative)) {{
+        event.respondWith(staleWhileRevalidate(event, PRECACHE, href));
+        return;
+    }}
+    if (precacheUrls.has(href)) {{
+        // Content-hashed precache entry: cache first
+        event.respondWith(
+            caches.open(PRECACHE).then(cache => cache.match(href)).then(response => response || fetch(request))
+        );
+        return;
+    }}
+    // Everything else: network first, cached copy when offline
+    event.respondWith(
+        fetch(request).then(response => {{
+            if (response.ok) {{
+                const copy = response.clone();
+                caches.open(RUNTIME).then(cache => cache.put(request, copy));
+            }}
+            return response;
+        }}).catch(() => caches.match(request))
+    );
+}});
+'''
+
+
+def generate_sw_registration_js(root_prefix=""):
+    """Snippet that registers the service worker from a page ("" or "../" to docs/)."""
+    return f'''
+        if ('serviceWorker' in navigator) {{
+            window.addEventListener('load', () => {{
+                navigator.serviceWorker.register('{root_prefix}sw.js', {{ scope: '{root_prefix}./' }}).catch(() => {{}});
+            }});
+        }}
+    '''
+
+
+def generate_service_worker(docs_path=DOCS_PATH, archive_days=PRECACHE_ARCHIVE_DAYS):
+    """Write docs/precache-manifest.json and docs/sw.js."""
+    manifest = build_precache_manifest(docs_path, archive_days)
+    docs_dir = Path(docs_path)
+
+    with open(docs_dir / "precache-manifest.json", 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    with open(docs_dir / "sw.js", 'w', encoding='utf-8') as f:
+        f.write(generate_service_worker_js(manifest))
+
+    print(f"Generated service worker: {docs_dir / 'sw.js'} ({len(manifest)} precached files)")
+
+
+if __name__ == "__main__":
+    generate_service_worker()
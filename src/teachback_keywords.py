@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Teach-Back Keywords
+Precomputes, for each module, the concepts a good teach-back answer should
+cover, so the page can show which ones the learner's draft already explains
+while they type, without any server or model call.
+
+- The module's key_concepts are the core concepts. Concepts that the
+  questions of the module's episodes pair with them are added as related
+  concepts, if the lecture actually talks about them.
+- Each concept gets match terms: the concept itself, its parts for compounds
+  like "形与神" (all parts must appear), the stem without a suffix such as
+  星 or 宫, and the synonyms in SYNONYMS.
+- Weights grow with how often the concept is mentioned in the video_summary
+  of those questions and in the module's best transcript passages (see
+  transcript_index.py).
+
+The result is saved to src/teachback_keywords.json, keyed by module id with
+a hash of the module and of the question sets and transcripts it was built
+from, so edited modules and new sources are recomputed:
+    python src/teachback_keywords.py
+"""
+
+import hashlib
+import html
+import json
+import math
+import re
+from collections import Counter
+from pathlib import Path
+
+from concept_graph import load_all_question_sets, parse_episode_numbers
+from enhancement_cache import module_hash
+
+KEYWORDS_PATH = "src/teachback_keywords.json"
+MODULES_PATH = "src/modules.json"
+
+RELATED_MAX = 4
+# Transcript tokens searched for mentions
+PASSAGE_TOKENS = 1500
+
+COMPOUND_SPLIT_RE = re.compile(r'[与和及、/]')
+STEM_SUFFIXES = ("星", "宫", "学", "法")
+SPACE_RE = re.compile(r'\s+')
+
+# Common alternative names used in the course
+SYNONYMS = {
+    "紫微": ["紫薇", "帝星"],
+    "易经": ["周易"],
+    "八字": ["四柱"],
+    "风水": ["堪舆", "地理"],
+    "阳宅": ["住宅"],
+    "命宫": ["命盘"],
+    "卜卦": ["占卜"],
+}
+
+
+def normalize(text):
+    return SPACE_RE.sub('', text).lower()
+
+
+def concept_terms(concept):
+    """
+    Match alternatives for a concept; "a+b" means all of a and b must appear.
+    """
+    concept = normalize(concept)
+    alternatives = [concept]
+    parts = [part for part in COMPOUND_SPLIT_RE.split(concept) if part]
+    if len(parts) > 1:
+        alternatives.append('+'.join(parts))
+    for suffix in STEM_SUFFIXES:
+        if concept.endswith(suffix) and len(concept) - len(suffix) >= 2:
+            alternatives.append(concept[:-len(suffix)])
+    for alternative in list(alternatives):
+        alternatives += SYNONYMS.get(alternative, [])
+    return list(dict.fromkeys(alternatives))
+
+
+def count_mentions(terms, text):
+    """Occurrences of any alternative in text (a compound counts its rarest part)."""
+    return sum(min(text.count(part) for part in term.split('+')) for term in terms)
+
+
+def source_hash(question_sets):
+    """Content hash of the question sets and transcripts the keywords are built from."""
+    from transcript_index import transcripts_hash
+
+    payload = json.dumps([question_sets, PASSAGE_TOKENS], ensure_ascii=False, sort_keys=True)
+    digest = hashlib.sha256(payload.encode('utf-8'))
+    digest.update(transcripts_hash().encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def episode_questions(module, question_sets):
+    """Questions of the module's episodes that share a concept with it."""
+    episodes = set(parse_episode_numbers(module.get('episode', '')))
+    concepts = set(module['key_concepts'])
+    return [
+        question
+        for episode, questions in question_sets if episode in episodes
+        for question in questions
+        if concepts & set(question.get('key_concepts', []))
+        or any(concept in question.get('title', '') for concept in concepts)
+    ]
+
+
+def build_module_keywords(module, question_sets, passages_text=""):
+    """Weighted concepts for one module: {"hash", "concepts": [{"label", "terms", "weight", "core"}]}."""
+    questions = episode_questions(module, question_sets)
+    evidence = normalize(''.join(
+        ''.join(question.get('video_summary', [])) for question in questions
+    ) + passages_text)
+
+    concepts = []
+    for concept in module['key_concepts']:
+        terms = concept_terms(concept)
+        mentions = count_mentions(terms, evidence)
+        concepts.append({
+            "label": concept,
+            "terms": terms,
+            "weight": round(1 + math.log1p(mentions) / 2, 2),
+            "core": True
+        })
+
+    core = set(module['key_concepts'])
+    candidates = Counter(
+        concept for question in questions
+        for concept in question.get('key_concepts', []) if concept not in core
+    )
+    related = 0
+    for concept, _ in candidates.most_common():
+        if related >= RELATED_MAX:
+            break
+        terms = concept_terms(concept)
+        mentions = count_mentions(terms, evidence)
+        if not mentions:
+            continue
+        concepts.append({
+            "label": concept,
+            "terms": terms,
+            "weight": round(min(0.9, 0.4 + math.log1p(mentions) / 5), 2),
+            "core": False
+        })
+        related += 1
+
+    return {"hash": module_hash(module), "concepts": concepts}
+
+
+def passages_text(module):
+    from transcript_index import module_passages
+
+    return ''.join(passage['text'] for passage in module_passages(module, PASSAGE_TOKENS))
+
+
+def load_keywords(keywords_path=KEYWORDS_PATH):
+    path = Path(keywords_path)
+    if not path.exists():
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def update_keywords(modules, keywords_path=KEYWORDS_PATH, force=False):
+    """
+    Recompute the entries of new or edited modules, or of all modules when the
+    question sets or transcripts changed (or with force), and save the file if
+    anything changed; returns the keyword table.
+    """
+    table = load_keywords(keywords_path)
+    question_sets = load_all_question_sets()
+    source = source_hash(question_sets)
+    updated = {}
+    for module in modules:
+        entry = table.get(module['id'])
+        if (force or not entry or entry.get('hash') != module_hash(module)
+                or entry.get('source') != source):
+            entry = build_module_keywords(module, question_sets, passages_text(module))
+            entry['source'] = source
+        updated[module['id']] = entry
+
+    if updated != table:
+        with open(keywords_path, 'w', encoding='utf-8') as f:
+            json.dump(updated, f, ensure_ascii=False, indent=1)
+            f.write("\n")
+        print(f"Updated teach-back keywords: {keywords_path}")
+    return updated
+
+
+_cache = {}
+
+
+def module_keywords(module, keywords_path=KEYWORDS_PATH):
+    """The module's precomputed concepts, or its key concepts alone if not precomputed yet."""
+    path = Path(keywords_path)
+    mtime = path.stat().st_mtime if path.exists() else None
+    if _cache.get('mtime') != mtime or 'table' not in _cache:
+        _cache.update(mtime=mtime, table=load_keywords(keywords_path))
+
+    entry = _cache['table'].get(module['id'])
+    if entry and entry.get('hash') == module_hash(module):
+        return entry['concepts']
+    return build_module_keywords(module, [])['concepts']
+
+
+def build_teachback_html(concepts):
+    """Concept chips under the teach-back prompt, marked as covered by the page script."""
+    if not concepts:
+        return ""
+
+    chips_html = ""
+    for concept in concepts:
+        kind = "core" if concept['core'] else "related"
+        chips_html += (
+            f'<span class="teachback-chip {kind}" data-terms="{html.escape("|".join(concept["terms"]))}" '
+            f'data-weight="{concept["weight"]}">{html.escape(concept["label"])}</span>\n'
+        )
+    core_count = sum(1 for concept in concepts if concept['core'])
+    return f'''
+                    <div class="teachback-feedback">
+                        <div class="teachback-score" id="teachback-score">已讲到 0/{core_count} 个核心概念</div>
+                        <div class="teachback-chips">
+                            {chips_html}
+                        </div>
+                    </div>'''
+
+
+def generate_teachback_css():
+    """Generate CSS for the teach-back concept chips."""
+    return '''
+        .teachback-feedback { margin-top: 16px; }
+        .teachback-score {
+            font-size: 0.9rem;
+            color: var(--color-secondary);
+            margin-bottom: 8px;
+        }
+        .teachback-chips { display: flex; flex-wrap: wrap; gap: 8px; }
+        .teachback-chip {
+            padding: 4px 12px;
+            border-radius: 14px;
+            font-size: 0.85rem;
+            color: var(--color-text-light);
+            background: var(--color-background);
+            border: 1px solid var(--color-border);
+            transition: all 0.2s ease;
+        }
+        .teachback-chip.related { border-style: dashed; }
+        .teachback-chip.covered {
+            color: white;
+            background: #2E7D32;
+            border-color: #2E7D32;
+        }'''
+
+
+def generate_teachback_js():
+    """
+    Generate the teach-back scorer: on every edit of a prompt textarea, mark
+    the concept chips whose terms appear in the learner's text.
+    """
+    return '''
+        function scoreTeachback() {
+            const container = document.getElementById('prompt-container');
+            const score = document.getElementById('teachback-score');
+            if (!container || !score) return;
+            const text = Array.from(container.querySelectorAll('.prompt-textarea'))
+                .map(t => t.value).join('').replace(/\\s+/g, '').toLowerCase();
+            let core = 0, coreCovered = 0, total = 0, covered = 0;
+            container.parentNode.querySelectorAll('.teachback-chip').forEach(chip => {
+                const hit = text.length > 0 && chip.dataset.terms.split('|')
+                    .some(term => term.split('+').every(part => text.includes(part)));
+                const weight = parseFloat(chip.dataset.weight) || 1;
+                chip.classList.toggle('covered', hit);
+                total += weight;
+                if (hit) covered += weight;
+                if (chip.classList.contains('core')) {
+                    core++;
+                    if (hit) coreCovered++;
+                }
+            });
+            const percent = total ? Math.round(covered / total * 100) : 0;
+            score.textContent = '已讲到 ' + coreCovered + '/' + core + ' 个核心概念（覆盖 ' + percent + '%）';
+        }
+        document.addEventListener('input', event => {
+            if (event.target.classList && event.target.classList.contains('prompt-textarea')) scoreTeachback();
+        });'''
+
+
+def main():
+    with open(MODULES_PATH, 'r', encoding='utf-8') as f:
+        modules = json.load(f)['modules']
+    table = update_keywords(modules, force=True)
+    concepts = sum(len(entry['concepts']) for entry in table.values())
+    print(f"Modules: {len(table)}, concepts: {concepts}")
+
+
+if __name__ == "__main__":
+    main()
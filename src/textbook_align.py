@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Textbook Alignment Index
+Maps episode time ranges to textbook pages, so questions can point at the
+page a passage of the lecture corresponds to.
+
+- The textbook PDF (traditional characters) is extracted once into
+  .build-cache/textbook_pages.json; it is only re-extracted when the PDF
+  changes.
+- Both sides are normalized to simplified characters through a per-
+  character traditional -> simplified table, built with OpenCC for the
+  characters seen so far and cached in .build-cache/t2s_chars.json.
+- Each page is indexed by character shingles (n-grams over Han characters
+  only), weighted by inverse page frequency. Transcript windows are scored
+  against the pages; the best page is the window's page if it scores at
+  least MIN_SCORE and beats the runner-up by MIN_MARGIN (spoken chatter
+  scores low against every page, so it is left unaligned).
+
+The result, episode -> [{"start", "end", "page", "score"}], is written to
+src/textbook_alignment.json, and generated questions whose textbook_pages is
+still the placeholder are filled in:
+    python src/textbook_align.py
+
+Requires pypdf (PDF extraction) and opencc-python-reimplemented (character
+table) unless their cached outputs already exist; without them, or without
+the PDF, the alignment is skipped.
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from transcripts import load_all_transcripts, transcript_lines, format_timestamp, parse_timestamp
+
+TEXTBOOK_PDF = os.getenv("TEXTBOOK_PDF", "docs/天机道教材.pdf")
+PAGES_CACHE_PATH = ".build-cache/textbook_pages.json"
+CHAR_TABLE_PATH = ".build-cache/t2s_chars.json"
+ALIGNMENT_PATH = "src/textbook_alignment.json"
+QUESTION_DIRS = ("question_bank",)
+
+SHINGLE_SIZE = 3
+WINDOW_SECONDS = 90
+# Fraction of a window's shingle weight that must be found on the page, and
+# the lead over the second-best page
+MIN_SCORE = 0.15
+MIN_MARGIN = 0.05
+# Windows with fewer shingles (a few seconds of speech) are too short to place
+MIN_WINDOW_SHINGLES = 20
+# Score bonus for staying within NEIGHBOR_PAGES of the previous window's page,
+# since lectures usually move through the book in order
+NEIGHBOR_BONUS = 0.02
+NEIGHBOR_PAGES = 2
+EXCERPT_MAX = 120
+
+HAN_RE = re.compile(r'[㐀-䶿一-鿿豈-﫿]')
+SENTENCE_RE = re.compile(r'[^。！？；\n]+[。！？；]?')
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def load_textbook_pages(pdf_path=TEXTBOOK_PDF, cache_path=PAGES_CACHE_PATH):
+    """
+    Page texts of the textbook, as a list indexed by page number - 1.
+
+    The cached extraction is used when it matches the PDF (or when the PDF is
+    not available); otherwise the PDF is extracted with pypdf.
+    """
+    cache_file = Path(cache_path)
+    cached = None
+    if cache_file.exists():
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+
+    if not Path(pdf_path).exists():
+        if cached is None:
+            raise FileNotFoundError(f"Textbook not found: {pdf_path}")
+        return cached['pages']
+
+    source = file_hash(pdf_path)
+    if cached is not None and cached.get('source') == source:
+        return cached['pages']
+
+    from pypdf import PdfReader
+
+    pages = [page.extract_text() or "" for page in PdfReader(pdf_path).pages]
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(cache_file, 'w', encoding='utf-8') as f:
+        json.dump({"source": source, "pages": pages}, f, ensure_ascii=False)
+    print(f"Extracted {len(pages)} textbook pages from {pdf_path}")
+    return pages
+
+
+def load_char_table(texts, table_path=CHAR_TABLE_PATH):
+    """
+    Traditional -> simplified table covering every Han character in texts.
+
+    Characters already in the cached table are not converted again; only new
+    ones go through OpenCC.
+    """
+    table_file = Path(table_path)
+    table = {}
+    if table_file.exists():
+        with open(table_file, 'r', encoding='utf-8') as f:
+            table = json.load(f)
+
+    missing = sorted({c for text in texts for c in HAN_RE.findall(text)} - set(table))
+    if missing:
+        from opencc import OpenCC
+
+        converter = OpenCC('t2s')
+        # One conversion call; the output stays aligned with the input
+        # because character-level t2s never changes the length
+        converted = converter.convert(''.join(missing))
+        if len(converted) != len(missing):
+            converted = ''.join(converter.convert(c)[:1] or c for c in missing)
+        table.update(zip(missing, converted))
+        table_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(table_file, 'w', encoding='utf-8') as f:
+            json.dump(table, f, ensure_ascii=False, sort_keys=True)
+    return table
+
+
+def normalize(text, table):
+    """Han characters only, mapped to simplified."""
+    return ''.join(table.get(c, c) for c in HAN_RE.findall(text))
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class PageIndex:
+    """Inverted index of page shingles with inverse page frequency weights."""
+
+    def __init__(self, page_texts, table, size=SHINGLE_SIZE):
+        self.size = size
+        self.table = table
+        self.postings = defaultdict(list)
+        for page_number, text in enumerate(page_texts, start=1):
+            for shingle in shingles(normalize(text, table), size):
+                self.postings[shingle].append(page_number)
+        page_count = max(1, len(page_texts))
+        self.weights = {
+            shingle: math.log(1 + page_count / len(pages))
+            for shingle, pages in self.postings.items()
+        }
+
+    def score(self, text):
+        """Page -> fraction of the window's shingle weight found on that page."""
+        window = shingles(normalize(text, self.table), self.size)
+        if len(window) < MIN_WINDOW_SHINGLES:
+            return {}
+        # Shingles missing from the book still count in the total, so chatter
+        # that never appears in the textbook lowers every page's score
+        total = sum(self.weights.get(s, math.log(2)) for s in window)
+        scores = Counter()
+        for shingle in window:
+            weight = self.weights.get(shingle)
+            if weight is None:
+                continue
+            for page in self.postings[shingle]:
+                scores[page] += weight
+        return {page: value / total for page, value in scores.items()}
+
+
+def transcript_windows(transcript, window_seconds=WINDOW_SECONDS):
+    """(start, end, text) windows of about window_seconds each."""
+    windows = []
+    for start, text in transcript_lines(transcript['cues']):
+        if windows and start - windows[-1][0] < window_seconds:
+            windows[-1][1].append(text)
+        else:
+            windows.append((start, [text]))
+    end_of_episode = transcript['cues'][-1]['end'] if transcript['cues'] else 0
+    return [
+        (start, windows[i + 1][0] if i + 1 < len(windows) else end_of_episode, ''.join(texts))
+        for i, (start, texts) in enumerate(windows)
+    ]
+
+
+def align_episode(transcript, index):
+    """Best page per window, for windows that match a page well enough."""
+    aligned = []
+    previous = None
+    for start, end, text in transcript_windows(transcript):
+        scores = index.score(text)
+        if previous is not None:
+            for page in scores:
+                if abs(page - previous) <= NEIGHBOR_PAGES:
+                    scores[page] += NEIGHBOR_BONUS
+        if not scores:
+            continue
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        page, score = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        if score < MIN_SCORE or score - runner_up < MIN_MARGIN:
+            continue
+        previous = page
+        aligned.append({
+            "start": format_timestamp(start),
+            "end": format_timestamp(end),
+            "page": page,
+            "score": round(score, 3)
+        })
+    return aligned
+
+
+def build_alignment(transcripts, page_texts, table):
+    index = PageIndex(page_texts, table)
+    return {str(t['episode']): align_episode(t, index) for t in transcripts}
+
+
+def pages_for_range(entries, start, end):
+    """Pages of the aligned windows overlapping [start, end] seconds, best first."""
+    weights = Counter()
+    for entry in entries:
+        entry_start, entry_end = parse_timestamp(entry['start']), parse_timestamp(entry['end'])
+        overlap = min(end, entry_end) - max(start, entry_start)
+        if overlap > 0:
+            weights[entry['page']] += overlap * entry['score']
+    return [page for page, _ in weights.most_common()]
+
+
+def best_excerpt(page_text, query_text, table, size=SHINGLE_SIZE, max_len=EXCERPT_MAX):
+    """The sentence of the page (original script) sharing most shingles with the query."""
+    query = shingles(normalize(query_text, table), size)
+    best, best_overlap = "", 0
+    for sentence in SENTENCE_RE.findall(page_text):
+        overlap = len(shingles(normalize(sentence, table), size) & query)
+        if overlap > best_overlap:
+            best, best_overlap = sentence.strip(), overlap
+    return best[:max_len]
+
+
+def fill_question_files(alignment, transcripts, page_texts, table, question_dirs=QUESTION_DIRS):
+    """Fill placeholder textbook fields of generated questions; returns the number filled."""
+    from question_bank import TEXTBOOK_PLACEHOLDER
+
+    by_episode = {t['episode']: t for t in transcripts}
+    filled = 0
+    for question_dir in question_dirs:
+        for path in sorted(Path(question_dir).glob("episode_*_all_questions.json")):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            entries = alignment.get(str(data['episode']), [])
+            transcript = by_episode.get(data['episode'])
+            changed = False
+            for question in data['questions']:
+                if question.get('textbook_pages') != TEXTBOOK_PLACEHOLDER:
+                    continue
+                start = parse_timestamp(question['start_time'])
+                end = parse_timestamp(question['end_time'])
+                if start is None or end is None:
+                    continue
+                pages = pages_for_range(entries, start, max(end, start + 1))
+                if not pages:
+                    continue
+                question['textbook_pages'] = f"Page {pages[0]}"
+                if transcript is not None:
+                    spoken = ''.join(c['text'] for c in transcript['cues'] if start <= c['start'] <= end)
+                    question['textbook_content'] = best_excerpt(page_texts[pages[0] - 1], spoken, table)
+                changed = True
+                filled += 1
+            if changed:
+                with open(path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False, indent=2)
+                    f.write("\n")
+    return filled
+
+
+def main():
+    transcripts = load_all_transcripts()
+    try:
+        page_texts = load_textbook_pages()
+        table = load_char_table(page_texts + [''.join(c['text'] for c in t['cues']) for t in transcripts])
+    except (FileNotFoundError, ImportError) as e:
+        print(f"Textbook alignment skipped: {e}")
+        return
+
+    alignment = build_alignment(transcripts, page_texts, table)
+    with open(ALIGNMENT_PATH, 'w', encoding='utf-8') as f:
+        json.dump({"pages": len(page_texts), "episodes": alignment}, f, ensure_ascii=False, indent=1)
+        f.write("\n")
+    windows = sum(len(entries) for entries in alignment.values())
+    print(f"Aligned {windows} transcript window(s) across {len(alignment)} episode(s) -> {ALIGNMENT_PATH}")
+
+    filled = fill_question_files(alignment, transcripts, page_texts, table)
+    print(f"Filled textbook pages for {filled} question(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Transcript Retrieval Index
+BM25 over transcript windows, so enhancement prompts can quote what the
+lecture actually says about a module instead of letting the model guess.
+
+- Each transcript is cut into windows of about WINDOW_SECONDS; a window is
+  one passage with its episode and start/end time.
+- Text is tokenized into overlapping bigrams of Han characters (plus
+  lowercase words of letters and digits), so no word segmenter is needed.
+- The index is written once to .build-cache/transcript_bm25.idx as flat
+  binary arrays (sorted term table, postings, passage metadata and text) and
+  opened with mmap: loading costs no parsing, and a query only touches the
+  postings of its own terms. It is rebuilt when the transcripts change.
+
+    python src/transcript_index.py build
+    python src/transcript_index.py search "紫微 天府" -k 5
+"""
+
+import argparse
+import hashlib
+import heapq
+import json
+import math
+import mmap
+import re
+import sys
+import time
+from array import array
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from transcripts import TRANSCRIPT_DIR, load_all_transcripts, transcript_lines, format_timestamp
+from model_scheduler import CJK_CHAR_RE, estimate_tokens
+
+INDEX_PATH = ".build-cache/transcript_bm25.idx"
+MAGIC = b"BM25IDX1"
+
+WINDOW_SECONDS = 60
+K1 = 1.5
+B = 0.75
+TOP_K = 4
+# Score multiplier for passages from the module's own episodes
+EPISODE_BOOST = 1.5
+
+HAN_RUN_RE = re.compile(r'[㐀-䶿一-鿿豈-﫿]+|[0-9a-z]+')
+HAN_START_RE = re.compile(r'[㐀-䶿一-鿿豈-﫿]')
+
+# Section name -> array typecode (None for raw bytes), in file order
+SECTIONS = (
+    ("term_offsets", "I"), ("terms", None),
+    ("posting_offsets", "I"), ("posting_docs", "I"), ("posting_tfs", "H"),
+    ("doc_lengths", "I"), ("doc_episodes", "H"), ("doc_starts", "I"), ("doc_ends", "I"),
+    ("text_offsets", "I"), ("texts", None),
+)
+
+
+def tokenize(text):
+    """Han bigrams (a lone Han character stays a unigram) and alphanumeric words."""
+    tokens = []
+    for run in HAN_RUN_RE.findall(text.lower()):
+        if HAN_START_RE.match(run) and len(run) > 1:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def transcript_passages(transcript, window_seconds=WINDOW_SECONDS):
+    """(start, end, text) passages of about window_seconds each."""
+    lines = transcript_lines(transcript['cues'], window_seconds)
+    end_of_episode = transcript['cues'][-1]['end'] if transcript['cues'] else 0
+    return [
+        (start, lines[i + 1][0] if i + 1 < len(lines) else end_of_episode, text)
+        for i, (start, text) in enumerate(lines)
+    ]
+
+
+def transcripts_hash(transcript_dir=TRANSCRIPT_DIR):
+    """Content hash of the transcript files the index is built from."""
+    digest = hashlib.sha256(f"{WINDOW_SECONDS}".encode('utf-8'))
+    for path in sorted(Path(transcript_dir).glob("Episode_*_Transcript.txt")):
+        digest.update(path.name.encode('utf-8'))
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def build_index(transcripts, source, index_path=INDEX_PATH):
+    """Write the index file for the given transcripts."""
+    postings = defaultdict(list)
+    data = {name: array(code) if code else bytearray() for name, code in SECTIONS}
+    data['text_offsets'].append(0)
+
+    doc = 0
+    for transcript in transcripts:
+        for start, end, text in transcript_passages(transcript):
+            counts = Counter(tokenize(text))
+            if not counts:
+                continue
+            for term, tf in counts.items():
+                postings[term].append((doc, min(tf, 0xFFFF)))
+            data['doc_lengths'].append(sum(counts.values()))
+            data['doc_episodes'].append(transcript['episode'])
+            data['doc_starts'].append(int(start))
+            data['doc_ends'].append(int(end))
+            data['texts'] += text.encode('utf-8')
+            data['text_offsets'].append(len(data['texts']))
+            doc += 1
+
+    # Terms sorted by their UTF-8 bytes, the order binary search compares in
+    encoded_terms = sorted(term.encode('utf-8') for term in postings)
+    data['term_offsets'].append(0)
+    data['posting_offsets'].append(0)
+    for encoded in encoded_terms:
+        data['terms'] += encoded
+        data['term_offsets'].append(len(data['terms']))
+        for doc_id, tf in postings[encoded.decode('utf-8')]:
+            data['posting_docs'].append(doc_id)
+            data['posting_tfs'].append(tf)
+        data['posting_offsets'].append(len(data['posting_docs']))
+
+    blobs = [bytes(data[name]) if code is None else data[name].tobytes() for name, code in SECTIONS]
+    lengths = data['doc_lengths']
+    header = {
+        "source": source,
+        "byteorder": sys.byteorder,
+        "docs": len(lengths),
+        "terms": len(encoded_terms),
+        "avgdl": sum(lengths) / len(lengths) if lengths else 0.0,
+        "sections": []
+    }
+    # Section offsets depend on the header length, so lay out twice
+    for _ in range(2):
+        header_bytes = json.dumps(header).encode('utf-8')
+        offset = _align(len(MAGIC) + 4 + len(header_bytes))
+        header['sections'] = []
+        for blob in blobs:
+            header['sections'].append([offset, len(blob)])
+            offset = _align(offset + len(blob))
+    header_bytes = json.dumps(header).encode('utf-8')
+
+    path = Path(index_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC + len(header_bytes).to_bytes(4, 'little') + header_bytes)
+        for (offset, _), blob in zip(header['sections'], blobs):
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(blob)
+    tmp_path.replace(path)
+    return path
+
+
+def _align(offset, size=8):
+    return (offset + size - 1) // size * size
+
+
+class TranscriptIndex:
+    """Read-only view of an index file through mmap."""
+
+    def __init__(self, index_path=INDEX_PATH):
+        with open(index_path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"Not a transcript index: {index_path}")
+        header_start = len(MAGIC) + 4
+        header_length = int.from_bytes(self.map[len(MAGIC):header_start], 'little')
+        self.header = json.loads(self.map[header_start:header_start + header_length])
+        self.doc_count = self.header['docs']
+        self.term_count = self.header['terms']
+        self.avgdl = self.header['avgdl'] or 1.0
+
+        view = memoryview(self.map)
+        for (name, code), (offset, length) in zip(SECTIONS, self.header['sections']):
+            section = view[offset:offset + length]
+            setattr(self, name, section.cast(code) if code else section)
+
+    @property
+    def source(self):
+        return self.header['source']
+
+    def close(self):
+        for name, _ in SECTIONS:
+            getattr(self, name).release()
+        self.map.close()
+
+    def term_id(self, term):
+        """Position of term in the sorted term table, or None."""
+        target = term.encode('utf-8')
+        low, high = 0, self.term_count
+        while low < high:
+            middle = (low + high) // 2
+            candidate = bytes(self.terms[self.term_offsets[middle]:self.term_offsets[middle + 1]])
+            if candidate < target:
+                low = middle + 1
+            elif candidate > target:
+                high = middle
+            else:
+                return middle
+        return None
+
+    def passage(self, doc, score=0.0):
+        text = bytes(self.texts[self.text_offsets[doc]:self.text_offsets[doc + 1]]).decode('utf-8')
+        return {
+            "episode": self.doc_episodes[doc],
+            "start": format_timestamp(self.doc_starts[doc]),
+            "end": format_timestamp(self.doc_ends[doc]),
+            "text": text,
+            "score": round(score, 3)
+        }
+
+    def search(self, query, k=TOP_K, episodes=None, episode_boost=EPISODE_BOOST):
+        """Top-k passages for the query by BM25; passages of episodes are boosted."""
+        scores = defaultdict(float)
+        for term, query_tf in Counter(tokenize(query)).items():
+            term = self.term_id(term)
+            if term is None:
+                continue
+            first, last = self.posting_offsets[term], self.posting_offsets[term + 1]
+            df = last - first
+            idf = math.log(1 + (self.doc_count - df + 0.5) / (df + 0.5))
+            for i in range(first, last):
+                doc, tf = self.posting_docs[i], self.posting_tfs[i]
+                norm = K1 * (1 - B + B * self.doc_lengths[doc] / self.avgdl)
+                scores[doc] += query_tf * idf * tf * (K1 + 1) / (tf + norm)
+        if episodes:
+            for doc in scores:
+                if self.doc_episodes[doc] in episodes:
+                    scores[doc] *= episode_boost
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [self.passage(doc, score) for doc, score in best]
+
+
+_index = None
+
+
+def get_index(index_path=INDEX_PATH, transcript_dir=TRANSCRIPT_DIR):
+    """The index for the current transcripts (built if missing or stale), or None without transcripts."""
+    global _index
+    if _index is not None:
+        return _index
+    if not any(Path(transcript_dir).glob("Episode_*_Transcript.txt")):
+        return None
+
+    source = transcripts_hash(transcript_dir)
+    if Path(index_path).exists():
+        index = TranscriptIndex(index_path)
+        if index.source == source and index.header['byteorder'] == sys.byteorder:
+            _index = index
+            return _index
+        index.close()
+
+    build_index(load_all_transcripts(transcript_dir), source, index_path)
+    _index = TranscriptIndex(index_path)
+    print(f"Built transcript index: {_index.doc_count} passages, {_index.term_count} terms -> {index_path}")
+    return _index
+
+
+def module_query(module):
+    """Query text for a module: title, question and key concepts."""
+    return ' '.join([module['title'], module['question']] + list(module['key_concepts']))
+
+
+def truncate_to_tokens(text, max_tokens):
+    """Longest prefix of text whose estimate_tokens() is within max_tokens."""
+    cjk = other = 0
+    for end, char in enumerate(text):
+        if CJK_CHAR_RE.match(char):
+            cjk += 1
+        else:
+            other += 1
+        if cjk + (other + 3) // 4 > max_tokens:
+            return text[:end]
+    return text
+
+
+def module_passages(module, max_tokens, k=TOP_K):
+    """
+    Best passages for a module that fit in max_tokens (estimated), best first.
+
+    The module's own episodes are boosted. A passage that does not fit is
+    skipped, except that the best one is cut down to the budget.
+    """
+    index = get_index()
+    if index is None or max_tokens <= 0:
+        return []
+    from concept_graph import parse_episode_numbers
+
+    episodes = set(parse_episode_numbers(module.get('episode', '')))
+    selected = []
+    remaining = max_tokens
+    for passage in index.search(module_query(module), k, episodes):
+        tokens = estimate_tokens(passage['text'])
+        if tokens > remaining:
+            if selected:
+                continue
+            passage['text'] = truncate_to_tokens(passage['text'], remaining)
+            tokens = estimate_tokens(passage['text'])
+        selected.append(passage)
+        remaining -= tokens
+    return selected
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BM25 retrieval over episode transcripts")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("build", help="build the index if the transcripts changed")
+    search_parser = subparsers.add_parser("search", help="print the best passages for a query")
+    search_parser.add_argument("query")
+    search_parser.add_argument("-k", type=int, default=TOP_K)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    index = get_index()
+    if index is None:
+        print(f"No transcripts in {TRANSCRIPT_DIR}")
+        return
+    print(f"{index.doc_count} passages, {index.term_count} terms ({(time.perf_counter() - started) * 1000:.1f} ms)")
+
+    if args.command == "search":
+        started = time.perf_counter()
+        results = index.search(args.query, args.k)
+        print(f"Search: {(time.perf_counter() - started) * 1000:.1f} ms")
+        for passage in results:
+            print(f"\n[第{passage['episode']}集 {passage['start']}-{passage['end']}] score {passage['score']}")
+            print(passage['text'])
+
+
+if __name__ == "__main__":
+    main()
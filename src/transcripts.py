@@ -0,0 +1,116 @@
+"""
+Transcript Loader
+Parses the WebVTT transcripts saved by extract_youtube_transcripts.py
+"""
+
+import re
+from pathlib import Path
+
+TRANSCRIPT_DIR = "docs/transcripts"
+# Cues are merged into one timestamped line per this many seconds
+LINE_SECONDS = 30
+
+CUE_TIMING_RE = re.compile(r'(\d{2}):(\d{2}):(\d{2})\.(\d{3})\s+-->\s+(\d{2}):(\d{2}):(\d{2})\.(\d{3})')
+EPISODE_FILE_RE = re.compile(r'Episode_(\d+)_Transcript\.txt$')
+TIMESTAMP_RE = re.compile(r'^(\d{2}):(\d{2}):(\d{2})$')
+
+
+def _timing_to_seconds(h, m, s, ms):
+    return int(h) * 3600 + int(m) * 60 + int(s) + int(ms) / 1000
+
+
+def format_timestamp(seconds):
+    """Format seconds as HH:MM:SS (the format used in question JSON files)."""
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def parse_timestamp(value):
+    """Parse HH:MM:SS into seconds; None if malformed."""
+    match = TIMESTAMP_RE.match(value) if isinstance(value, str) else None
+    if not match:
+        return None
+    h, m, s = (int(part) for part in match.groups())
+    return h * 3600 + m * 60 + s if m < 60 and s < 60 else None
+
+
+def parse_transcript(path):
+    """
+    Parse one Episode_XX_Transcript.txt file.
+
+    Returns a dict with the episode number, title, video URL and a list of
+    cues, each cue being {"start": float, "end": float, "text": str}.
+    """
+    path = Path(path)
+    match = EPISODE_FILE_RE.search(path.name)
+    episode = int(match.group(1)) if match else 0
+
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = f.read().splitlines()
+
+    title = ""
+    video_url = ""
+    if lines and lines[0].startswith("Episode "):
+        title = lines[0].split(":", 1)[-1].strip()
+    if len(lines) > 1 and lines[1].startswith("Video URL:"):
+        video_url = lines[1].split(":", 1)[-1].strip()
+
+    cues = []
+    current = None
+    for line in lines:
+        timing = CUE_TIMING_RE.match(line)
+        if timing:
+            groups = timing.groups()
+            current = {
+                "start": _timing_to_seconds(*groups[:4]),
+                "end": _timing_to_seconds(*groups[4:]),
+                "text": ""
+            }
+            cues.append(current)
+        elif current is not None:
+            text = line.strip()
+            if text:
+                current["text"] += text
+            else:
+                current = None
+
+    # Drop cues with no text (VTT styling artifacts)
+    cues = [cue for cue in cues if cue["text"]]
+
+    return {
+        "episode": episode,
+        "title": title,
+        "video_url": video_url,
+        "cues": cues
+    }
+
+
+def load_all_transcripts(transcript_dir=TRANSCRIPT_DIR):
+    """Load every episode transcript in the directory, sorted by episode."""
+    transcript_dir = Path(transcript_dir)
+    if not transcript_dir.exists():
+        return []
+
+    transcripts = []
+    for file in sorted(transcript_dir.glob("Episode_*_Transcript.txt")):
+        transcript = parse_transcript(file)
+        if transcript["cues"]:
+            transcripts.append(transcript)
+
+    return sorted(transcripts, key=lambda t: t["episode"])
+
+
+def transcript_text(transcript):
+    """Concatenate all cue text of a transcript into one string."""
+    return "".join(cue["text"] for cue in transcript["cues"])
+
+
+def transcript_lines(cues, line_seconds=LINE_SECONDS):
+    """Merge cues into (start_seconds, text) lines of about line_seconds each."""
+    lines = []
+    for cue in cues:
+        if lines and cue['start'] - lines[-1][0] < line_seconds:
+            lines[-1][1].append(cue['text'])
+        else:
+            lines.append((cue['start'], [cue['text']]))
+    return [(start, ' '.join(texts)) for start, texts in lines]
@@ -0,0 +1,42 @@
+import pytest
+
+import archive_store
+
+PAGE = '''<html><body><div class="card">
+<div class="card-header"><h2 class="module-title" id="module-title">真理 &amp; 天纪</h2></div>
+<div class="card-body" id="day-content">
+    <div class="question-section"><div class="question-text">什么是真理？</div></div>
+    <div class="enhanced">已发布的增强内容</div>
+</div>
+</div><footer></footer></body></html>'''
+
+
+def test_extract_day_keeps_published_body():
+    day = archive_store.extract_day(PAGE, "2026-01-21")
+    assert day['title'] == "真理 & 天纪"
+    assert day['display'] == "2026/01/21"
+    assert day['body'].strip().startswith('<div class="question-section">')
+    assert "已发布的增强内容" in day['body']
+    assert day['body'].rstrip().endswith('<div class="enhanced">已发布的增强内容</div>')
+
+
+def test_migrate_keeps_pages_when_one_cannot_be_extracted(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive_store, "write_archive_shell", lambda *args, **kwargs: None)
+    (tmp_path / "2026-01-21.html").write_text(PAGE, encoding="utf-8")
+    (tmp_path / "2026-01-22.html").write_text("<html><body>broken</body></html>", encoding="utf-8")
+
+    with pytest.raises(ValueError):
+        archive_store.migrate_pages(tmp_path)
+
+    assert (tmp_path / "2026-01-21.html").exists()
+    assert (tmp_path / "2026-01-22.html").exists()
+    assert not (tmp_path / archive_store.FRAGMENT_DIR).exists()
+
+
+def test_migrate_replaces_pages_with_their_content(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive_store, "write_archive_shell", lambda *args, **kwargs: None)
+    (tmp_path / "2026-01-21.html").write_text(PAGE, encoding="utf-8")
+
+    assert archive_store.migrate_pages(tmp_path) == ["2026-01-21"]
+    assert not (tmp_path / "2026-01-21.html").exists()
+    assert archive_store.load_fragment("2026-01-21", tmp_path) == archive_store.extract_day(PAGE, "2026-01-21")
@@ -0,0 +1,14 @@
+import json
+
+from batch_enhance import split_batch_response
+from enhancement_backends import SYNTHETIC_RESPONSE
+
+
+def test_module_ids_match_regardless_of_padding_and_type():
+    content = json.loads(SYNTHETIC_RESPONSE)
+    modules = [{"id": "001"}, {"id": "002"}, {"id": "010"}]
+    data = [dict(content, module_id=1), dict(content, module_id="2"), dict(content, module_id="011")]
+
+    valid, failed = split_batch_response(data, modules)
+    assert sorted(valid) == ["001", "002"]
+    assert failed == [{"id": "010"}]
@@ -0,0 +1,22 @@
+import json
+
+import calendar_data
+
+
+def test_site_state_writes_into_output_root(tmp_path):
+    calendar_data.write_site_state("2027-03-01", first_date="2026-01-21", output_root=tmp_path)
+
+    assert json.loads((tmp_path / "site-state.json").read_text()) == {
+        "first_date": "2026-01-21", "last_date": "2027-03-01"
+    }
+    assert sorted(path.name for path in (tmp_path / "calendar").iterdir()) == ["2026.json", "2027.json"]
+
+
+def test_year_files_are_rewritten_only_when_content_differs(tmp_path):
+    calendar_dir = tmp_path / "calendar"
+    assert calendar_data.write_calendar_years(2026, 2027, calendar_dir) == [2026, 2027]
+    assert calendar_data.write_calendar_years(2026, 2027, calendar_dir) == []
+
+    (calendar_dir / "2027.json").write_text("[]")
+    assert calendar_data.write_calendar_years(2026, 2027, calendar_dir) == [2027]
+    assert len(json.loads((calendar_dir / "2027.json").read_text())) == 12
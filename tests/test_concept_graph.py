@@ -0,0 +1,38 @@
+import json
+
+import concept_graph
+
+
+def make_module(module_id, concepts):
+    return {"id": module_id, "title": f"模块{module_id}", "episode": "1", "key_concepts": concepts}
+
+
+def test_graph_is_rebuilt_when_modules_change(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    graph_path = tmp_path / "concept_graph.json"
+    modules = [make_module("001", ["紫微", "天府"]), make_module("002", ["紫微", "七杀"])]
+
+    graph = concept_graph.load_concept_graph(graph_path, modules)
+    assert graph["modules"]["001"]["concepts"] == ["紫微", "天府"]
+    assert concept_graph.load_concept_graph(graph_path, modules) == graph
+
+    modules[0]["key_concepts"] = ["紫微", "破军"]
+    graph = concept_graph.load_concept_graph(graph_path, modules)
+    assert graph["modules"]["001"]["concepts"] == ["紫微", "破军"]
+    assert "破军" in graph["edges"]
+
+
+def test_graph_includes_and_tracks_the_question_bank(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    graph_path = tmp_path / "concept_graph.json"
+    modules = [make_module("001", ["紫微", "天府"])]
+    graph = concept_graph.load_concept_graph(graph_path, modules)
+    assert "贪狼" not in graph["edges"]
+
+    (tmp_path / "question_bank").mkdir()
+    questions = {"episode": 1, "questions": [{"id": "EP01-Q01", "title": "紫微与贪狼", "key_concepts": ["紫微", "贪狼"]}]}
+    (tmp_path / "question_bank" / "episode_01_all_questions.json").write_text(
+        json.dumps(questions, ensure_ascii=False), encoding="utf-8")
+
+    graph = concept_graph.load_concept_graph(graph_path, modules)
+    assert "贪狼" in graph["edges"]["紫微"]
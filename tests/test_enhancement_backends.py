@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+import enhancement_backends
+from enhancement_backends import BackendError, FixtureStore
+
+
+async def collect(backend, prompt):
+    return "".join([chunk async for chunk in backend.stream(prompt)])
+
+
+def test_replay_miss_raises_by_default(tmp_path, monkeypatch):
+    monkeypatch.setattr(enhancement_backends, "FixtureStore", lambda: FixtureStore(tmp_path))
+    monkeypatch.delenv("REPLAY_SYNTHESIZE", raising=False)
+    backend = enhancement_backends.create_backend("replay")
+
+    with pytest.raises(BackendError, match="No recorded response"):
+        asyncio.run(collect(backend, "从未录制的提示词"))
+
+
+def test_replay_serves_recorded_response(tmp_path):
+    store = FixtureStore(tmp_path)
+    store.save("提示词", '{"daily_tip": "录制的回复"}')
+    backend = enhancement_backends.ReplayBackend(store)
+    assert asyncio.run(collect(backend, "提示词")) == '{"daily_tip": "录制的回复"}'
+
+
+def test_claude_session_opens_a_fresh_conversation_after_max_prompts(monkeypatch):
+    import claude_code_sdk
+    from claude_code_sdk import AssistantMessage, TextBlock
+
+    clients = []
+
+    class FakeClient:
+        def __init__(self, options):
+            self.prompts = []
+            self.connected = False
+            clients.append(self)
+
+        async def connect(self):
+            self.connected = True
+
+        async def disconnect(self):
+            self.connected = False
+
+        async def query(self, prompt):
+            self.prompts.append(prompt)
+
+        async def receive_response(self):
+            yield AssistantMessage(content=[TextBlock(text=f"回复{len(self.prompts)}")], model="fake")
+
+    monkeypatch.setattr(claude_code_sdk, "ClaudeSDKClient", FakeClient)
+    monkeypatch.setattr(enhancement_backends.ClaudeSDKBackend, "options", lambda self, system=None: None)
+
+    async def run():
+        async with enhancement_backends.ClaudeSDKBackend().session("系统") as session:
+            session.max_prompts = 2
+            return [await collect(session, f"提示{i}") for i in range(5)]
+
+    assert asyncio.run(run()) == ["回复1", "回复2", "回复1", "回复2", "回复1"]
+    assert [client.prompts for client in clients] == [["提示0", "提示1"], ["提示2", "提示3"], ["提示4"]]
+    assert not any(client.connected for client in clients)
@@ -0,0 +1,21 @@
+import enhancement_cache
+from enhancement_cache import EnhancementCache
+
+MODULE = {"id": "001", "title": "模块", "episode": "1", "textbook_pages": "1",
+          "question": "问题", "key_concepts": ["紫微"]}
+
+
+def test_cache_follows_the_prompt(tmp_path, monkeypatch):
+    prompts = {"system": "系统提示词", "module": "模块提示词"}
+    monkeypatch.setattr(enhancement_cache, "system_prompt", lambda: prompts["system"])
+    monkeypatch.setattr(enhancement_cache, "build_module_prompt", lambda module: prompts["module"])
+    cache = EnhancementCache(tmp_path)
+    cache.put(MODULE, {"daily_tip": "先看视频"})
+    assert cache.get(MODULE) == {"daily_tip": "先看视频"}
+
+    prompts["system"] = "改过的系统提示词"
+    assert cache.get(MODULE) is None
+
+    prompts["system"] = "系统提示词"
+    prompts["module"] = "附有新课堂原话的模块提示词"
+    assert cache.get(MODULE) is None
@@ -0,0 +1,131 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import enhancement_backends
+import model_scheduler
+from enhancement_backends import SYNTHETIC_RESPONSE, BackendError, FixtureStore, ReplayBackend, ThrottledError
+from model_scheduler import LANE_BACKFILL, LANE_TODAY, ModelScheduler, ScheduledBackend, is_throttling_error
+
+
+class StatusError(Exception):
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def test_throttled_errors():
+    assert is_throttling_error(ThrottledError("429 rate limit exceeded (replay)"))
+    assert is_throttling_error(StatusError("slow down", 529))
+    assert is_throttling_error(RuntimeError("HTTP 429 Too Many Requests"))
+    assert is_throttling_error(RuntimeError("API overloaded"))
+
+
+def test_failures_that_only_look_like_throttling():
+    assert not is_throttling_error(BackendError("No recorded response for prompt 3f429a1529c0de77"))
+    assert not is_throttling_error(BackendError("rate limit reached in fixture"))
+    assert not is_throttling_error(RuntimeError("prompt 3f429a1529c0de77 failed"))
+    assert not is_throttling_error(StatusError("rate limit docs: see 429", 500))
+
+
+class FakeClock:
+    """Monotonic clock that only moves when the scheduler waits or backs off."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    async def sleep(self, delay):
+        self.now += delay
+        await REAL_SLEEP(0)
+
+
+REAL_SLEEP = asyncio.sleep
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    fake_time = SimpleNamespace(monotonic=clock.monotonic, time=clock.monotonic,
+                                strftime=time.strftime, localtime=time.localtime)
+    monkeypatch.setattr(model_scheduler, "time", fake_time)
+    monkeypatch.setattr(enhancement_backends, "time", fake_time)
+    monkeypatch.setattr(model_scheduler, "asyncio", SimpleNamespace(
+        Event=asyncio.Event, wait_for=asyncio.wait_for, TimeoutError=asyncio.TimeoutError, sleep=clock.sleep))
+    original_wait = ModelScheduler._wait
+
+    async def wait(self, timeout):
+        # A timed wait is the head of the queue waiting for the buckets to refill
+        if timeout is None:
+            await original_wait(self, None)
+        else:
+            await clock.sleep(timeout)
+
+    monkeypatch.setattr(ModelScheduler, "_wait", wait)
+    return clock
+
+
+def timed_replay(clock, starts, **options):
+    """Replay backend that records when each call reaches it."""
+    class TimedReplay(ReplayBackend):
+        async def stream(self, prompt, system=None):
+            starts.append((prompt, clock.now))
+            async for chunk in super().stream(prompt, system):
+                yield chunk
+
+    return TimedReplay(FixtureStore("unused"), synthesize=True, **options)
+
+
+async def call(backend, prompt):
+    return "".join([chunk async for chunk in backend.stream(prompt)])
+
+
+def test_today_lane_is_admitted_before_queued_backfills(clock):
+    starts = []
+    scheduler = ModelScheduler(requests_per_minute=60, tokens_per_minute=0)
+    backend = ScheduledBackend(timed_replay(clock, starts), scheduler, LANE_BACKFILL)
+
+    async def run():
+        calls = [call(backend, f"backfill{i}") for i in range(3)]
+        calls.append(call(backend.for_lane(LANE_TODAY), "today"))
+        await asyncio.gather(*calls)
+
+    asyncio.run(run())
+    assert [prompt for prompt, _ in starts] == ["backfill0", "today", "backfill1", "backfill2"]
+    assert scheduler.report()["lanes"]["today"]["calls"] == 1
+
+
+def test_requests_are_paced_to_the_rpm_limit(clock):
+    starts = []
+    scheduler = ModelScheduler(requests_per_minute=120, tokens_per_minute=0)
+    backend = ScheduledBackend(timed_replay(clock, starts), scheduler)
+
+    async def run():
+        await asyncio.gather(*[call(backend, f"prompt{i}") for i in range(5)])
+
+    asyncio.run(run())
+    times = [started - 1000.0 for _, started in starts]
+    assert times == pytest.approx([0.0, 0.5, 1.0, 1.5, 2.0])
+
+
+def test_throttled_call_is_retried_after_backoff(clock):
+    starts = []
+    scheduler = ModelScheduler(requests_per_minute=600, tokens_per_minute=0, base_delay=1.0, seed=7)
+    inner = timed_replay(clock, starts, rate_limit=1)
+    backend = ScheduledBackend(inner, scheduler)
+
+    async def run():
+        return await asyncio.gather(call(backend, "first"), call(backend, "second"))
+
+    assert asyncio.run(run()) == [SYNTHETIC_RESPONSE, SYNTHETIC_RESPONSE]
+    assert inner.throttled >= 1
+    report = scheduler.report()["total"]
+    assert report["ok"] == 2 and report["failed"] == 0
+    assert report["throttled_retries"] == inner.throttled
+    # The retry only got through once the provider's one-second window had passed
+    first = next(started for prompt, started in starts if prompt == "first")
+    assert starts[-1][0] == "second" and starts[-1][1] - first >= 1.0
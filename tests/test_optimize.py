@@ -0,0 +1,55 @@
+import gzip
+
+import pytest
+
+from optimize import minify_js, precompress_site
+
+
+@pytest.mark.parametrize("js", [
+    'const w = margin / 2; // don\'t\nfoo();',
+    'let r = i++ / 2; // don\'t\nfoo();',
+    'const half = total/2, rest = (a + b) / c; // don\'t\nfoo();',
+    'const x = items[0] / 2; // don\'t\nfoo();',
+])
+def test_division_is_not_a_regex(js):
+    assert minify_js(js) == js.split(' // ')[0] + "\nfoo();"
+
+
+@pytest.mark.parametrize("js", [
+    'return /\\/\\/ (a|b)/g.test(s);',
+    'const parts = text.split(/[/,]/);',
+    'if (typeof /x/ === "object") ok();',
+    'const m = line.match(/"(.*)"/) || [];',
+    'x = cond ? /a/ : /b/i;',
+])
+def test_regex_literals_are_kept(js):
+    assert minify_js(js + '  // note') == js
+
+
+def test_strings_comments_and_line_breaks():
+    js = '''
+        // header comment
+        const url = "http://example.com/a"; /* block */
+        const tpl = `line // not a comment`;
+
+        foo()
+    '''
+    assert minify_js(js) == 'const url = "http://example.com/a";\nconst tpl = `line // not a comment`;\nfoo()'
+
+
+def test_precompress_skips_files_matching_their_gz(tmp_path, capsys):
+    page = tmp_path / "index.html"
+    page.write_text("<p>紫微</p>" * 200, encoding="utf-8")
+    gz_path = tmp_path / "index.html.gz"
+
+    precompress_site(tmp_path, workers=1)
+    assert gzip.decompress(gz_path.read_bytes()) == page.read_bytes()
+    precompress_site(tmp_path, workers=1)
+    assert "Precompressed 0 file(s), 1 unchanged" in capsys.readouterr().out
+
+    gz_path.write_bytes(b"not gzip")
+    precompress_site(tmp_path, workers=1)
+    page.write_text("<p>天府</p>" * 200, encoding="utf-8")
+    precompress_site(tmp_path, workers=1)
+    assert capsys.readouterr().out.count("Precompressed 1 file(s), 0 unchanged") == 2
+    assert gzip.decompress(gz_path.read_bytes()) == page.read_bytes()
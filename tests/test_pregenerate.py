@@ -0,0 +1,63 @@
+import json
+
+import pregenerate
+from enhancement_cache import module_hash
+from generate_question import calculate_daily_module
+
+DATE = "2026-03-01"
+
+
+def make_modules(count):
+    return [{"id": f"{i:03d}", "title": f"模块{i}", "question": f"问题{i}"} for i in range(1, count + 1)]
+
+
+def stage_day(staging, module):
+    day_dir = pregenerate.staged_dir(DATE, staging)
+    day_dir.mkdir(parents=True)
+    (day_dir / "index.html").write_text(f"<p>{module['title']}</p>", encoding="utf-8")
+    (day_dir / "archive.html").write_text("<p>archive</p>", encoding="utf-8")
+    (day_dir / "meta.json").write_text(json.dumps({
+        "date": DATE, "module_id": module['id'], "module_hash": module_hash(module)
+    }), encoding="utf-8")
+    return day_dir
+
+
+def promote(tmp_path, modules):
+    return pregenerate.promote_staged_day(
+        DATE, modules, staging_path=tmp_path / "staging",
+        output_path=tmp_path / "docs" / "index.html", archive_path=tmp_path / "docs" / "archive"
+    )
+
+
+def test_promotes_current_staged_day(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    modules = make_modules(5)
+    module, _, _ = calculate_daily_module(modules, target_date=DATE)
+    stage_day(tmp_path / "staging", module)
+
+    assert promote(tmp_path, modules)
+    assert (tmp_path / "docs" / "index.html").read_text(encoding="utf-8") == f"<p>{module['title']}</p>"
+    assert (tmp_path / "docs" / "archive" / f"{DATE}.html").exists()
+
+
+def test_rejects_day_staged_for_another_module(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    modules = make_modules(5)
+    module, _, _ = calculate_daily_module(modules, target_date=DATE)
+    other = next(m for m in modules if m['id'] != module['id'])
+    day_dir = stage_day(tmp_path / "staging", other)
+
+    assert not promote(tmp_path, modules)
+    assert not day_dir.exists()
+    assert not (tmp_path / "docs" / "index.html").exists()
+
+
+def test_rejects_day_staged_before_the_module_was_edited(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    modules = make_modules(5)
+    module, _, _ = calculate_daily_module(modules, target_date=DATE)
+    day_dir = stage_day(tmp_path / "staging", module)
+    module['question'] = "改过的问题"
+
+    assert not promote(tmp_path, modules)
+    assert not day_dir.exists()
@@ -0,0 +1,58 @@
+import random
+
+from question_dedup import THRESHOLD, find_clusters, jaccard, shingles
+
+HAN = [chr(code) for code in range(0x4E00, 0x4E00 + 3000)]
+
+
+def synthetic_items(rng, base_count=150):
+    """Random texts plus edited copies, so many pairs sit around the threshold."""
+    texts = []
+    for _ in range(base_count):
+        text = [rng.choice(HAN) for _ in range(rng.randint(30, 60))]
+        texts.append(''.join(text))
+        for _ in range(rng.randint(0, 2)):
+            copy = list(text)
+            for _ in range(rng.randint(2, 12)):
+                copy[rng.randrange(len(copy))] = rng.choice(HAN)
+            texts.append(''.join(copy))
+    rng.shuffle(texts)
+    return [(f"Q{i}", text) for i, text in enumerate(texts)]
+
+
+def brute_force_pairs(items, threshold):
+    sets = [shingles(text) for _, text in items]
+    return {
+        (i, j)
+        for i in range(len(items)) for j in range(i + 1, len(items))
+        if jaccard(sets[i], sets[j]) >= threshold
+    }
+
+
+def clustered_pairs(clusters):
+    pairs = set()
+    for members in clusters:
+        indices = sorted(index for index, _ in members)
+        pairs |= {(a, b) for n, a in enumerate(indices) for b in indices[n + 1:]}
+    return pairs
+
+
+def test_lsh_recall_at_threshold():
+    items = synthetic_items(random.Random(7))
+    truth = brute_force_pairs(items, THRESHOLD)
+    found = clustered_pairs(find_clusters(items, THRESHOLD))
+
+    assert len(truth) > 50
+    assert len(truth & found) / len(truth) >= 0.98
+
+
+def test_clusters_keep_the_first_item():
+    items = [
+        ("module:001", "什么是真理？天纪和真理的关系是什么？"),
+        ("module:002", "易经讲的是什么"),
+        ("EP01-Q02", "什么是真理？天纪与真理的关系是什么？"),
+    ]
+    clusters = find_clusters(items)
+    assert len(clusters) == 1
+    assert [index for index, _ in clusters[0]] == [0, 2]
+    assert clusters[0][0][1] == 1.0
@@ -0,0 +1,100 @@
+import asyncio
+import json
+
+from enhancement_prompts import build_system_prompt
+from response_parser import (
+    ENHANCEMENT_SCHEMA, StreamingJSONExtractor, build_retry_prompt,
+    parse_enhancement_text, repair_json_text, request_json, validate_enhancement
+)
+
+
+def feed_in_chunks(extractor, text, size):
+    for start in range(0, len(text), size):
+        result = extractor.feed(text[start:start + size])
+        if result:
+            return result, start + size
+    return None, len(text)
+
+
+def test_extractor_stops_at_the_closing_brace():
+    text = '```json\n{"a": "含有 } 和 \\" 的字符串", "b": [1, {"c": 2}]}\n```\n多余的说明'
+    for size in (1, 3, 7, 100):
+        result, read = feed_in_chunks(StreamingJSONExtractor(), text, size)
+        assert json.loads(result) == {"a": '含有 } 和 " 的字符串', "b": [1, {"c": 2}]}
+        assert read < len(text) or size == 100
+
+
+def test_extractor_reads_arrays():
+    extractor = StreamingJSONExtractor('[')
+    result, _ = feed_in_chunks(extractor, '说明文字 [{"module_id": "001"}, {"module_id": "002"}] 后记', 5)
+    assert [item["module_id"] for item in json.loads(result)] == ["001", "002"]
+
+
+def test_extractor_keeps_partial_text():
+    extractor = StreamingJSONExtractor()
+    assert extractor.feed('前言 {"a": "未完') is None
+    assert not extractor.complete
+    assert extractor.partial_text() == '{"a": "未完'
+
+
+def test_repair_json_text():
+    assert json.loads(repair_json_text('```json\n{"a": 1, "b": [1, 2,],}\n```')) == {"a": 1, "b": [1, 2]}
+    assert json.loads(repair_json_text('{"a": "第一行\n第二行"}')) == {"a": "第一行\n第二行"}
+    assert json.loads(repair_json_text('{"a": {"b": "截断')) == {"a": {"b": "截断"}}
+
+
+def test_repair_json_text_keeps_commas_inside_strings():
+    text = '{"a": "列举：甲, ]乙, }丙", "b": [1, 2 , ],}'
+    assert json.loads(repair_json_text(text)) == {"a": "列举：甲, ]乙, }丙", "b": [1, 2]}
+
+
+def test_parse_enhancement_text_repairs_truncated_object():
+    assert parse_enhancement_text('好的：{"daily_tip": "先看视频",') == {"daily_tip": "先看视频"}
+    assert parse_enhancement_text("没有JSON") is None
+
+
+def test_validate_enhancement_uses_prompt_limits():
+    data = {"daily_tip": "长" * 51, "deeper_question": "问" * 300, "connection_hint": " ", "motivation": "学"}
+    valid, errors = validate_enhancement(data)
+    assert set(valid) == {"deeper_question", "motivation"}
+    assert set(errors) == {"daily_tip", "connection_hint"}
+    assert "（限50字以内）" in build_retry_prompt("原提示词", errors)
+
+
+def test_prompt_states_the_schema_limits():
+    prompt = build_system_prompt()
+    for field, max_len in ENHANCEMENT_SCHEMA.items():
+        line = next(line for line in prompt.splitlines() if line.startswith(f'- "{field}"'))
+        assert (f"{max_len}字以内" in line) == bool(max_len)
+
+
+class ScriptedBackend:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.prompts = []
+
+    async def stream(self, prompt, system=None):
+        self.prompts.append(prompt)
+        response = self.responses.pop(0)
+        for start in range(0, len(response), 4):
+            yield response[start:start + 4]
+
+
+def require_tip(data):
+    valid, errors = validate_enhancement(data)
+    return valid, {field: reason for field, reason in errors.items() if field == "daily_tip"}
+
+
+def test_request_json_retries_with_the_errors():
+    backend = ScriptedBackend(['{"daily_tip": ""}', '好的 {"daily_tip": "先看视频"} 其余'])
+    result, errors = asyncio.run(request_json(backend, "提示词", None, require_tip, retry_prompt=build_retry_prompt))
+    assert (result["daily_tip"], errors) == ("先看视频", {})
+    assert backend.prompts[0] == "提示词"
+    assert backend.prompts[1].startswith("提示词") and "daily_tip" in backend.prompts[1]
+
+
+def test_request_json_returns_the_last_errors():
+    backend = ScriptedBackend(['没有JSON', '[1, 2]'])
+    result, errors = asyncio.run(request_json(backend, "提示词", None, require_tip))
+    assert "daily_tip" in errors
+    assert backend.prompts == ["提示词", "提示词"]
@@ -0,0 +1,85 @@
+import json
+from datetime import date, timedelta
+
+import generate_question
+from date_utils import module_indices, to_ordinals
+
+START = "2026-01-21"
+
+
+def make_modules(count):
+    return [{"id": f"{i:03d}", "title": f"模块{i}"} for i in range(1, count + 1)]
+
+
+def write_duplicates(tmp_path, duplicates):
+    path = tmp_path / "src" / "question_duplicates.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    clusters = [
+        {"keep": "module:001", "title": "", "duplicates": [
+            {"id": dup_id, "title": "", "similarity": 0.9, "since": since} for dup_id, since in duplicates.items()
+        ]}
+    ]
+    path.write_text(json.dumps({"threshold": 0.5, "clusters": clusters}), encoding="utf-8")
+
+
+def dates(first, count):
+    start = date.fromisoformat(first)
+    return [(start + timedelta(days=i)).isoformat() for i in range(count)]
+
+
+def rotation(modules, date_strs):
+    return [
+        generate_question.calculate_daily_module(modules, START, d)[0]['id']
+        for d in date_strs
+    ]
+
+
+def test_dedupe_does_not_move_past_dates(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    modules = make_modules(5)
+    all_dates = dates(START, 30)
+    before = rotation(modules, all_dates)
+
+    write_duplicates(tmp_path, {"module:003": "2026-02-01"})
+    after = rotation(modules, all_dates)
+
+    for date_str, old, new in zip(all_dates, before, after):
+        if date_str < "2026-02-01":
+            assert new == old, date_str
+        else:
+            assert new != "003", date_str
+    # The remaining modules keep cycling without showing one twice in a row
+    assert all(a != b for a, b in zip(after, after[1:]))
+    assert set(after[all_dates.index("2026-02-01"):]) == {"001", "002", "004", "005"}
+
+
+def test_rotation_keeps_its_length(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    modules = make_modules(4)
+    write_duplicates(tmp_path, {"module:002": "2026-01-01"})
+    module, current_num, total_num = generate_question.calculate_daily_module(modules, START, "2026-01-22")
+    assert module['id'] == "003"
+    assert (current_num, total_num) == (3, 4)
+
+
+def test_batch_indices_match_calculate_daily_module(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    modules = make_modules(6)
+    write_duplicates(tmp_path, {"module:002": "2026-01-25", "module:003": "2026-01-25"})
+    date_strs = dates(START, 30)
+    skipped = generate_question.skipped_modules(modules)
+    indices = module_indices(to_ordinals(date_strs), START, len(modules), skipped)
+    assert [modules[i]['id'] for i in indices] == rotation(modules, date_strs)
+
+
+def test_consecutive_duplicates_are_all_skipped():
+    skipped = {1: 0, 2: 0}
+    ordinals = to_ordinals(dates(START, 4))
+    assert module_indices(ordinals, START, 4, skipped) == [0, 3, 0, 3]
+
+
+def test_rotation_continues_after_the_day_before_a_skip():
+    # 001 002 003 | from day 4 (when 001 would come round) 002 is skipped
+    ordinals = to_ordinals(dates(START, 8))
+    skipped = {1: ordinals[3]}
+    assert module_indices(ordinals, START, 3, skipped) == [0, 1, 2, 0, 2, 0, 2, 0]
@@ -0,0 +1,39 @@
+import json
+
+import search_index
+from search_index import build_search_index, term_hash, tokenize
+
+
+def lookup(search_dir, query):
+    """Documents matching any query term, like runSearch() in the widget."""
+    meta = json.loads((search_dir / "meta.json").read_text(encoding="utf-8"))
+    docs = []
+    for term in tokenize(query):
+        shard = json.loads((search_dir / f"shard-{term_hash(term) % meta['shards']}.json").read_text(encoding="utf-8"))
+        postings = shard.get(term, [])
+        docs += postings[::2]
+    titles = json.loads((search_dir / "docs-0.json").read_text(encoding="utf-8"))
+    return {titles[doc][0] for doc in docs}
+
+
+def document(title, concepts):
+    return {"title": title, "url": "", "meta": "", "fields": {"title": title, "key_concepts": concepts}}
+
+
+def test_single_character_queries_match_inside_words(tmp_path):
+    build_search_index([document("紫微斗数入门", ["紫微", "命宫"]), document("易经概论", ["阴阳"])], tmp_path)
+    assert lookup(tmp_path, "紫") == {"紫微斗数入门"}
+    assert lookup(tmp_path, "阳") == {"易经概论"}
+    assert lookup(tmp_path, "紫微") == {"紫微斗数入门"}
+
+
+def test_question_bank_is_indexed(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "question_bank").mkdir()
+    (tmp_path / "question_bank" / "episode_10_all_questions.json").write_text(json.dumps({
+        "episode": 10,
+        "questions": [{"id": "EP10-Q01", "title": "什么是天府星", "key_concepts": ["天府"]}]
+    }, ensure_ascii=False), encoding="utf-8")
+
+    search_index.generate_site_search_index([], archive_path=tmp_path / "archive", search_path=tmp_path / "search")
+    assert lookup(tmp_path / "search", "天府") == {"什么是天府星"}
@@ -0,0 +1,60 @@
+import asyncio
+
+from batch_enhance import enhance_batch
+from enhancement_backends import EnhancementBackend
+from generate_question import generate_enhanced_content
+
+RESPONSE = '{"daily_tip": "先看视频", "deeper_question": "为什么？", "connection_hint": "对照复习", "motivation": "学而时习之"} 之后的多余内容'
+
+
+class TrackingBackend(EnhancementBackend):
+    name = "tracking"
+
+    def __init__(self, response):
+        self.response = response
+        self.closed = 0
+
+    async def stream(self, prompt, system=None):
+        try:
+            for start in range(0, len(self.response), 8):
+                yield self.response[start:start + 8]
+        finally:
+            self.closed += 1
+
+
+MODULE = {"id": "001", "title": "模块", "episode": "1", "textbook_pages": "1",
+          "question": "问题", "key_concepts": ["紫微"]}
+
+
+class NoCache:
+    def get(self, module):
+        return None
+
+    def put(self, module, content):
+        pass
+
+
+def closed_on_return(call, backend):
+    """Run call() and report whether the stream was closed by the time it returned."""
+    async def run():
+        result = await call()
+        return result, backend.closed
+    return asyncio.run(run())
+
+
+def test_stream_is_closed_when_the_json_closes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    backend = TrackingBackend(RESPONSE)
+    content, closed = closed_on_return(
+        lambda: generate_enhanced_content(MODULE, 1, 1, backend=backend, cache=NoCache()), backend
+    )
+    assert content["daily_tip"] == "先看视频"
+    assert closed == 1
+
+
+def test_batch_stream_is_closed_when_the_array_closes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    backend = TrackingBackend('[' + RESPONSE.split(' 之后')[0][:-1] + ', "module_id": "001"}] 多余')
+    (valid, failed), closed = closed_on_return(lambda: enhance_batch([MODULE], backend, NoCache()), backend)
+    assert "001" in valid and not failed
+    assert closed == 1
@@ -0,0 +1,26 @@
+import json
+
+import teachback_keywords
+
+
+def test_keywords_are_rebuilt_when_question_bank_changes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(teachback_keywords, "passages_text", lambda module: "")
+    keywords_path = tmp_path / "keywords.json"
+    modules = [{"id": "001", "title": "紫微", "episode": "1", "key_concepts": ["紫微"]}]
+
+    table = teachback_keywords.update_keywords(modules, keywords_path)
+    assert [concept["label"] for concept in table["001"]["concepts"]] == ["紫微"]
+    mtime = keywords_path.stat().st_mtime_ns
+    assert teachback_keywords.update_keywords(modules, keywords_path) == table
+    assert keywords_path.stat().st_mtime_ns == mtime
+
+    (tmp_path / "question_bank").mkdir()
+    questions = {"episode": 1, "questions": [{"title": "紫微与天府", "key_concepts": ["紫微", "天府"],
+                                "video_summary": ["紫微天府同宫"]}]}
+    (tmp_path / "question_bank" / "episode_1_all_questions.json").write_text(
+        json.dumps(questions, ensure_ascii=False), encoding="utf-8")
+
+    table = teachback_keywords.update_keywords(modules, keywords_path)
+    assert [concept["label"] for concept in table["001"]["concepts"]] == ["紫微", "天府"]
+    assert table["001"]["source"] == teachback_keywords.source_hash(teachback_keywords.load_all_question_sets())
@@ -0,0 +1,34 @@
+import textbook_align
+from textbook_align import PageIndex, align_episode
+
+# Traditional -> simplified for the characters used below
+TABLE = {"斗": "斗", "數": "数", "紫": "紫", "微": "微", "門": "门", "陽": "阳", "經": "经", "易": "易", "陰": "阴"}
+
+PAGES = [
+    "紫微斗數是以紫微星為首的星曜排盤之學，命宮主星決定人一生的格局與走向，本章介紹十四主星。",
+    "易經講陰陽變化之理，卦象由陰爻陽爻組成，六十四卦推演天地人事的消長與吉凶。",
+]
+
+
+def cue(start, text):
+    return {"start": start, "end": start + 30, "text": text}
+
+
+def test_windows_align_to_the_matching_page():
+    transcript = {"episode": 1, "cues": [
+        cue(0, "今天我们讲紫微斗数是以紫微星为首的星曜排盘之学命宫主星决定人一生的格局与走向"),
+        cue(200, "接下来易经讲阴阳变化之理卦象由阴爻阳爻组成六十四卦推演天地人事的消长与吉凶"),
+        cue(400, "好"),
+    ]}
+    aligned = align_episode(transcript, PageIndex(PAGES, TABLE))
+    assert [(entry["start"], entry["page"]) for entry in aligned] == [("00:00:00", 1), ("00:03:20", 2)]
+
+
+def test_main_skips_without_the_pdf_dependencies(monkeypatch, capsys):
+    def missing_pypdf(*args, **kwargs):
+        raise ImportError("No module named 'pypdf'")
+
+    monkeypatch.setattr(textbook_align, "load_all_transcripts", lambda: [])
+    monkeypatch.setattr(textbook_align, "load_textbook_pages", missing_pypdf)
+    textbook_align.main()
+    assert "Textbook alignment skipped: No module named 'pypdf'" in capsys.readouterr().out
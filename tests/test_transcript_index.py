@@ -0,0 +1,94 @@
+import math
+import random
+from collections import Counter
+
+import pytest
+
+from model_scheduler import estimate_tokens
+from transcript_index import B, K1, TranscriptIndex, build_index, tokenize, transcript_passages, truncate_to_tokens
+
+HAN = "紫微天府命宫阴阳五行易经八字风水星曜太极"
+
+
+def make_transcripts(rng, episodes=4, cues=40):
+    transcripts = []
+    for episode in range(1, episodes + 1):
+        transcripts.append({"episode": episode, "cues": [
+            {"start": i * 20, "end": i * 20 + 20,
+             "text": ''.join(rng.choice(HAN) for _ in range(rng.randint(5, 25))) + rng.choice(["", " abc", " 2024"])}
+            for i in range(cues)
+        ]})
+    return transcripts
+
+
+def brute_force_scores(passages, query):
+    """BM25 computed directly from the passage texts."""
+    docs = [Counter(tokenize(text)) for _, _, _, text in passages]
+    avgdl = sum(sum(d.values()) for d in docs) / len(docs)
+    scores = Counter()
+    for term, query_tf in Counter(tokenize(query)).items():
+        df = sum(1 for d in docs if term in d)
+        if not df:
+            continue
+        idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+        for doc, counts in enumerate(docs):
+            tf = counts.get(term)
+            if tf:
+                norm = K1 * (1 - B + B * sum(counts.values()) / avgdl)
+                scores[doc] += query_tf * idf * tf * (K1 + 1) / (tf + norm)
+    return scores
+
+
+@pytest.fixture
+def index(tmp_path):
+    transcripts = make_transcripts(random.Random(3))
+    path = build_index(transcripts, "test-source", tmp_path / "bm25.idx")
+    index = TranscriptIndex(path)
+    passages = [(t['episode'], s, e, text) for t in transcripts for s, e, text in transcript_passages(t)]
+    yield index, passages
+    index.close()
+
+
+def test_every_term_and_passage_survives_the_round_trip(index):
+    index, passages = index
+    assert index.source == "test-source"
+    assert index.doc_count == len(passages)
+
+    terms = {term for _, _, _, text in passages for term in tokenize(text)}
+    assert index.term_count == len(terms)
+    for term in terms:
+        term_id = index.term_id(term)
+        first, last = index.posting_offsets[term_id], index.posting_offsets[term_id + 1]
+        docs = {index.posting_docs[i]: index.posting_tfs[i] for i in range(first, last)}
+        assert docs == {doc: Counter(tokenize(p[3]))[term] for doc, p in enumerate(passages) if term in tokenize(p[3])}
+    assert index.term_id("不存在") is None
+
+    for doc, (episode, start, end, text) in enumerate(passages):
+        passage = index.passage(doc)
+        assert (passage["episode"], passage["text"]) == (episode, text)
+        assert index.doc_starts[doc] == int(start) and index.doc_ends[doc] == int(end)
+
+
+def test_search_matches_brute_force_bm25(index):
+    index, passages = index
+    for query in ("紫微 天府", "阴阳五行", "易", "abc 命宫"):
+        expected = brute_force_scores(passages, query)
+        results = index.search(query, k=5)
+        assert [r["score"] for r in results] == [round(s, 3) for _, s in expected.most_common(5)]
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "bogus.idx"
+    path.write_bytes(b"not an index at all")
+    with pytest.raises(ValueError):
+        TranscriptIndex(path)
+
+
+@pytest.mark.parametrize("text", ["紫微天府命宫阴阳五行", "the ziwei star and 天府 in the 命宫 of a chart", "a" * 40])
+def test_truncate_to_tokens_fits_the_budget(text):
+    for budget in range(0, estimate_tokens(text) + 2):
+        prefix = truncate_to_tokens(text, budget)
+        assert text.startswith(prefix)
+        assert estimate_tokens(prefix) <= budget
+        if prefix != text:
+            assert estimate_tokens(text[:len(prefix) + 1]) > budget